@@ -0,0 +1,20 @@
+from django.conf import settings
+from django.core.checks import Error, Tags, register
+
+from core.local_cache import is_process_local
+
+
+@register(Tags.caches)
+def check_otp_store(app_configs, **kwargs):
+    """A cache OTP store only works when every worker sees the same cache"""
+    if getattr(settings, 'OTP_STORE', 'db') != 'cache':
+        return []
+    if not is_process_local():
+        return []
+    backend = settings.CACHES['default']['BACKEND']
+    return [Error(
+        f"OTP_STORE='cache' with the {backend.rsplit('.', 1)[-1]} cache backend",
+        hint="Each worker would only see its own OTPs and attempt counts. Set OTP_STORE='db', "
+             "or CACHE_BACKEND to a shared cache such as Redis.",
+        id='accounts.E001',
+    )]
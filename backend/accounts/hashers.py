@@ -0,0 +1,123 @@
+"""
+Password hashers with deployment-tunable costs, and bounded verification.
+
+``PASSWORD_HASHER`` picks the hasher for new passwords (Argon2id by default,
+scrypt without argon2-cffi); the other hashers stay in ``PASSWORD_HASHERS``
+so existing hashes still verify, and Django rehashes them on the next
+successful login. The same happens when a cost in ``PASSWORD_HASH_PARAMS``
+changes. Pick costs with ``manage.py calibrate_password_hashing`` and compare
+settings with ``manage.py bench_password_hashing``.
+
+With ``PASSWORD_CHECK_WORKERS`` set, ``check_user_password`` runs the hash
+in a per-process thread pool of that size (the hash functions release the
+GIL). At most ``PASSWORD_CHECK_MAX_PENDING`` checks wait for a worker; beyond
+that, or after ``PASSWORD_CHECK_TIMEOUT`` seconds, ``PasswordCheckBusy``
+(503) is raised so a login flood can't tie up every request thread.
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeout
+
+from django.conf import settings
+from django.contrib.auth import hashers
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+
+def _cost(algorithm, name, default):
+    """A hasher attribute read from the hasher's ``cost_params``, else settings.PASSWORD_HASH_PARAMS[algorithm]"""
+    def get(self):
+        params = self.cost_params
+        if params is None:
+            params = getattr(settings, 'PASSWORD_HASH_PARAMS', {}).get(algorithm, {})
+        return params.get(name, default)
+    return property(get)
+
+
+class TunableHasherMixin:
+    """``cost_params`` fixes the costs of this instance (for benchmarks); None follows the settings"""
+
+    # Not ``params``: Argon2PasswordHasher.params() builds the argon2 Parameters
+    def __init__(self, cost_params=None):
+        self.cost_params = cost_params
+
+
+class Argon2PasswordHasher(TunableHasherMixin, hashers.Argon2PasswordHasher):
+    time_cost = _cost('argon2', 'time_cost', hashers.Argon2PasswordHasher.time_cost)
+    memory_cost = _cost('argon2', 'memory_cost', hashers.Argon2PasswordHasher.memory_cost)
+    parallelism = _cost('argon2', 'parallelism', hashers.Argon2PasswordHasher.parallelism)
+
+
+class ScryptPasswordHasher(TunableHasherMixin, hashers.ScryptPasswordHasher):
+    work_factor = _cost('scrypt', 'work_factor', hashers.ScryptPasswordHasher.work_factor)
+    block_size = _cost('scrypt', 'block_size', hashers.ScryptPasswordHasher.block_size)
+    parallelism = _cost('scrypt', 'parallelism', hashers.ScryptPasswordHasher.parallelism)
+    # A limit, not an allocation: it has to cover the largest cost still stored
+    maxmem = 2 ** 30
+
+
+class PBKDF2PasswordHasher(TunableHasherMixin, hashers.PBKDF2PasswordHasher):
+    iterations = _cost('pbkdf2_sha256', 'iterations', hashers.PBKDF2PasswordHasher.iterations)
+
+
+class PasswordCheckBusy(APIException):
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = 'Too many sign-ins in progress, please retry shortly.'
+    default_code = 'password_check_busy'
+
+
+class _CheckPool:
+    def __init__(self, workers, max_pending):
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='password-check')
+        self.slots = threading.BoundedSemaphore(workers + max_pending)
+
+    def run(self, func, *args, timeout=None):
+        if not self.slots.acquire(blocking=False):
+            raise PasswordCheckBusy()
+        try:
+            future = self.executor.submit(func, *args)
+        except BaseException:
+            self.slots.release()
+            raise
+        future.add_done_callback(lambda _: self.slots.release())
+        try:
+            return future.result(timeout)
+        except FutureTimeout:
+            raise PasswordCheckBusy()
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _get_pool():
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                workers = settings.PASSWORD_CHECK_WORKERS
+                _pool = _CheckPool(workers, getattr(settings, 'PASSWORD_CHECK_MAX_PENDING', workers * 4))
+    return _pool
+
+
+def run_hash(func, *args):
+    """Call a hashing function inline, or in the bounded pool when it is enabled"""
+    if not getattr(settings, 'PASSWORD_CHECK_WORKERS', 0):
+        return func(*args)
+    return _get_pool().run(func, *args, timeout=getattr(settings, 'PASSWORD_CHECK_TIMEOUT', 5))
+
+
+def check_user_password(user, raw_password):
+    """
+    ``user.check_password`` with the hash offloaded through ``run_hash``.
+
+    Only the hash runs in the pool; the rehash save for outdated hashes
+    happens here, on the calling thread and its database connection.
+    """
+    outdated = []
+    correct = run_hash(hashers.check_password, raw_password, user.password, outdated.append)
+    if outdated:
+        user.set_password(raw_password)
+        user.save(update_fields=['password'])
+    return correct
+
@@ -0,0 +1,156 @@
+"""
+Asymmetric JWT signing with key rotation.
+
+``JWT_SIGNING_KEY_FILES`` lists PEM private keys (RSA, Ed25519 or EC P-256),
+newest first. The first key signs every new token, with its ``kid`` in the
+header; the others only verify, so tokens signed before a rotation stay valid
+until they expire. Each key's ``kid`` is its RFC 7638 thumbprint and its
+algorithm follows from the key type (RS256, EdDSA or ES256).
+
+The public halves are served at ``/.well-known/jwks.json`` so other services
+can verify tokens locally (see ``accounts/jwt_verifier.py``). To rotate:
+
+1. ``manage.py generate_jwt_key`` and append the new file to the list; wait
+   ``JWT_JWKS_MAX_AGE`` so verifiers have fetched it.
+2. Move it first; new tokens are signed with it.
+3. Drop the old key after ``REFRESH_TOKEN_LIFETIME``.
+
+While ``JWT_ACCEPT_LEGACY_HS256`` is on, tokens without a ``kid`` are still
+checked against ``SIMPLE_JWT['SIGNING_KEY']``, so sessions issued before the
+switch survive it. Without key files, simplejwt's HS256 backend is left alone.
+"""
+import base64
+import hashlib
+import json
+
+import jwt
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ec, ed25519, rsa
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.backends import TokenBackend
+from rest_framework_simplejwt.exceptions import TokenBackendError
+
+# Members hashed for the RFC 7638 thumbprint, per key type
+_THUMBPRINT_MEMBERS = {'RSA': ('e', 'kty', 'n'), 'OKP': ('crv', 'kty', 'x'), 'EC': ('crv', 'kty', 'x', 'y')}
+
+
+def _algorithm_for(private_key):
+    if isinstance(private_key, rsa.RSAPrivateKey):
+        return 'RS256'
+    if isinstance(private_key, ed25519.Ed25519PrivateKey):
+        return 'EdDSA'
+    if isinstance(private_key, ec.EllipticCurvePrivateKey) and isinstance(private_key.curve, ec.SECP256R1):
+        return 'ES256'
+    raise ImproperlyConfigured(f"Unsupported JWT signing key type {type(private_key).__name__}")
+
+
+class SigningKey:
+    def __init__(self, private_key):
+        self.private_key = private_key
+        self.public_key = private_key.public_key()
+        self.algorithm = _algorithm_for(private_key)
+        jwk = json.loads(jwt.get_algorithm_by_name(self.algorithm).to_jwk(self.public_key))
+        members = {name: jwk[name] for name in _THUMBPRINT_MEMBERS[jwk['kty']]}
+        digest = hashlib.sha256(json.dumps(members, separators=(',', ':'), sort_keys=True).encode()).digest()
+        self.kid = base64.urlsafe_b64encode(digest).rstrip(b'=').decode()
+        self.jwk = {**jwk, 'kid': self.kid, 'alg': self.algorithm, 'use': 'sig'}
+
+    @classmethod
+    def from_pem(cls, data):
+        return cls(serialization.load_pem_private_key(data, password=None))
+
+
+def load_signing_keys(paths):
+    keys = []
+    for path in paths:
+        try:
+            with open(path, 'rb') as key_file:
+                keys.append(SigningKey.from_pem(key_file.read()))
+        except (OSError, ValueError) as exc:
+            raise ImproperlyConfigured(f"Can't load JWT signing key {path}: {exc}")
+    return keys
+
+
+class KeyRingTokenBackend(TokenBackend):
+    """simplejwt backend signing with the first of ``keys`` and verifying by ``kid``"""
+
+    def __init__(self, keys, legacy_backend=None, audience=None, issuer=None, leeway=None,
+                 json_encoder=None):
+        if not keys:
+            raise ImproperlyConfigured("KeyRingTokenBackend needs at least one signing key")
+        super().__init__('HS256', audience=audience, issuer=issuer, leeway=leeway, json_encoder=json_encoder)
+        self.active = keys[0]
+        self.algorithm = self.active.algorithm
+        self.keys = {key.kid: key for key in keys}
+        self.legacy_backend = legacy_backend
+        self.jwks = {'keys': [key.jwk for key in keys]}
+        self.jwks_document = _document(self.jwks)
+
+    def encode(self, payload):
+        jwt_payload = payload.copy()
+        if self.audience is not None:
+            jwt_payload['aud'] = self.audience
+        if self.issuer is not None:
+            jwt_payload['iss'] = self.issuer
+        return jwt.encode(jwt_payload, self.active.private_key, algorithm=self.active.algorithm,
+                          headers={'kid': self.active.kid}, json_encoder=self.json_encoder)
+
+    def decode(self, token, verify=True):
+        try:
+            kid = jwt.get_unverified_header(token).get('kid')
+        except jwt.InvalidTokenError as exc:
+            raise TokenBackendError(_("Token is invalid or expired")) from exc
+        if kid is None and self.legacy_backend is not None:
+            return self.legacy_backend.decode(token, verify=verify)
+        key = self.keys.get(kid)
+        if key is None:
+            raise TokenBackendError(_("Token is invalid or expired"))
+        try:
+            return jwt.decode(
+                token,
+                key.public_key,
+                algorithms=[key.algorithm],
+                audience=self.audience,
+                issuer=self.issuer,
+                leeway=self.get_leeway(),
+                options={'verify_aud': self.audience is not None, 'verify_signature': verify},
+            )
+        except jwt.InvalidTokenError as exc:
+            raise TokenBackendError(_("Token is invalid or expired")) from exc
+
+
+def install_token_backend():
+    """Replace simplejwt's module-level backend when signing keys are configured"""
+    paths = getattr(settings, 'JWT_SIGNING_KEY_FILES', [])
+    if not paths:
+        return None
+    from rest_framework_simplejwt import state
+    from rest_framework_simplejwt.settings import api_settings
+
+    legacy = state.token_backend if getattr(settings, 'JWT_ACCEPT_LEGACY_HS256', True) else None
+    state.token_backend = KeyRingTokenBackend(
+        load_signing_keys(paths),
+        legacy_backend=legacy,
+        audience=api_settings.AUDIENCE,
+        issuer=api_settings.ISSUER,
+        leeway=api_settings.LEEWAY,
+        json_encoder=api_settings.JSON_ENCODER,
+    )
+    return state.token_backend
+
+
+def _document(jwks):
+    body = json.dumps(jwks, separators=(',', ':')).encode()
+    return body, '"%s"' % hashlib.sha256(body).hexdigest()[:32]
+
+
+_EMPTY_DOCUMENT = _document({'keys': []})
+
+
+def get_jwks_document():
+    """``(body, etag)`` of the JSON key set, built once per backend; empty while tokens are HS256"""
+    from rest_framework_simplejwt import state
+
+    return getattr(state.token_backend, 'jwks_document', _EMPTY_DOCUMENT)
@@ -0,0 +1,116 @@
+"""
+Local verification of this API's access tokens, for other services.
+
+Depends only on PyJWT and cryptography, with no Django import, so a service
+can copy this file as is::
+
+    verifier = JWKSVerifier('https://api.example.com/.well-known/jwks.json')
+    claims = verifier.verify(token)   # raises jwt.InvalidTokenError
+
+The key set is fetched on first use and parsed once; each verification is a
+dict lookup by ``kid`` and a signature check, with no network hop. The set is
+refetched when its ``Cache-Control`` max-age has passed, or when a token
+names an unknown ``kid`` (a rotation), at most once per
+``min_refresh_interval`` so forged ``kid`` values can't flood the endpoint.
+If a refetch fails, the keys already known keep working.
+
+Revocations (logout) are only seen by the issuing API: accept these tokens
+for reads where a logout taking up to the access token lifetime is fine, and
+call the API for anything stricter.
+"""
+import json
+import re
+import threading
+import time
+import urllib.request
+
+import jwt
+
+# Never accept symmetric or unsigned tokens through a public key set
+ALLOWED_ALGORITHMS = frozenset({'RS256', 'EdDSA', 'ES256'})
+_MAX_AGE_RE = re.compile(r'max-age=(\d+)')
+
+
+class JWKSVerifier:
+    def __init__(self, jwks_url, audience=None, issuer=None, leeway=0, token_type='access',
+                 cache_seconds=300, min_refresh_interval=30, timeout=5):
+        self.jwks_url = jwks_url
+        self.audience = audience
+        self.issuer = issuer
+        self.leeway = leeway
+        self.token_type = token_type
+        self.cache_seconds = cache_seconds
+        self.min_refresh_interval = min_refresh_interval
+        self.timeout = timeout
+        self._keys = {}
+        self._expires_at = 0.0
+        self._fetched_at = float('-inf')
+        self._lock = threading.Lock()
+
+    def fetch(self):
+        """Return ``(jwks dict, max-age)`` from ``jwks_url``; override to use another HTTP client"""
+        with urllib.request.urlopen(self.jwks_url, timeout=self.timeout) as response:
+            match = _MAX_AGE_RE.search(response.headers.get('Cache-Control', ''))
+            return json.load(response), int(match.group(1)) if match else self.cache_seconds
+
+    def load(self, jwks, max_age=None):
+        """Replace the known keys with a JWKS document"""
+        keys = {}
+        for data in jwks.get('keys', []):
+            if data.get('use', 'sig') != 'sig' or data.get('alg') not in ALLOWED_ALGORITHMS:
+                continue
+            try:
+                keys[data['kid']] = jwt.PyJWK(data)
+            except (KeyError, jwt.PyJWKError):
+                continue
+        now = time.monotonic()
+        self._keys = keys
+        self._fetched_at = now
+        self._expires_at = now + (self.cache_seconds if max_age is None else max_age)
+
+    def _refresh(self, force):
+        with self._lock:
+            now = time.monotonic()
+            if now - self._fetched_at < self.min_refresh_interval:
+                return
+            if not force and now < self._expires_at:
+                return
+            try:
+                jwks, max_age = self.fetch()
+            except (OSError, ValueError):
+                # Keep serving the keys we have; try again after the interval
+                self._fetched_at = now
+                if not self._keys:
+                    raise
+                return
+            self.load(jwks, max_age)
+
+    def get_key(self, kid):
+        if time.monotonic() >= self._expires_at:
+            self._refresh(force=False)
+        key = self._keys.get(kid)
+        if key is None:
+            self._refresh(force=True)
+            key = self._keys.get(kid)
+        if key is None:
+            raise jwt.InvalidTokenError(f"Unknown signing key {kid!r}")
+        return key
+
+    def verify(self, token):
+        """Return the claims of a valid token, or raise ``jwt.InvalidTokenError``"""
+        header = jwt.get_unverified_header(token)
+        if header.get('alg') not in ALLOWED_ALGORITHMS:
+            raise jwt.InvalidAlgorithmError(f"Algorithm {header.get('alg')!r} is not accepted")
+        key = self.get_key(header.get('kid'))
+        claims = jwt.decode(
+            token,
+            key.key,
+            algorithms=[key.algorithm_name],
+            audience=self.audience,
+            issuer=self.issuer,
+            leeway=self.leeway,
+            options={'verify_aud': self.audience is not None, 'require': ['exp']},
+        )
+        if self.token_type is not None and claims.get('token_type') != self.token_type:
+            raise jwt.InvalidTokenError(f"Expected token_type {self.token_type!r}")
+        return claims
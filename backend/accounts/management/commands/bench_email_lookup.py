@@ -0,0 +1,87 @@
+import importlib
+import random
+import statistics
+import time
+
+from django.apps import apps
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from accounts.utils import get_user_by_email, users_by_email
+from core.scratch_db import scratch_database
+
+_migration = importlib.import_module('accounts.migrations.0011_auth_user_email_lower_uniq')
+
+
+def _seed(count, batch_size=50000):
+    table = User._meta.db_table
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"INSERT INTO {table} (password, is_superuser, username, first_name, last_name, email, "
+                f"is_staff, is_active, date_joined) "
+                f"SELECT '!', false, 'bench-' || i, '', '', 'Bench.User' || i || '@Example.com', "
+                f"false, true, now() FROM generate_series(1, %s) AS i",
+                [count],
+            )
+            cursor.execute(f"ANALYZE {table}")
+        return
+    for start in range(1, count + 1, batch_size):
+        User.objects.bulk_create([
+            User(password='!', username=f'bench-{i}', email=f'Bench.User{i}@Example.com')
+            for i in range(start, min(start + batch_size, count + 1))
+        ], batch_size=2000)
+
+
+def _has_index():
+    with connection.cursor() as cursor:
+        return _migration.INDEX_NAME in connection.introspection.get_constraints(cursor, User._meta.db_table)
+
+
+def _time(lookup, emails):
+    samples = []
+    for email in emails:
+        started = time.perf_counter()
+        user = lookup(email)
+        samples.append(time.perf_counter() - started)
+        if user is None:
+            raise CommandError(f"No user found for {email}")
+    samples.sort()
+    return statistics.median(samples), samples[min(len(samples) - 1, int(len(samples) * 0.99))]
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed users in a scratch database and time the case-insensitive email lookup used by "
+        "login and OTP, against the exact-match lookup it replaced (run against PostgreSQL)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000000)
+        parser.add_argument('--lookups', type=int, default=2000)
+        parser.add_argument('--legacy-lookups', type=int, default=20,
+                            help="Lookups timed for the unindexed email=... query (each scans the table)")
+        parser.add_argument('--keepdb', action='store_true')
+
+    def handle(self, *args, **options):
+        count = options['users']
+        with scratch_database(keepdb=options['keepdb']):
+            started = time.monotonic()
+            _seed(count)
+            self.stdout.write(f"Seeded {count} users in {time.monotonic() - started:.1f}s")
+            if not _has_index():
+                # Databases built without migrations (e.g. MIGRATION_MODULES overrides)
+                with connection.schema_editor() as schema_editor:
+                    _migration.create_index(apps, schema_editor)
+
+            # Users type their email in any case
+            emails = [f'bench.user{random.randint(1, count)}@example.COM' for _ in range(options['lookups'])]
+            if connection.vendor == 'postgresql':
+                self.stdout.write(users_by_email(emails[0]).explain())
+            median, p99 = _time(get_user_by_email, emails)
+            self.stdout.write(f"get_user_by_email   median {median * 1e3:.3f}ms  p99 {p99 * 1e3:.3f}ms")
+
+            exact = [f'Bench.User{random.randint(1, count)}@Example.com' for _ in range(options['legacy_lookups'])]
+            median, p99 = _time(lambda email: User.objects.filter(email=email).first(), exact)
+            self.stdout.write(f"email=... (before)  median {median * 1e3:.3f}ms  p99 {p99 * 1e3:.3f}ms")
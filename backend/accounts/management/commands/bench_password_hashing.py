@@ -0,0 +1,93 @@
+import os
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth import hashers
+from django.core.management.base import BaseCommand
+
+ALGORITHMS = ('argon2', 'scrypt', 'pbkdf2_sha256')
+
+
+def _parse_params(values):
+    """``argon2:time_cost=3,memory_cost=65536`` -> ('argon2', {...})"""
+    settings_list = []
+    for value in values:
+        algorithm, _, spec = value.partition(':')
+        params = {key: int(number) for key, number in (item.split('=') for item in spec.split(',') if item)}
+        settings_list.append((algorithm, {**settings.PASSWORD_HASH_PARAMS.get(algorithm, {}), **params}))
+    return settings_list
+
+
+def hasher_with(algorithm, params):
+    """The configured hasher for ``algorithm``, with ``params`` as its costs"""
+    return type(hashers.get_hasher(algorithm))(params)
+
+
+def time_verify(algorithm, params, rounds=5):
+    """Median seconds to verify one password with ``params`` for ``algorithm``"""
+    hasher = hasher_with(algorithm, params)
+    encoded = hasher.encode('calibration-password', hasher.salt())
+    samples = []
+    for _ in range(rounds):
+        started = time.perf_counter()
+        hasher.verify('calibration-password', encoded)
+        samples.append(time.perf_counter() - started)
+    return statistics.median(samples)
+
+
+def _throughput(algorithm, params, threads, seconds):
+    """Verifies per second with ``threads`` threads verifying for ``seconds``"""
+    hasher = hasher_with(algorithm, params)
+    encoded = hasher.encode('bench-password', hasher.salt())
+    deadline = time.perf_counter() + seconds
+
+    def verify_until_deadline(_):
+        count = 0
+        while time.perf_counter() < deadline:
+            hasher.verify('bench-password', encoded)
+            count += 1
+        return count
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        total = sum(executor.map(verify_until_deadline, range(threads)))
+    return total / (time.perf_counter() - started)
+
+
+class Command(BaseCommand):
+    help = (
+        "Report password verify latency and logins/sec/core for each hasher setting "
+        "(configured costs by default)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('hasher_settings', nargs='*', metavar='setting',
+                            help="Settings to compare, e.g. argon2:time_cost=3,memory_cost=65536 "
+                                 "or scrypt:work_factor=32768 (default: each algorithm as configured)")
+        parser.add_argument('--threads', type=int, default=os.cpu_count(),
+                            help="Concurrent verifying threads for the throughput run")
+        parser.add_argument('--seconds', type=float, default=3)
+        parser.add_argument('--rounds', type=int, default=5)
+
+    def handle(self, *args, **options):
+        hasher_settings = _parse_params(options['hasher_settings']) or [
+            (algorithm, settings.PASSWORD_HASH_PARAMS.get(algorithm, {})) for algorithm in ALGORITHMS
+        ]
+        threads = options['threads']
+        cores = min(threads, os.cpu_count() or 1)
+
+        self.stdout.write(f"{'setting':<58}{'verify':>10}{'1 thread':>12}{f'{threads} threads':>14}{'per core':>11}")
+        for algorithm, params in hasher_settings:
+            label = f"{algorithm} " + ','.join(f'{key}={value}' for key, value in params.items())
+            latency = time_verify(algorithm, params, options['rounds'])
+            rate = _throughput(algorithm, params, threads, options['seconds'])
+            self.stdout.write(
+                f"{label:<58}{latency * 1000:>8.1f}ms{1 / latency:>10.1f}/s{rate:>12.1f}/s{rate / cores:>9.1f}/s"
+            )
+        if settings.PASSWORD_CHECK_WORKERS:
+            self.stdout.write(
+                f"Login hashing is capped at PASSWORD_CHECK_WORKERS={settings.PASSWORD_CHECK_WORKERS} "
+                "concurrent checks per process"
+            )
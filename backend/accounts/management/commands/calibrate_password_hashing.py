@@ -0,0 +1,86 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from .bench_password_hashing import time_verify
+
+ENV_NAMES = {
+    ('argon2', 'time_cost'): 'ARGON2_TIME_COST',
+    ('argon2', 'memory_cost'): 'ARGON2_MEMORY_COST',
+    ('argon2', 'parallelism'): 'ARGON2_PARALLELISM',
+    ('scrypt', 'work_factor'): 'SCRYPT_WORK_FACTOR',
+    ('scrypt', 'block_size'): 'SCRYPT_BLOCK_SIZE',
+    ('scrypt', 'parallelism'): 'SCRYPT_PARALLELISM',
+    ('pbkdf2_sha256', 'iterations'): 'PBKDF2_ITERATIONS',
+}
+
+# The parameter calibration scales, per algorithm; the others are kept as configured
+SCALED = {'argon2': 'time_cost', 'scrypt': 'work_factor', 'pbkdf2_sha256': 'iterations'}
+
+
+def _next_cost(algorithm, value):
+    """Next larger cost to try"""
+    if algorithm == 'scrypt':
+        return value * 2  # must stay a power of two
+    if algorithm == 'argon2':
+        return value + 1
+    return value + 50000
+
+
+class Command(BaseCommand):
+    help = (
+        "Find the largest password hashing cost whose verify time on this machine stays "
+        "within a target, and print the settings to deploy"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--algorithm', choices=sorted(SCALED), default=settings.PASSWORD_HASHER)
+        parser.add_argument('--target-ms', type=float, default=100,
+                            help="Verify time to aim for, per password, on one core")
+        parser.add_argument('--memory-cost', type=int, help="Argon2 memory in KiB (default: configured)")
+        parser.add_argument('--parallelism', type=int, help="Argon2/scrypt lanes (default: configured)")
+        parser.add_argument('--rounds', type=int, default=5, help="Verifies timed per candidate")
+
+    def handle(self, *args, **options):
+        algorithm = options['algorithm']
+        target = options['target_ms'] / 1000
+        params = dict(settings.PASSWORD_HASH_PARAMS.get(algorithm, {}))
+        if options['memory_cost'] and algorithm == 'argon2':
+            params['memory_cost'] = options['memory_cost']
+        if options['parallelism'] and algorithm in ('argon2', 'scrypt'):
+            params['parallelism'] = options['parallelism']
+        scaled = SCALED[algorithm]
+
+        # Start from the cheapest setting and grow the cost while it stays in budget
+        params[scaled] = {'argon2': 1, 'scrypt': 2 ** 12, 'pbkdf2_sha256': 100000}[algorithm]
+        elapsed = time_verify(algorithm, params, options['rounds'])
+        if elapsed > target:
+            raise CommandError(
+                f"{algorithm} already takes {elapsed * 1000:.1f}ms at {scaled}={params[scaled]}; "
+                "raise the target or lower the memory cost"
+            )
+        if algorithm == 'pbkdf2_sha256':
+            # Iterations scale linearly: jump close to the target before stepping
+            params[scaled] = max(100000, int(params[scaled] * target / elapsed) // 10000 * 10000)
+            elapsed = time_verify(algorithm, params, options['rounds'])
+            while elapsed > target:
+                params[scaled] -= 10000
+                elapsed = time_verify(algorithm, params, options['rounds'])
+        else:
+            while True:
+                candidate = {**params, scaled: _next_cost(algorithm, params[scaled])}
+                candidate_elapsed = time_verify(algorithm, candidate, options['rounds'])
+                self.stdout.write(f"  {scaled}={candidate[scaled]}: {candidate_elapsed * 1000:.1f}ms")
+                if candidate_elapsed > target:
+                    break
+                params, elapsed = candidate, candidate_elapsed
+
+        current = settings.PASSWORD_HASH_PARAMS.get(algorithm, {})
+        current_elapsed = time_verify(algorithm, current, options['rounds']) if current else None
+        self.stdout.write(
+            f"{algorithm}: {elapsed * 1000:.1f}ms per verify ({1 / elapsed:.1f} logins/s/core)"
+            + (f", configured costs take {current_elapsed * 1000:.1f}ms" if current_elapsed else "")
+        )
+        self.stdout.write("Set these in the environment; existing hashes are upgraded on next login:")
+        self.stdout.write(f"  PASSWORD_HASHER={algorithm}")
+        for name, value in params.items():
+            self.stdout.write(f"  {ENV_NAMES[(algorithm, name)]}={value}")
@@ -0,0 +1,37 @@
+import os
+
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ec, ed25519, rsa
+from django.core.management.base import BaseCommand, CommandError
+
+from accounts.jwt_keys import SigningKey
+
+_GENERATORS = {
+    'EdDSA': ed25519.Ed25519PrivateKey.generate,
+    'ES256': lambda: ec.generate_private_key(ec.SECP256R1()),
+    'RS256': lambda: rsa.generate_private_key(public_exponent=65537, key_size=3072),
+}
+
+
+class Command(BaseCommand):
+    help = "Write a new JWT signing key (PEM) for JWT_SIGNING_KEY_FILES and print its kid"
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="Where to write the private key; must not exist")
+        parser.add_argument('--algorithm', choices=sorted(_GENERATORS), default='EdDSA',
+                            help="EdDSA verifies fastest and has the smallest tokens; RS256 is the most widely supported")
+
+    def handle(self, *args, **options):
+        key = SigningKey(_GENERATORS[options['algorithm']]())
+        pem = key.private_key.private_bytes(
+            serialization.Encoding.PEM,
+            serialization.PrivateFormat.PKCS8,
+            serialization.NoEncryption(),
+        )
+        try:
+            fd = os.open(options['path'], os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+        except FileExistsError:
+            raise CommandError(f"{options['path']} already exists")
+        with os.fdopen(fd, 'wb') as key_file:
+            key_file.write(pem)
+        self.stdout.write(self.style.SUCCESS(f"Wrote {key.algorithm} key {key.kid} to {options['path']}"))
@@ -0,0 +1,28 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+from django.utils import timezone
+
+from accounts.models import EmailOTP
+
+
+class Command(BaseCommand):
+    help = "Delete used and expired EmailOTP rows in batches (run periodically, e.g. hourly from cron)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--older-than-minutes', type=int,
+                            help="Also keep unused rows younger than this (default: OTP_TTL_SECONDS)")
+        parser.add_argument('--batch-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        keep = options['older_than_minutes']
+        age = timedelta(minutes=keep) if keep is not None else timedelta(seconds=settings.OTP_TTL_SECONDS)
+        stale = EmailOTP.objects.filter(Q(is_used=True) | Q(created_at__lt=timezone.now() - age))
+
+        deleted = 0
+        # Short batches keep each DELETE's locks brief on a large table
+        while ids := list(stale.order_by('id').values_list('id', flat=True)[:options['batch_size']]):
+            deleted += EmailOTP.objects.filter(id__in=ids).delete()[0]
+        self.stdout.write(self.style.SUCCESS(f"Deleted {deleted} EmailOTP rows"))
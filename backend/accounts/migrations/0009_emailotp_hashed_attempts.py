@@ -0,0 +1,27 @@
+# Generated by Django 4.2.25 on 2026-10-19 15:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0008_customuser_gmail_privacy_accepted'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='emailotp',
+            name='attempts',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.AlterField(
+            model_name='emailotp',
+            name='otp',
+            field=models.CharField(max_length=64),
+        ),
+        migrations.AddIndex(
+            model_name='emailotp',
+            index=models.Index(fields=['user', 'is_used', 'created_at'], name='emailotp_user_unused_idx'),
+        ),
+    ]
@@ -0,0 +1,56 @@
+from django.conf import settings
+from django.db import migrations
+
+INDEX_NAME = 'auth_user_email_lower_uniq'
+
+
+def create_index(apps, schema_editor):
+    connection = schema_editor.connection
+    table = schema_editor.quote_name(apps.get_model(settings.AUTH_USER_MODEL)._meta.db_table)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"SELECT lower(email) FROM {table} WHERE email > '' "
+            f"GROUP BY lower(email) HAVING count(*) > 1 LIMIT 10"
+        )
+        duplicates = [row[0] for row in cursor.fetchall()]
+        if duplicates:
+            raise RuntimeError(
+                f"Users share these emails (ignoring case): {', '.join(duplicates)}. "
+                f"Merge or change them before creating {INDEX_NAME}."
+            )
+        # Blank emails stay allowed, and any number of users may have one.
+        # The predicate is spelled as users_by_email() filters, so planners
+        # match it without having to prove an implication.
+        # CONCURRENTLY keeps sign-ups and logins running while a large table is indexed
+        concurrently = 'CONCURRENTLY ' if connection.vendor == 'postgresql' else ''
+        if connection.vendor == 'postgresql':
+            # A failed concurrent build leaves an INVALID index behind that
+            # enforces nothing, and IF NOT EXISTS would keep it on a retry
+            cursor.execute("SELECT indisvalid FROM pg_index WHERE indexrelid = to_regclass(%s)", [INDEX_NAME])
+            row = cursor.fetchone()
+            if row is not None and not row[0]:
+                cursor.execute(f"DROP INDEX CONCURRENTLY {INDEX_NAME}")
+        cursor.execute(
+            f"CREATE UNIQUE INDEX {concurrently}IF NOT EXISTS {INDEX_NAME} "
+            f"ON {table} (lower(email)) WHERE email > ''"
+        )
+
+
+def drop_index(apps, schema_editor):
+    concurrently = 'CONCURRENTLY ' if schema_editor.connection.vendor == 'postgresql' else ''
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(f"DROP INDEX {concurrently}IF EXISTS {INDEX_NAME}")
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY can't run inside a transaction
+    atomic = False
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('accounts', '0010_revoked_token'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_index, drop_index),
+    ]
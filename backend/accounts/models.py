@@ -1,6 +1,7 @@
 from django.contrib.auth.models import User
+from django.conf import settings
 from django.db import models
-import random
+import secrets
 from datetime import timedelta
 from django.utils import timezone
 from rest_framework.permissions import BasePermission
@@ -31,18 +32,40 @@ class CustomUser(models.Model):
         return bool(self.gmail_refresh_token)
 
 class EmailOTP(models.Model):
+    """OTP rows for OTP_STORE='db' (see accounts/otp.py); ``otp`` holds an HMAC, not the code"""
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='email_otps')
-    otp = models.CharField(max_length=6)
+    otp = models.CharField(max_length=64)
     created_at = models.DateTimeField(auto_now_add=True)
     is_used = models.BooleanField(default=False)
+    attempts = models.PositiveSmallIntegerField(default=0)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'is_used', 'created_at'], name='emailotp_user_unused_idx'),
+        ]
 
     def is_expired(self):
-        # OTP valid for 5 minutes
-        return timezone.now() > self.created_at + timedelta(minutes=5)
+        return timezone.now() > self.created_at + timedelta(seconds=getattr(settings, 'OTP_TTL_SECONDS', 300))
 
     @staticmethod
     def generate_otp():
-        return str(random.randint(100000, 999999))
+        return f'{secrets.randbelow(1000000):06d}'
+
+
+class RevokedToken(models.Model):
+    """
+    Revoked JWTs (by ``jti``) and per-user cutoffs (``not_before``: tokens
+    issued before that whole second are revoked). Rows are only needed until the tokens
+    they cover expire; see accounts/revocation.py.
+    """
+    jti = models.CharField(max_length=255, unique=True, null=True, blank=True)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, null=True, blank=True, related_name='revoked_tokens')
+    not_before = models.DateTimeField(null=True, blank=True)
+    expires_at = models.DateTimeField(db_index=True)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    def __str__(self):
+        return self.jti or f"user {self.user_id} before {self.not_before}"
 
 
 class IsCustomAdmin(BasePermission):
@@ -0,0 +1,135 @@
+"""
+Email OTP issue and verification.
+
+OTPs are stored as an HMAC of the normalized email and the code, never in
+clear, with an expiry and an attempt counter. Every check counts an attempt
+before comparing the code, and only a check that got its increment in under
+``OTP_MAX_ATTEMPTS`` is compared, so concurrent guesses can't get past the
+cap. ``OTP_STORE`` selects where:
+
+``db`` (default)
+    ``EmailOTP`` rows: one query for the user's latest unused code, found
+    through the ``lower(email)`` index, and a conditional ``UPDATE`` for the
+    attempt. Issuing a code retires the previous ones, and
+    ``purge_email_otps`` deletes used and expired rows.
+``cache``
+    One cache entry per email plus an attempt counter bumped with
+    ``cache.incr``. Needs a cache shared by all workers (Redis or
+    Memcached through ``CACHE_BACKEND``); the ``accounts.E001`` system check
+    rejects it with the per-process LocMem cache.
+"""
+import hashlib
+import hmac
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import EmailOTP
+from .utils import normalize_email, users_by_email
+
+
+class OTPError(Exception):
+    """Verification failed; the message is safe to show to the client"""
+
+
+def _digest(email, code):
+    message = f'{normalize_email(email)}:{code}'.encode()
+    return hmac.new(settings.SECRET_KEY.encode(), message, hashlib.sha256).hexdigest()
+
+
+def _ttl():
+    return getattr(settings, 'OTP_TTL_SECONDS', 300)
+
+
+def _max_attempts():
+    return getattr(settings, 'OTP_MAX_ATTEMPTS', 5)
+
+
+class CacheOTPStore:
+    # Entries outlive the OTP a little so late attempts get "expired", not "invalid"
+    grace_seconds = 300
+
+    def _keys(self, email):
+        key = hashlib.blake2b(normalize_email(email).encode(), digest_size=16).hexdigest()
+        return f'otp:{key}', f'otp:{key}:attempts'
+
+    def save(self, user, digest):
+        code_key, attempts_key = self._keys(user.email)
+        expires_at = timezone.now().timestamp() + _ttl()
+        cache.set(code_key, {'user_id': user.id, 'digest': digest, 'expires_at': expires_at},
+                  _ttl() + self.grace_seconds)
+        cache.delete(attempts_key)
+
+    def check(self, email, digest):
+        code_key, attempts_key = self._keys(email)
+        entry = cache.get(code_key)
+        if entry is None:
+            raise OTPError("Invalid OTP")
+        if timezone.now().timestamp() > entry['expires_at']:
+            raise OTPError("OTP expired")
+        cache.add(attempts_key, 0, _ttl() + self.grace_seconds)
+        try:
+            attempt = cache.incr(attempts_key)
+        except ValueError:
+            # The counter expired or was reset by a successful check in between
+            raise OTPError("Invalid OTP")
+        if attempt > _max_attempts():
+            raise OTPError("Too many attempts, request a new OTP")
+        if not hmac.compare_digest(entry['digest'], digest):
+            raise OTPError("Invalid OTP")
+        cache.delete_many([code_key, attempts_key])
+        return entry['user_id']
+
+
+class DatabaseOTPStore:
+    def save(self, user, digest):
+        with transaction.atomic():
+            EmailOTP.objects.filter(user=user, is_used=False).update(is_used=True)
+            EmailOTP.objects.create(user=user, otp=digest)
+
+    def check(self, email, digest):
+        entry = (
+            EmailOTP.objects.filter(user__in=users_by_email(email).values('id'), is_used=False)
+            .order_by('-created_at')
+            .values('id', 'user_id', 'otp', 'attempts', 'created_at')
+            .first()
+        )
+        if entry is None:
+            raise OTPError("Invalid OTP")
+        if timezone.now() > entry['created_at'] + timedelta(seconds=_ttl()):
+            raise OTPError("OTP expired")
+        # Claim the attempt before comparing: the WHERE clause makes the cap
+        # hold however many checks run at once
+        counted = EmailOTP.objects.filter(
+            id=entry['id'], is_used=False, attempts__lt=_max_attempts(),
+        ).update(attempts=F('attempts') + 1)
+        if not counted:
+            raise OTPError("Too many attempts, request a new OTP")
+        if not hmac.compare_digest(entry['otp'], digest):
+            raise OTPError("Invalid OTP")
+        # Single use: only one concurrent verification can flip the flag
+        if not EmailOTP.objects.filter(id=entry['id'], is_used=False).update(is_used=True):
+            raise OTPError("Invalid OTP")
+        return entry['user_id']
+
+
+def get_otp_store():
+    if getattr(settings, 'OTP_STORE', 'db') == 'cache':
+        return CacheOTPStore()
+    return DatabaseOTPStore()
+
+
+def issue_otp(user):
+    """Store a new OTP for ``user`` (replacing any earlier one) and return the code"""
+    code = EmailOTP.generate_otp()
+    get_otp_store().save(user, _digest(user.email, code))
+    return code
+
+
+def verify_otp(email, code):
+    """Consume the OTP sent to ``email``; return the user id or raise OTPError"""
+    return get_otp_store().check(email, _digest(email, code))
@@ -0,0 +1,127 @@
+"""
+JWT revocation without a query per request.
+
+Logout writes the token's ``jti`` to ``RevokedToken``; "log out everywhere"
+writes a per-user cutoff that revokes every token issued before that second
+(``iat`` is a whole second, so the cutoff is rounded down to one: a token
+issued later in the same second, such as the next login, stays valid).
+Each worker keeps the unexpired rows in memory (a dict of jti -> expiry and
+one of user -> cutoff) and pulls rows created since its last sync at most
+every ``TOKEN_REVOCATION_SYNC_SECONDS``, so a revocation made on another
+worker takes effect within that interval and immediately on the worker that
+made it. Entries are dropped from memory once the token would have expired
+anyway, and expired rows are deleted as new revocations are written.
+"""
+import threading
+import time
+from datetime import datetime, timedelta
+from datetime import timezone as dt_timezone
+
+from django.conf import settings
+from django.utils import timezone
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+
+from core.db_routers import PRIMARY_DB
+from .models import RevokedToken
+
+# Rows can commit out of created_at order; re-read this much of the past on every sync
+SYNC_OVERLAP = timedelta(seconds=60)
+
+
+class RevocationList:
+    """Per-process view of RevokedToken, refreshed incrementally"""
+
+    def __init__(self):
+        self._jtis = {}          # jti -> expiry timestamp
+        self._user_cutoffs = {}  # user id -> (cutoff whole-second timestamp, expiry timestamp)
+        self._synced_at = None
+        self._next_sync = 0.0
+        self._lock = threading.Lock()
+
+    def is_revoked(self, token):
+        self._maybe_sync()
+        if token.get(jwt_settings.JTI_CLAIM) in self._jtis:
+            return True
+        cutoff = self._user_cutoffs.get(token.get(jwt_settings.USER_ID_CLAIM))
+        return cutoff is not None and token.get('iat', 0) < cutoff[0]
+
+    def add_token(self, jti, expires_at):
+        self._jtis[jti] = expires_at
+
+    def add_user_cutoff(self, user_id, cutoff, expires_at):
+        current = self._user_cutoffs.get(user_id)
+        if current is None or current[0] < cutoff:
+            self._user_cutoffs[user_id] = (cutoff, expires_at)
+
+    def _maybe_sync(self):
+        if time.monotonic() < self._next_sync:
+            return
+        # The first load blocks; later ones are skipped while another thread syncs
+        if not self._lock.acquire(blocking=self._synced_at is None):
+            return
+        try:
+            if time.monotonic() >= self._next_sync:
+                self.sync()
+        finally:
+            self._lock.release()
+
+    def sync(self):
+        now = timezone.now()
+        rows = RevokedToken.objects.using(PRIMARY_DB).filter(expires_at__gt=now)
+        if self._synced_at is not None:
+            rows = rows.filter(created_at__gte=self._synced_at - SYNC_OVERLAP)
+        for jti, user_id, not_before, expires_at in rows.values_list('jti', 'user_id', 'not_before', 'expires_at'):
+            if jti:
+                self.add_token(jti, expires_at.timestamp())
+            elif user_id is not None and not_before is not None:
+                self.add_user_cutoff(user_id, int(not_before.timestamp()), expires_at.timestamp())
+
+        now_ts = now.timestamp()
+        self._jtis = {jti: exp for jti, exp in self._jtis.items() if exp > now_ts}
+        self._user_cutoffs = {user: entry for user, entry in self._user_cutoffs.items() if entry[1] > now_ts}
+        self._synced_at = now
+        self._next_sync = time.monotonic() + getattr(settings, 'TOKEN_REVOCATION_SYNC_SECONDS', 5)
+
+    def reset(self):
+        with self._lock:
+            self.__init__()
+
+
+revocations = RevocationList()
+
+
+def is_token_revoked(token):
+    return revocations.is_revoked(token)
+
+
+def _purge_expired():
+    RevokedToken.objects.filter(expires_at__lte=timezone.now()).delete()
+
+
+def revoke_tokens(tokens):
+    """Revoke access and/or refresh tokens until they expire"""
+    rows = [
+        RevokedToken(
+            jti=token[jwt_settings.JTI_CLAIM],
+            user_id=token.get(jwt_settings.USER_ID_CLAIM),
+            expires_at=datetime.fromtimestamp(token['exp'], tz=dt_timezone.utc),
+        )
+        for token in tokens
+    ]
+    if not rows:
+        return
+    RevokedToken.objects.bulk_create(rows, ignore_conflicts=True)
+    _purge_expired()
+    for row in rows:
+        revocations.add_token(row.jti, row.expires_at.timestamp())
+
+
+def revoke_user_tokens(user_id):
+    """Revoke every token issued to the user before the current second"""
+    now = timezone.now()
+    not_before = now.replace(microsecond=0)
+    # No token issued before now outlives the refresh lifetime
+    expires_at = now + jwt_settings.REFRESH_TOKEN_LIFETIME
+    RevokedToken.objects.create(user_id=user_id, not_before=not_before, expires_at=expires_at)
+    _purge_expired()
+    revocations.add_user_cutoff(user_id, int(not_before.timestamp()), expires_at.timestamp())
@@ -1,8 +1,15 @@
 from rest_framework import serializers
 from django.contrib.auth.models import User
-from .models import CustomUser, EmailOTP
+from .models import CustomUser
+from .otp import OTPError, issue_otp, verify_otp
+from .revocation import is_token_revoked
+from .utils import create_user_with_unique_username, get_user_by_email, users_by_email
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.serializers import TokenRefreshSerializer
 from django.contrib.auth import authenticate
+from django.db import IntegrityError
 from django.contrib.auth.password_validation import validate_password
+from core.instrumentation import TimedSerializerMixin
 
 class RegisterSerializer(serializers.ModelSerializer):
     phone_number = serializers.CharField(required=False, allow_blank=True)
@@ -22,6 +29,11 @@ class RegisterSerializer(serializers.ModelSerializer):
             'role',
         )
 
+    def validate_email(self, value):
+        if users_by_email(value).exists():
+            raise serializers.ValidationError("A user with this email already exists.")
+        return value
+
     def validate(self, attrs):
         if attrs['password'] != attrs['confirm_password']:
             raise serializers.ValidationError({"password": "Password fields didn't match."})
@@ -32,17 +44,18 @@ class RegisterSerializer(serializers.ModelSerializer):
         validated_data.pop('confirm_password', None)
         email = validated_data.get('email')
 
-        # generate username from email
-        username = email.split('@')[0]
-
-        user = User.objects.create_user(
-            username=username,
-            password=validated_data['password'],
-            email=email,
-            first_name=validated_data.get('first_name', ''),
-            last_name=validated_data.get('last_name', ''),
-            is_active=True
-        )
+        # username generated from email
+        try:
+            user = create_user_with_unique_username(
+                email,
+                password=validated_data['password'],
+                first_name=validated_data.get('first_name', ''),
+                last_name=validated_data.get('last_name', ''),
+                is_active=True
+            )
+        except IntegrityError:
+            # Lost a race with a concurrent registration of the same email
+            raise serializers.ValidationError({"email": "A user with this email already exists."})
 
         CustomUser.objects.create(
             user=user,
@@ -53,7 +66,7 @@ class RegisterSerializer(serializers.ModelSerializer):
 
         return user
     
-class UserSerializer(serializers.ModelSerializer):
+class UserSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     phone_number = serializers.CharField(source='custom_user.phone_number', read_only=True)
     role = serializers.CharField(source='custom_user.role', read_only=True)
     is_verified = serializers.BooleanField(source='custom_user.is_verified', read_only=True)
@@ -75,7 +88,7 @@ class UserSerializer(serializers.ModelSerializer):
     def get_coin_balance(self, obj):
         """Get user's current coin balance"""
         if hasattr(obj, 'wallet'):
-            return obj.wallet.coin_balance
+            return obj.wallet.total_balance
         return 0
     
     def get_total_coins_earned(self, obj):
@@ -111,9 +124,8 @@ class LoginSerializer(serializers.Serializer):
         # if not User.objects.filter(username=username).exists():
             # raise serializers.ValidationError("User does not exist.")
 
-        try:
-            user_obj = User.objects.get(email=email)
-        except User.DoesNotExist:
+        user_obj = get_user_by_email(email)
+        if user_obj is None:
             raise serializers.ValidationError("Invalid email or password.")
 
         # Authenticate using username internally
@@ -131,16 +143,16 @@ class LoginSerializer(serializers.Serializer):
 class SendOTPSerializer(serializers.Serializer):
     email = serializers.EmailField()
 
-    def validate_email(self, value):
-        if not User.objects.filter(email=value).exists():
-            raise serializers.ValidationError("User with this email does not exist.")
-        return value
+    def validate(self, attrs):
+        user = get_user_by_email(attrs["email"])
+        if user is None:
+            raise serializers.ValidationError({"email": "User with this email does not exist."})
+        attrs["user"] = user
+        return attrs
 
     def create(self, validated_data):
         email = validated_data["email"]
-        user = User.objects.get(email=email)
-        otp_code = EmailOTP.generate_otp()
-        EmailOTP.objects.create(user=user, otp=otp_code)
+        otp_code = issue_otp(validated_data["user"])
 
         # send the OTP email
         from django.core.mail import send_mail
@@ -162,26 +174,23 @@ class VerifyOTPSerializer(serializers.Serializer):
         otp = data.get("otp")
 
         try:
-            user = User.objects.get(email=email)
-        except User.DoesNotExist:
-            raise serializers.ValidationError("User not found")
+            user_id = verify_otp(email, otp)
+        except OTPError as e:
+            raise serializers.ValidationError(str(e))
 
-        otp_entry = EmailOTP.objects.filter(user=user, otp=otp, is_used=False).last()
-        if not otp_entry:
-            raise serializers.ValidationError("Invalid OTP")
+        # mark verified
+        CustomUser.objects.filter(user_id=user_id).update(is_verified=True)
 
-        if otp_entry.is_expired():
-            raise serializers.ValidationError("OTP expired")
+        return {"message": "Email verified successfully!"}
 
-        otp_entry.is_used = True
-        otp_entry.save()
 
-        # mark verified
-        custom_user = user.custom_user
-        custom_user.is_verified = True
-        custom_user.save()
+class CookieTokenRefreshSerializer(TokenRefreshSerializer):
+    """TokenRefreshSerializer that refuses revoked refresh tokens"""
 
-        return {"message": "Email verified successfully!"}
+    def validate(self, attrs):
+        if is_token_revoked(self.token_class(attrs["refresh"])):
+            raise InvalidToken("Token has been revoked")
+        return super().validate(attrs)
 
 
 class GoogleLoginSerializer(serializers.Serializer):
@@ -1,3 +1,118 @@
-from django.test import TestCase
+from django.contrib.auth.hashers import check_password, make_password
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+from rest_framework_simplejwt.tokens import AccessToken
 
-# Create your tests here.
+from core.query_budgets import QueryBudgetMixin
+
+from .checks import check_otp_store
+from .hashers import Argon2PasswordHasher, PBKDF2PasswordHasher, ScryptPasswordHasher
+from .otp import OTPError, issue_otp, verify_otp
+from .revocation import is_token_revoked, revocations, revoke_user_tokens
+from .throttling import LoginThrottle, get_store
+
+
+@override_settings(AUTH_THROTTLE_STORE='local', AUTH_THROTTLE_RATES={'login': {'ip': '2/min'}})
+class ThrottleIdentityTests(SimpleTestCase):
+    def setUp(self):
+        get_store().clear()
+        self.addCleanup(get_store().clear)
+
+    def _allowed(self, forwarded_for):
+        request = Request(APIRequestFactory().post(
+            '/api/accounts/login/', REMOTE_ADDR='203.0.113.7', HTTP_X_FORWARDED_FOR=forwarded_for,
+        ))
+        return LoginThrottle().allow_request(request, None)
+
+    def test_forwarded_for_is_ignored_without_trusted_proxies(self):
+        results = [self._allowed(f'198.51.100.{i}') for i in range(3)]
+        self.assertEqual(results, [True, True, False])
+
+
+class OTPStoreCheckTests(SimpleTestCase):
+    @override_settings(OTP_STORE='cache', CACHES={'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }})
+    def test_cache_store_needs_a_shared_cache(self):
+        self.assertEqual([error.id for error in check_otp_store(None)], ['accounts.E001'])
+
+    @override_settings(OTP_STORE='db')
+    def test_db_store_needs_no_cache(self):
+        self.assertEqual(check_otp_store(None), [])
+
+
+class TunableHasherTests(SimpleTestCase):
+    @override_settings(PASSWORD_HASH_PARAMS={'pbkdf2_sha256': {'iterations': 2000}})
+    def test_explicit_params_win_over_settings(self):
+        self.assertEqual(PBKDF2PasswordHasher().iterations, 2000)
+        self.assertEqual(PBKDF2PasswordHasher({'iterations': 1000}).iterations, 1000)
+
+    @override_settings(PASSWORD_HASHERS=['accounts.hashers.Argon2PasswordHasher', 'accounts.hashers.ScryptPasswordHasher'])
+    def test_make_and_check_password(self):
+        for algorithm in ('argon2', 'scrypt'):
+            with self.subTest(algorithm=algorithm):
+                encoded = make_password('correct horse', hasher=algorithm)
+                self.assertTrue(encoded.startswith(f'{algorithm}$'))
+                self.assertTrue(check_password('correct horse', encoded))
+                self.assertFalse(check_password('wrong horse', encoded))
+
+    def test_explicit_costs_round_trip(self):
+        for hasher in (Argon2PasswordHasher({'time_cost': 1, 'memory_cost': 1024, 'parallelism': 1}),
+                       ScryptPasswordHasher({'work_factor': 1024, 'block_size': 8, 'parallelism': 1})):
+            with self.subTest(algorithm=hasher.algorithm):
+                encoded = hasher.encode('correct horse', hasher.salt())
+                self.assertTrue(hasher.verify('correct horse', encoded))
+                self.assertFalse(hasher.must_update(encoded))
+
+
+class UserCutoffTests(TestCase):
+    def setUp(self):
+        revocations.reset()
+        self.addCleanup(revocations.reset)
+        self.user = User.objects.create_user('member', 'member@example.com')
+
+    def test_cutoff_revokes_earlier_tokens_only(self):
+        earlier = AccessToken.for_user(self.user)
+        earlier['iat'] -= 1
+        revoke_user_tokens(self.user.id)
+        # Issued in the same whole second as the cutoff, e.g. the next login
+        later = AccessToken.for_user(self.user)
+        self.assertTrue(is_token_revoked(earlier))
+        self.assertFalse(is_token_revoked(later))
+
+
+@override_settings(OTP_MAX_ATTEMPTS=3)
+class OTPAttemptTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('member', 'member@example.com')
+
+    def _assert_locked_out_after_max_attempts(self):
+        code = issue_otp(self.user)
+        wrong = f'{(int(code) + 1) % 1000000:06d}'
+        for _ in range(3):
+            with self.assertRaisesMessage(OTPError, 'Invalid OTP'):
+                verify_otp(self.user.email, wrong)
+        with self.assertRaisesMessage(OTPError, 'Too many attempts'):
+            verify_otp(self.user.email, code)
+
+    def test_db_store_caps_attempts(self):
+        with self.settings(OTP_STORE='db'):
+            self._assert_locked_out_after_max_attempts()
+
+    def test_cache_store_caps_attempts(self):
+        with self.settings(OTP_STORE='cache'):
+            self._assert_locked_out_after_max_attempts()
+
+    def test_correct_code_within_the_cap(self):
+        code = issue_otp(self.user)
+        self.assertEqual(verify_otp(self.user.email, code), self.user.id)
+        with self.assertRaisesMessage(OTPError, 'Invalid OTP'):
+            verify_otp(self.user.email, code)
+
+
+class QueryBudgetTests(QueryBudgetMixin, TransactionTestCase):
+    urlconf = 'accounts.urls'
@@ -0,0 +1,174 @@
+"""
+Throttles for the unauthenticated login and OTP endpoints.
+
+Each scope in ``AUTH_THROTTLE_RATES`` limits requests per client IP, per
+submitted email and across all clients (``global``), e.g.
+``{'login': {'ip': '20/min', 'email': '10/min', 'global': '50/s'}}``. Rates
+are ``count/period`` with an optional period multiplier (``3/10min``).
+The client IP is ``REMOTE_ADDR``, or the ``X-Forwarded-For`` entry added by
+the outermost of ``NUM_PROXIES`` trusted proxies.
+
+DRF checks throttles before the view runs, so a rejected request costs no
+password hashing, SMTP send or query. Two stores are available through
+``AUTH_THROTTLE_STORE``:
+
+``local`` (default)
+    Token buckets in process memory: a dict lookup and some arithmetic under
+    a lock. Limits apply per worker process, so divide the rates by the
+    number of workers when sizing them.
+``cache``
+    Sliding-window counters in the ``AUTH_THROTTLE_CACHE`` cache alias
+    (Redis/Memcached), shared by all processes, at a few cache round-trips
+    per check.
+"""
+import hashlib
+import re
+import threading
+import time
+from collections import OrderedDict
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework.throttling import BaseThrottle
+
+from core.metrics import THROTTLED_REQUESTS
+
+_PERIODS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+_RATE_RE = re.compile(r'^\s*(\d+)\s*/\s*(\d*)\s*([smhd])[a-z]*\s*$')
+
+
+@lru_cache(maxsize=None)
+def parse_rate(rate):
+    """``'3/10min'`` -> ``(3, 600.0)``: requests allowed per period in seconds"""
+    match = _RATE_RE.match(rate)
+    if not match:
+        raise ValueError(f"Invalid throttle rate {rate!r}; expected e.g. '10/min' or '3/10m'")
+    count, multiplier, unit = match.groups()
+    return int(count), float(int(multiplier or 1) * _PERIODS[unit])
+
+
+class LocalBucketStore:
+    """In-process token buckets, evicting the least recently used keys past ``max_keys``"""
+
+    def __init__(self, max_keys=100000):
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def consume(self, key, limit, period):
+        """Take a token; return 0 if allowed, else the seconds until one is available"""
+        now = time.monotonic()
+        refill = limit / period
+        with self._lock:
+            tokens, updated = self._buckets.pop(key, (limit, now))
+            tokens = min(limit, tokens + (now - updated) * refill)
+            if tokens >= 1:
+                self._buckets[key] = (tokens - 1, now)
+                wait = 0.0
+            else:
+                self._buckets[key] = (tokens, now)
+                wait = (1 - tokens) / refill
+            if len(self._buckets) > self.max_keys:
+                # Idle buckets have refilled anyway
+                self._buckets.popitem(last=False)
+        return wait
+
+    def clear(self):
+        with self._lock:
+            self._buckets.clear()
+
+
+class CacheWindowStore:
+    """Sliding-window counters in a shared Django cache"""
+
+    def __init__(self, alias):
+        self.alias = alias
+
+    def consume(self, key, limit, period):
+        cache = caches[self.alias]
+        now = time.time()
+        window = int(now // period)
+        current_key = f'throttle:{key}:{window}'
+        cache.add(current_key, 0, timeout=int(period * 2) + 1)
+        try:
+            count = cache.incr(current_key)
+        except ValueError:
+            # Evicted between add() and incr()
+            cache.set(current_key, 1, timeout=int(period * 2) + 1)
+            count = 1
+        previous = cache.get(f'throttle:{key}:{window - 1}', 0)
+        # Weight the previous window by how much of it still overlaps the last `period` seconds
+        elapsed = now - window * period
+        if previous * (1 - elapsed / period) + count <= limit:
+            return 0.0
+        return period - elapsed
+
+    def clear(self):
+        caches[self.alias].clear()
+
+
+_local_store = LocalBucketStore()
+
+
+def get_store():
+    if getattr(settings, 'AUTH_THROTTLE_STORE', 'local') == 'cache':
+        return CacheWindowStore(getattr(settings, 'AUTH_THROTTLE_CACHE', 'default'))
+    return _local_store
+
+
+def _email_key(email):
+    # Fixed-length and cache-key safe
+    return hashlib.blake2b(email.strip().lower().encode(), digest_size=12).hexdigest()
+
+
+class AuthRateThrottle(BaseThrottle):
+    """Per-IP, per-email and global limits for ``scope`` from AUTH_THROTTLE_RATES"""
+    scope = None
+    email_field = 'email'
+
+    def get_identities(self, request):
+        yield 'ip', self.get_ident(request)
+        if self.email_field:
+            email = request.data.get(self.email_field) if hasattr(request.data, 'get') else None
+            yield 'email', _email_key(email) if isinstance(email, str) and email.strip() else None
+        yield 'global', ''
+
+    def allow_request(self, request, view):
+        if not getattr(settings, 'AUTH_THROTTLE_ENABLED', True):
+            return True
+        rates = getattr(settings, 'AUTH_THROTTLE_RATES', {}).get(self.scope)
+        if not rates:
+            return True
+        store = get_store()
+        for dimension, ident in self.get_identities(request):
+            rate = rates.get(dimension)
+            if rate is None or ident is None:
+                continue
+            limit, period = parse_rate(rate)
+            self._wait = store.consume(f'{self.scope}:{dimension}:{ident}', limit, period)
+            if self._wait:
+                THROTTLED_REQUESTS.labels(self.scope, dimension).inc()
+                return False
+        return True
+
+    def wait(self):
+        return getattr(self, '_wait', None)
+
+
+class LoginThrottle(AuthRateThrottle):
+    scope = 'login'
+
+
+class GoogleLoginThrottle(AuthRateThrottle):
+    scope = 'google_login'
+    # The email is only known after verifying the token with Google
+    email_field = None
+
+
+class OTPSendThrottle(AuthRateThrottle):
+    scope = 'otp_send'
+
+
+class OTPVerifyThrottle(AuthRateThrottle):
+    scope = 'otp_verify'
@@ -6,6 +6,7 @@ from .views import (
     ProfileView,
     DashboardView,
     CookieTokenRefreshView,
+    SessionBootstrapView,
     LogoutView,
     SendOTPEmailView,   
     VerifyOTPEmailView,
@@ -23,6 +24,7 @@ urlpatterns = [
     path('profile/', ProfileView.as_view(), name='profile'),
     path('dashboard/', DashboardView.as_view(), name='dashboard'),
     path('refresh/', CookieTokenRefreshView.as_view(), name='token_refresh'),
+    path('bootstrap/', SessionBootstrapView.as_view(), name='session-bootstrap'),
     path('logout/', LogoutView.as_view(), name='logout'),
     path('send-email/', SendOTPEmailView.as_view(), name='send-email'),
     path('verify-email/', VerifyOTPEmailView.as_view(), name='verify-email'),
@@ -1,4 +1,16 @@
 # Utility functions for user accounts
+import re
+import secrets
+
+from django.contrib.auth.models import User
+from django.db import IntegrityError, transaction
+from django.db.models import BigIntegerField, Count, Max, Q
+from django.db.models.functions import Cast, Lower, Substr
+
+USERNAME_MAX_LENGTH = User._meta.get_field('username').max_length
+# Room left after the base for a numeric suffix
+USERNAME_SUFFIX_DIGITS = 9
+USERNAME_ATTEMPTS = 4
 
 
 def get_user_phone_number(user):
@@ -15,4 +27,79 @@ def get_user_phone_number(user):
 def get_user_full_name(user):
     """Get user's full name or fallback to username"""
     full_name = f'{user.first_name} {user.last_name}'.strip()
-    return full_name if full_name else user.username
\ No newline at end of file
+    return full_name if full_name else user.username
+
+
+def normalize_email(email):
+    return email.strip().lower()
+
+
+def users_by_email(email, queryset=None):
+    """
+    Users whose email matches ``email`` case-insensitively.
+
+    Filters on ``lower(email)`` with the ``email > ''`` predicate of the
+    unique partial index ``auth_user_email_lower_uniq`` (migration 0011), so
+    the lookup is an index probe returning at most one row.
+    """
+    queryset = User.objects.all() if queryset is None else queryset
+    return queryset.alias(email_lower=Lower('email')).filter(
+        email_lower=normalize_email(email), email__gt=''
+    )
+
+
+def get_user_by_email(email, queryset=None):
+    """The user with this email, ignoring case, or None"""
+    # No first(): its ORDER BY id could steer the planner off the email index
+    users = list(users_by_email(email, queryset)[:1])
+    return users[0] if users else None
+
+
+def username_base(email):
+    """The email's local part, reduced to characters valid in a username"""
+    base = re.sub(r'[^\w.@+-]', '', User.normalize_username(email.split('@')[0]))
+    return base[:USERNAME_MAX_LENGTH - USERNAME_SUFFIX_DIGITS] or 'user'
+
+
+def allocate_username(base):
+    """
+    ``base`` if it is free, else ``base`` plus one more than its highest
+    numeric suffix, found with one aggregate over the usernames starting with
+    ``base`` (an index range scan), however many of them are taken.
+    """
+    suffixed = Q(username__regex=rf'^{re.escape(base)}[0-9]{{1,{USERNAME_SUFFIX_DIGITS}}}$')
+    taken = User.objects.filter(username__startswith=base).aggregate(
+        base_taken=Count('id', filter=Q(username=base)),
+        last_suffix=Max(Cast(Substr('username', len(base) + 1), BigIntegerField()), filter=suffixed),
+    )
+    if not taken['base_taken']:
+        return base
+    return f"{base}{(taken['last_suffix'] or 0) + 1}"
+
+
+def create_user_with_unique_username(email, password=None, **fields):
+    """
+    Create a user named after ``email`` under the first username that
+    ``allocate_username`` finds free.
+
+    A concurrent sign-up can take the same name between the lookup and the
+    insert; the insert then runs again with a fresh allocation, and a random
+    suffix on the last attempt. The password is hashed once, outside the
+    retries; ``None`` makes it unusable.
+    """
+    base = username_base(email)
+    user = User(email=User.objects.normalize_email(email), **fields)
+    user.set_password(password)
+    for attempt in range(USERNAME_ATTEMPTS):
+        if attempt < USERNAME_ATTEMPTS - 1:
+            user.username = allocate_username(base)
+        else:
+            user.username = f"{base}{secrets.randbelow(10 ** USERNAME_SUFFIX_DIGITS)}"
+        try:
+            with transaction.atomic():
+                user.save(force_insert=True)
+            return user
+        except IntegrityError:
+            if attempt == USERNAME_ATTEMPTS - 1 or not User.objects.filter(username=user.username).exists():
+                raise
+            user.pk = None
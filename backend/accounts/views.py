@@ -1,15 +1,32 @@
 from rest_framework.views import APIView
 from rest_framework_simplejwt.views import TokenRefreshView
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
 from rest_framework.response import Response
 from rest_framework import status
 from rest_framework_simplejwt.tokens import RefreshToken
 from rest_framework.permissions import AllowAny, IsAuthenticated
-from django.db import transaction
+from django.db import IntegrityError, transaction
+from django.db.models import Count, Q
 from drf_spectacular.utils import extend_schema
 from django.core.mail import send_mail
+from django.http import HttpResponse, HttpResponseNotModified
+from django.views.decorators.http import require_safe
 from .google_auth import get_user_info_from_google
-from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.exceptions import AuthenticationFailed, ValidationError
 from payments.utils.payment_helpers import get_or_create_user_wallet
+from core.db_routers import PRIMARY_DB, REPLICA_DB, ReplicaReadMixin, is_pinned, read_from
+from core.fast_serializers import fast_serializer
+from core.metrics import OTP_EVENTS, observe_login
+from features.catalog import catalog_version
+from features.models import UserFeature
+from features.serializers import UserFeatureSerializer
+from payments.serializers import UserWalletSerializer
+from .authentication import CookieJWTAuthentication
+from .jwt_keys import get_jwks_document
+from .utils import create_user_with_unique_username, get_user_by_email
+from .revocation import revoke_tokens, revoke_user_tokens
+from .throttling import GoogleLoginThrottle, LoginThrottle, OTPSendThrottle, OTPVerifyThrottle
 
 from .serializers import (
     RegisterSerializer, 
@@ -18,6 +35,7 @@ from .serializers import (
     SendOTPSerializer,
     VerifyOTPSerializer,
     GoogleLoginSerializer,
+    CookieTokenRefreshSerializer,
 )
 from .models import CustomUser
 from django.contrib.auth.models import User
@@ -42,6 +60,8 @@ class RegisterView(APIView):
                         },
                         status=status.HTTP_201_CREATED
                     )
+            except ValidationError as e:
+                return Response(e.detail, status=status.HTTP_400_BAD_REQUEST)
             except Exception as e:
                 return Response(
                     {"error": f"Something went wrong: {str(e)}"},
@@ -53,9 +73,16 @@ class LoginView(APIView):
     """User login endpoint - to be implemented"""
     permission_classes = [AllowAny]
     authentication_classes = []
+    throttle_classes = [LoginThrottle]
 
     @extend_schema(request=LoginSerializer, responses={200: UserSerializer})
     def post(self, request):
+        with observe_login('password') as outcome:
+            response = self._login(request)
+            outcome['status'] = 'success' if response.status_code == 200 else 'failure'
+            return response
+
+    def _login(self, request):
         serializer = LoginSerializer(data=request.data)
 
         if serializer.is_valid():
@@ -119,10 +146,16 @@ class GoogleLoginView(APIView):
     """Google OAuth login endpoint"""
     permission_classes = [AllowAny]
     authentication_classes = []
+    throttle_classes = [GoogleLoginThrottle]
     
     @extend_schema(request=GoogleLoginSerializer, responses={200: UserSerializer})
     def post(self, request):
-        
+        with observe_login('google') as outcome:
+            response = self._login(request)
+            outcome['status'] = 'success' if response.status_code == 200 else 'failure'
+            return response
+
+    def _login(self, request):
         serializer = GoogleLoginSerializer(data=request.data)
         
         if serializer.is_valid():
@@ -137,37 +170,31 @@ class GoogleLoginView(APIView):
                 last_name = google_user_info['last_name']
                 
                 # Check if user exists
-                try:
-                    user = User.objects.get(email=email)
-                except User.DoesNotExist:
-                    # Create new user
-                    with transaction.atomic():
-                        # Generate username from email
-                        username = email.split('@')[0]
-                        # Make unique if username already exists
-                        base_username = username
-                        counter = 1
-                        while User.objects.filter(username=username).exists():
-                            username = f"{base_username}{counter}"
-                            counter += 1
-                        
-                        user = User.objects.create_user(
-                            username=username,
-                            email=email,
-                            first_name=first_name,
-                            last_name=last_name,
-                            is_active=True
-                        )
-                        # Set unusable password for Google OAuth users
-                        user.set_unusable_password()
-                        user.save()
-                        
-                        # Create CustomUser profile
-                        CustomUser.objects.create(
-                            user=user,
-                            is_verified=True,  # Google already verified the email
-                            role='USER'
-                        )
+                user = get_user_by_email(email)
+                if user is None:
+                    try:
+                        # Create new user
+                        with transaction.atomic():
+                            # Unique username from email; no password makes it
+                            # unusable, as Google OAuth users have none
+                            user = create_user_with_unique_username(
+                                email,
+                                first_name=first_name,
+                                last_name=last_name,
+                                is_active=True
+                            )
+
+                            # Create CustomUser profile
+                            CustomUser.objects.create(
+                                user=user,
+                                is_verified=True,  # Google already verified the email
+                                role='USER'
+                            )
+                    except IntegrityError:
+                        # A concurrent first login created this email's user
+                        user = get_user_by_email(email)
+                        if user is None:
+                            raise
                 
                 # Generate JWT tokens
                 refresh = RefreshToken.for_user(user)
@@ -216,7 +243,7 @@ class GoogleLoginView(APIView):
         
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
-class ProfileView(APIView):
+class ProfileView(ReplicaReadMixin, APIView):
     """User profile endpoint with wallet information"""
     permission_classes = [IsAuthenticated]
 
@@ -224,12 +251,13 @@ class ProfileView(APIView):
     def get(self, request):
         user = request.user
         
-        # Ensure user has a wallet (create if doesn't exist)
-        get_or_create_user_wallet(user)
-        
         # Use select_related to optimize database queries
         user_with_wallet = User.objects.select_related('custom_user', 'wallet').get(id=user.id)
         
+        # Ensure user has a wallet (created on the primary if it doesn't exist)
+        if not hasattr(user_with_wallet, 'wallet'):
+            user_with_wallet.wallet = get_or_create_user_wallet(user)
+        
         serializer = UserSerializer(user_with_wallet)
         
         return Response({
@@ -239,7 +267,7 @@ class ProfileView(APIView):
         }, status=status.HTTP_200_OK)
 
 
-class DashboardView(APIView):
+class DashboardView(ReplicaReadMixin, APIView):
     """Dashboard endpoint with comprehensive user data including wallet and features"""
     permission_classes = [IsAuthenticated]
 
@@ -247,12 +275,13 @@ class DashboardView(APIView):
     def get(self, request):
         user = request.user
         
-        # Ensure user has a wallet
-        from payments.utils.payment_helpers import get_or_create_user_wallet
-        wallet = get_or_create_user_wallet(user)
-        
         # Get user with related data
         user_with_wallet = User.objects.select_related('custom_user', 'wallet').get(id=user.id)
+        
+        # Ensure user has a wallet
+        if not hasattr(user_with_wallet, 'wallet'):
+            user_with_wallet.wallet = get_or_create_user_wallet(user)
+        wallet = user_with_wallet.wallet
         user_serializer = UserSerializer(user_with_wallet)
         
         # Get recent transactions
@@ -262,10 +291,16 @@ class DashboardView(APIView):
         
         # Get active features
         from features.models import UserFeature
-        active_features = UserFeature.objects.filter(
+        active_features = list(UserFeature.objects.filter(
             user=user, 
             is_active=True
-        ).select_related('feature')
+        ).select_related('feature'))
+        
+        # Order stats in one query
+        order_stats = PaymentOrder.objects.filter(user=user).aggregate(
+            total=Count('id'),
+            successful=Count('id', filter=Q(status='PAID')),
+        )
         
         # Prepare transaction data
         transaction_data = []
@@ -308,7 +343,7 @@ class DashboardView(APIView):
             'dashboard': {
                 'user': user_serializer.data,
                 'wallet': {
-                    'coin_balance': wallet.coin_balance,
+                    'coin_balance': wallet.total_balance,
                     'total_coins_earned': wallet.total_coins_earned,
                     'total_coins_spent': wallet.total_coins_spent,
                     'total_money_spent': str(wallet.total_money_spent)
@@ -317,10 +352,10 @@ class DashboardView(APIView):
                 'recent_orders': order_data,
                 'active_features': feature_data,
                 'stats': {
-                    'total_orders': PaymentOrder.objects.filter(user=user).count(),
-                    'successful_orders': PaymentOrder.objects.filter(user=user, status='PAID').count(),
+                    'total_orders': order_stats['total'],
+                    'successful_orders': order_stats['successful'],
                     'total_transactions': CoinTransaction.objects.filter(user=user).count(),
-                    'active_features_count': active_features.count()
+                    'active_features_count': len(active_features)
                 }
             },
             'message': 'Dashboard data retrieved successfully'
@@ -328,6 +363,7 @@ class DashboardView(APIView):
 class CookieTokenRefreshView(TokenRefreshView):
     """Custom refresh endpoint that reads the refresh token from HttpOnly cookie."""
     permission_classes = [AllowAny]
+    serializer_class = CookieTokenRefreshSerializer
 
     def post(self, request, *args, **kwargs):
         refresh_token = request.COOKIES.get('refresh')
@@ -343,20 +379,116 @@ class CookieTokenRefreshView(TokenRefreshView):
 
         access_token = serializer.validated_data.get('access')
         response = Response({'access': access_token}, status=status.HTTP_200_OK)
-        # attach domain on refresh as well
+        set_refreshed_cookies(response, serializer.validated_data)
+        return response
+
+
+def set_refreshed_cookies(response, tokens):
+    """Set the cookies for a TokenRefreshSerializer result (refresh only when rotated)"""
+    # attach domain on refresh as well
+    response.set_cookie(
+        key='access',
+        value=tokens['access'],
+        httponly=True,
+        secure=True,
+        samesite='None',
+        max_age=60 * 60,  # 1 hour
+        domain=getattr(settings, 'COOKIE_DOMAIN', None)
+    )
+    if 'refresh' in tokens:
         response.set_cookie(
-            key='access',
-            value=access_token,
+            key='refresh',
+            value=tokens['refresh'],
             httponly=True,
             secure=True,
             samesite='None',
-            max_age=60 * 60,  # 1 hour
+            max_age=24 * 60 * 60,  # 1 day
             domain=getattr(settings, 'COOKIE_DOMAIN', None)
         )
+
+
+class SessionBootstrapView(APIView):
+    """
+    App-start endpoint: profile, wallet, active features and the catalog
+    version in one call.
+
+    An expired or missing access token is refreshed from the refresh cookie
+    on the way, so the client needs no separate refresh round-trip. The
+    payload costs two queries (user with profile and wallet, active
+    features), plus one for sharded wallets.
+    """
+    permission_classes = [AllowAny]
+    # Authentication is done here so an expired access token can fall back to the refresh cookie
+    authentication_classes = []
+
+    @extend_schema(responses={200: dict, 401: dict})
+    def get(self, request):
+        tokens = None
+        authentication = CookieJWTAuthentication()
+        try:
+            raw_token = authentication.get_request_token(request)
+            if raw_token is None:
+                raise InvalidToken('No access token')
+            validated_token = authentication.get_validated_token(raw_token)
+        except (InvalidToken, AuthenticationFailed):
+            refresh_token = request.COOKIES.get('refresh')
+            if not refresh_token:
+                return Response({'error': 'Not authenticated'}, status=status.HTTP_401_UNAUTHORIZED)
+            serializer = CookieTokenRefreshSerializer(data={'refresh': refresh_token})
+            try:
+                serializer.is_valid(raise_exception=True)
+            except Exception:
+                return Response({'error': 'Invalid or expired refresh token'}, status=status.HTTP_401_UNAUTHORIZED)
+            tokens = serializer.validated_data
+            validated_token = authentication.get_validated_token(tokens['access'])
+
+        user_id = validated_token[jwt_settings.USER_ID_CLAIM]
+        # Same read-your-writes rule as ReplicaReadMixin
+        with read_from(PRIMARY_DB if is_pinned(user_id) else REPLICA_DB):
+            user = User.objects.select_related('custom_user', 'wallet').filter(
+                id=user_id, is_active=True
+            ).first()
+            if user is None:
+                return Response({'error': 'User not found or inactive'}, status=status.HTTP_401_UNAUTHORIZED)
+            if not hasattr(user, 'wallet'):
+                user.wallet = get_or_create_user_wallet(user)
+            features = fast_serializer(UserFeatureSerializer).serialize(
+                UserFeature.objects.filter(user_id=user_id, is_active=True)
+            )
+            response = Response({
+                'success': True,
+                'user': UserSerializer(user).data,
+                'wallet': UserWalletSerializer(user.wallet).data,
+                'features': features,
+                'catalog_version': catalog_version(),
+            }, status=status.HTTP_200_OK)
+
+        if tokens is not None:
+            set_refreshed_cookies(response, tokens)
         return response
 
+
+@require_safe
+def jwks_view(request):
+    """
+    Public keys for verifying access tokens without calling this API.
+
+    The document is built once per process; clients revalidate it with the
+    ETag after ``JWT_JWKS_MAX_AGE`` seconds.
+    """
+    body, etag = get_jwks_document()
+    if etag in request.META.get('HTTP_IF_NONE_MATCH', ''):
+        response = HttpResponseNotModified()
+    else:
+        response = HttpResponse(body, content_type='application/json')
+    response['ETag'] = etag
+    response['Cache-Control'] = f"public, max-age={getattr(settings, 'JWT_JWKS_MAX_AGE', 300)}"
+    response['Access-Control-Allow-Origin'] = '*'
+    return response
+
+
 class LogoutView(APIView):
-    """User logout endpoint"""
+    """User logout endpoint; ``{"all_sessions": true}`` also revokes the user's other tokens"""
     permission_classes = [IsAuthenticated]  # user must be logged in
 
     @extend_schema(responses={200: {"message": "Logout successful"}})
@@ -369,39 +501,50 @@ class LogoutView(APIView):
         response.delete_cookie("access")
         response.delete_cookie("refresh")
 
-
-        # OPTIONAL: blacklist refresh token for security
+        # Revoke the tokens so copies of them stop working too
+        tokens = [request.auth] if request.auth is not None else []
         if refresh_token:
             try:
-                token = RefreshToken(refresh_token)
-                token.blacklist()  # only if blacklist app enabled
-            except Exception:
-                pass
+                tokens.append(RefreshToken(refresh_token))
+            except TokenError:
+                pass  # invalid or already expired
+        revoke_tokens(tokens)
+        if request.data.get("all_sessions") is True:
+            revoke_user_tokens(request.user.id)
 
         return response
     
 
 class SendOTPEmailView(APIView):
     permission_classes = [AllowAny]
+    # No token lookup before the throttle check
+    authentication_classes = []
+    throttle_classes = [OTPSendThrottle]
 
     @extend_schema(request=SendOTPSerializer, responses={200: dict})
     def post(self, request):
         serializer = SendOTPSerializer(data=request.data)
         if serializer.is_valid():
             serializer.save()
+            OTP_EVENTS.labels('send', 'success').inc()
             return Response({"message": "OTP sent successfully!"}, status=status.HTTP_200_OK)
+        OTP_EVENTS.labels('send', 'rejected').inc()
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
 class VerifyOTPEmailView(APIView):
     permission_classes = [AllowAny]
+    authentication_classes = []
+    throttle_classes = [OTPVerifyThrottle]
 
     @extend_schema(request=VerifyOTPSerializer, responses={200: dict})
     def post(self, request):
         serializer = VerifyOTPSerializer(data=request.data)
         if serializer.is_valid():
             data = serializer.validated_data
+            OTP_EVENTS.labels('verify', 'success').inc()
             return Response(data, status=status.HTTP_200_OK)
+        OTP_EVENTS.labels('verify', 'failure').inc()
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
@@ -0,0 +1,91 @@
+"""
+Primary / read-replica database routing.
+
+Reads go to the ``replica`` alias only inside a replica-read scope, which
+API views opt into with ``ReplicaReadMixin``. Everything else (writes,
+reads made by write views, management commands) stays on ``default``.
+
+A user who has just written to their wallet or orders is pinned to the
+primary for ``REPLICA_STICKY_SECONDS`` so they always read their own writes.
+"""
+import contextvars
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.permissions import SAFE_METHODS
+
+PRIMARY_DB = 'default'
+REPLICA_DB = 'replica'
+
+_read_db = contextvars.ContextVar('read_db', default=None)
+
+
+def _pin_key(user_id):
+    return f"db:pin-primary:{user_id}"
+
+
+def pin_primary(user_id):
+    """Send this user's reads to the primary for the sticky window"""
+    if user_id is None:
+        return
+    cache.set(_pin_key(user_id), 1, getattr(settings, 'REPLICA_STICKY_SECONDS', 5))
+
+
+def is_pinned(user_id):
+    """Check if the user wrote recently and must read from the primary"""
+    return user_id is not None and cache.get(_pin_key(user_id)) is not None
+
+
+@contextmanager
+def read_from(alias):
+    """Route reads made inside the block to ``alias``"""
+    token = _read_db.set(alias)
+    try:
+        yield
+    finally:
+        _read_db.reset(token)
+
+
+class PrimaryReplicaRouter:
+    """Writes always go to the primary; reads go to the replica when asked for"""
+
+    def db_for_read(self, model, **hints):
+        if _read_db.get() == REPLICA_DB and REPLICA_DB in settings.DATABASES:
+            return REPLICA_DB
+        return PRIMARY_DB
+
+    def db_for_write(self, model, **hints):
+        return PRIMARY_DB
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Both aliases hold the same data
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == PRIMARY_DB
+
+
+class ReplicaReadMixin:
+    """
+    Serve safe-method requests of an APIView from the replica.
+
+    The decision is taken after authentication so that users pinned by
+    ``pin_primary`` keep reading from the primary. Views can override
+    ``read_db`` to force a different alias.
+    """
+    read_db = REPLICA_DB
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        if request.method in SAFE_METHODS and not is_pinned(request.user.id):
+            self._read_db_token = _read_db.set(self.read_db)
+
+    def dispatch(self, request, *args, **kwargs):
+        self._read_db_token = None
+        try:
+            return super().dispatch(request, *args, **kwargs)
+        finally:
+            if self._read_db_token is not None:
+                _read_db.reset(self._read_db_token)
+                self._read_db_token = None
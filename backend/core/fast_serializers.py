@@ -0,0 +1,191 @@
+"""
+Compiled read-only serialization for list endpoints.
+
+``FastSerializer`` takes a DRF ``ModelSerializer`` class and, once, turns its
+readable fields into a ``values_list()`` projection plus a plan of per-column
+converters, compiled into a single list comprehension building the output
+dicts. Serializing a page is then one query returning tuples and that
+comprehension, instead of model instances walked field by field through
+``get_attribute``/``to_representation``.
+
+The output is the same as ``Serializer(queryset, many=True).data``: same keys
+and order, same formats (ISO datetimes, string Decimals when
+``coerce_to_string``), ``None`` for null values and null nested relations.
+Only fields backed by database columns are supported; serializers with
+``SerializerMethodField``, ``source='*'``, many-valued nesting or properties
+raise ``ImproperlyConfigured`` when compiled.
+"""
+import decimal
+from datetime import timezone as dt_timezone
+from functools import lru_cache
+
+from django.core.exceptions import FieldDoesNotExist, ImproperlyConfigured
+from django.utils import timezone
+from rest_framework import serializers
+from rest_framework.fields import ISO_8601
+from rest_framework.settings import api_settings
+
+from .instrumentation import timed
+
+# Fields whose representation of a database value is the value itself
+_IDENTITY_FIELDS = (
+    serializers.BooleanField,
+    serializers.CharField,
+    serializers.IntegerField,
+    serializers.FloatField,
+    serializers.PrimaryKeyRelatedField,
+)
+
+
+def _lookup(model, source):
+    """Turn a dotted ``source`` into a values() lookup, checking it is a column"""
+    parts = source.split('.')
+    current = model
+    for position, part in enumerate(parts):
+        try:
+            field = current._meta.get_field(part)
+        except FieldDoesNotExist:
+            raise ImproperlyConfigured(f"{model.__name__}.{source} is not a database field")
+        if field.many_to_many or field.one_to_many:
+            raise ImproperlyConfigured(f"{model.__name__}.{source} is many-valued")
+        if field.is_relation and position < len(parts) - 1:
+            current = field.related_model
+    return '__'.join(parts)
+
+
+def _datetime_converter(field):
+    output_format = getattr(field, 'format', api_settings.DATETIME_FORMAT)
+    if output_format is None or output_format.lower() != ISO_8601:
+        return field.to_representation
+    field_timezone = field.timezone if hasattr(field, 'timezone') else field.default_timezone()
+    if field_timezone is None:
+        return field.to_representation
+    # Aware datetimes come back from the database in UTC; skip the conversion
+    # when that is also the output timezone
+    skip_convert = field_timezone is dt_timezone.utc or getattr(field_timezone, 'key', None) == 'UTC'
+    fallback = field.to_representation
+
+    def convert(value):
+        if value.tzinfo is None:
+            return fallback(value)
+        if not (skip_convert and value.tzinfo is dt_timezone.utc):
+            value = value.astimezone(field_timezone)
+        value = value.isoformat()
+        return value[:-6] + 'Z' if value.endswith('+00:00') else value
+    return convert
+
+
+def _decimal_converter(field):
+    coerce_to_string = getattr(field, 'coerce_to_string', api_settings.COERCE_DECIMAL_TO_STRING)
+    if (not coerce_to_string or field.localize or field.normalize_output
+            or field.decimal_places is None):
+        return field.to_representation
+    # DecimalField.quantize() rebuilds these on every value
+    quantum = decimal.Decimal('.1') ** field.decimal_places
+    context = decimal.getcontext().copy()
+    if field.max_digits is not None:
+        context.prec = field.max_digits
+    rounding = field.rounding
+
+    def convert(value):
+        if not isinstance(value, decimal.Decimal):
+            value = decimal.Decimal(str(value).strip())
+        return f'{value.quantize(quantum, rounding, context):f}'
+    return convert
+
+
+def _converter(field):
+    """Return a callable for non-null values, or None when the value is used as is"""
+    if isinstance(field, serializers.ChoiceField):
+        if all(isinstance(key, str) for key in field.choices):
+            return None
+        return field.to_representation
+    if isinstance(field, serializers.PrimaryKeyRelatedField) and field.pk_field is not None:
+        return field.pk_field.to_representation
+    if isinstance(field, serializers.DateTimeField):
+        return _datetime_converter(field)
+    if isinstance(field, serializers.DecimalField):
+        return _decimal_converter(field)
+    if isinstance(field, serializers.UUIDField):
+        return str if field.uuid_format == 'hex_verbose' else field.to_representation
+    if isinstance(field, _IDENTITY_FIELDS):
+        return None
+    return field.to_representation
+
+
+class _Plan:
+    """Output keys, tuple indexes and fields for one (possibly nested) serializer level"""
+
+    def __init__(self, model, serializer, prefix, lookups):
+        self.entries = []      # (name, index, field) or (name, None, nested plan)
+        self.pk_index = None   # set on nested plans: null relation check
+        for name, field in serializer.fields.items():
+            if field.write_only:
+                continue
+            if isinstance(field, (serializers.SerializerMethodField, serializers.ListSerializer,
+                                  serializers.HiddenField)) or field.source == '*':
+                raise ImproperlyConfigured(f"{type(serializer).__name__}.{name} can't be compiled")
+            lookup = prefix + _lookup(model, field.source)
+            if isinstance(field, serializers.BaseSerializer):
+                related_model = model._meta.get_field(field.source.split('.')[-1]).related_model
+                nested = _Plan(related_model, field, lookup + '__', lookups)
+                nested.pk_index = len(lookups)
+                lookups.append(lookup + '__pk')
+                self.entries.append((name, None, nested))
+            else:
+                self.entries.append((name, len(lookups), field))
+                lookups.append(lookup)
+
+    def expression(self, namespace):
+        """Source of a dict display for one ``row``; converters are added to ``namespace``"""
+        items = []
+        for name, index, target in self.entries:
+            if index is None:
+                value = f'None if row[{target.pk_index}] is None else {target.expression(namespace)}'
+            else:
+                convert = _converter(target)
+                if convert is None:
+                    value = f'row[{index}]'
+                else:
+                    key = f'convert_{len(namespace)}'
+                    namespace[key] = convert
+                    value = f'None if row[{index}] is None else {key}(row[{index}])'
+            items.append(f'{name!r}: {value}')
+        return '{' + ', '.join(items) + '}'
+
+
+class FastSerializer:
+    """Read-only list serialization compiled from a ModelSerializer class"""
+
+    def __init__(self, serializer_class):
+        self.serializer_class = serializer_class
+        self.model = serializer_class.Meta.model
+        self.lookups = []
+        self._plan = _Plan(self.model, serializer_class(), '', self.lookups)
+        # Datetime converters depend on the active timezone
+        self._renderers = {}
+
+    def _renderer(self):
+        current_timezone = timezone.get_current_timezone()
+        renderer = self._renderers.get(current_timezone)
+        if renderer is None:
+            namespace = {}
+            source = f'lambda rows: [{self._plan.expression(namespace)} for row in rows]'
+            renderer = self._renderers[current_timezone] = eval(source, namespace)
+        return renderer
+
+    def render_rows(self, rows):
+        """Serialize tuples laid out as ``values_list(*self.lookups)``"""
+        return self._renderer()(rows)
+
+    def serialize(self, queryset):
+        """Equivalent of ``serializer_class(queryset, many=True).data``, with one query"""
+        rows = list(queryset.values_list(*self.lookups))
+        with timed('serializer'):
+            return self.render_rows(rows)
+
+
+@lru_cache(maxsize=None)
+def fast_serializer(serializer_class):
+    """Return the (cached) compiled FastSerializer for a ModelSerializer class"""
+    return FastSerializer(serializer_class)
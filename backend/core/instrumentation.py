@@ -0,0 +1,215 @@
+"""
+Per-request query, latency and render-time instrumentation.
+
+``RequestInstrumentationMiddleware`` wraps every database connection with an
+execute wrapper and collects, for the current request:
+
+- number of queries and total database time,
+- time spent in payment gateway calls (see ``timed('gateway')``),
+- time spent building serializer output: ``.data`` of serializers using
+  ``TimedSerializerMixin`` (including the queries and method fields it runs)
+  and ``FastSerializer`` rows; the outermost serializer is counted once,
+- time spent rendering the response body (the renderer encoding the
+  serializer output), timed from ``process_template_response``.
+
+The numbers are sent back in a ``Server-Timing`` header (when
+``SERVER_TIMING_HEADER`` is on), aggregated per endpoint in process memory for
+``EndpointStatsView``, and checked against ``QUERY_BUDGETS``::
+
+    QUERY_BUDGETS = {
+        'dashboard': {'queries': 10, 'db_ms': 50},
+        'payments:wallet': {'queries': 3},
+    }
+
+keyed by URL name (``view_name`` of the resolved URL). Over-budget requests
+are logged as warnings on the ``core.instrumentation`` logger.
+"""
+import logging
+import os
+import threading
+import time
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+_current = ContextVar('request_metrics', default=None)
+
+
+@dataclass
+class RequestMetrics:
+    queries: int = 0
+    db_time: float = 0.0
+    gateway_calls: int = 0
+    gateway_time: float = 0.0
+    serializer_time: float = 0.0
+    render_time: float = 0.0
+    # kinds being timed right now, so nested blocks aren't counted twice
+    active: set = field(default_factory=set)
+
+
+def current_metrics():
+    """Return the RequestMetrics of the request being served, or None"""
+    return _current.get()
+
+
+@contextmanager
+def timed(kind):
+    """Add the block's duration to the current request's ``gateway``, ``serializer`` or ``render`` time"""
+    metrics = _current.get()
+    if metrics is None or kind in metrics.active:
+        yield
+        return
+    metrics.active.add(kind)
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        metrics.active.discard(kind)
+        if kind == 'gateway':
+            metrics.gateway_calls += 1
+            metrics.gateway_time += elapsed
+        elif kind == 'serializer':
+            metrics.serializer_time += elapsed
+        else:
+            metrics.render_time += elapsed
+
+
+class TimedSerializerMixin:
+    """Serializer mixin counting the time spent building ``.data`` as serializer time"""
+
+    @property
+    def data(self):
+        with timed('serializer'):
+            return super().data
+
+
+def _count_query(execute, sql, params, many, context):
+    metrics = _current.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        metrics.queries += 1
+        metrics.db_time += time.perf_counter() - started
+
+
+class EndpointStats:
+    """Running per-endpoint totals for this worker process"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._endpoints = {}
+
+    def record(self, endpoint, metrics, total_time, over_budget):
+        with self._lock:
+            stats = self._endpoints.setdefault(endpoint, {
+                'requests': 0, 'queries': 0, 'max_queries': 0, 'db_ms': 0.0,
+                'gateway_ms': 0.0, 'serializer_ms': 0.0, 'render_ms': 0.0, 'total_ms': 0.0,
+                'max_total_ms': 0.0, 'over_budget': 0,
+            })
+            total_ms = total_time * 1000
+            stats['requests'] += 1
+            stats['queries'] += metrics.queries
+            stats['max_queries'] = max(stats['max_queries'], metrics.queries)
+            stats['db_ms'] += metrics.db_time * 1000
+            stats['gateway_ms'] += metrics.gateway_time * 1000
+            stats['serializer_ms'] += metrics.serializer_time * 1000
+            stats['render_ms'] += metrics.render_time * 1000
+            stats['total_ms'] += total_ms
+            stats['max_total_ms'] = max(stats['max_total_ms'], total_ms)
+            stats['over_budget'] += over_budget
+
+    def snapshot(self):
+        """Return per-endpoint averages, slowest endpoints first"""
+        with self._lock:
+            rows = []
+            for endpoint, stats in self._endpoints.items():
+                count = stats['requests']
+                rows.append({
+                    'endpoint': endpoint,
+                    'requests': count,
+                    'avg_queries': round(stats['queries'] / count, 2),
+                    'max_queries': stats['max_queries'],
+                    'avg_db_ms': round(stats['db_ms'] / count, 2),
+                    'avg_gateway_ms': round(stats['gateway_ms'] / count, 2),
+                    'avg_serializer_ms': round(stats['serializer_ms'] / count, 2),
+                    'avg_render_ms': round(stats['render_ms'] / count, 2),
+                    'avg_total_ms': round(stats['total_ms'] / count, 2),
+                    'max_total_ms': round(stats['max_total_ms'], 2),
+                    'over_budget': stats['over_budget'],
+                })
+        return {'pid': os.getpid(), 'endpoints': sorted(rows, key=lambda row: -row['avg_total_ms'])}
+
+    def reset(self):
+        with self._lock:
+            self._endpoints.clear()
+
+
+endpoint_stats = EndpointStats()
+
+
+def _check_budget(view_name, metrics):
+    budget = getattr(settings, 'QUERY_BUDGETS', {}).get(view_name)
+    if not budget:
+        return False
+    violations = []
+    if 'queries' in budget and metrics.queries > budget['queries']:
+        violations.append(f"{metrics.queries} queries (budget {budget['queries']})")
+    if 'db_ms' in budget and metrics.db_time * 1000 > budget['db_ms']:
+        violations.append(f"{metrics.db_time * 1000:.1f}ms in db (budget {budget['db_ms']}ms)")
+    if violations:
+        logger.warning("Query budget exceeded by %s: %s", view_name, ", ".join(violations))
+    return bool(violations)
+
+
+def _server_timing(metrics, total_time):
+    return ", ".join([
+        f'db;dur={metrics.db_time * 1000:.1f};desc="{metrics.queries} queries"',
+        f'gateway;dur={metrics.gateway_time * 1000:.1f};desc="{metrics.gateway_calls} calls"',
+        f'serializer;dur={metrics.serializer_time * 1000:.1f}',
+        f'render;dur={metrics.render_time * 1000:.1f}',
+        f'total;dur={total_time * 1000:.1f}',
+    ])
+
+
+class RequestInstrumentationMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        metrics = RequestMetrics()
+        token = _current.set(metrics)
+        started = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for alias in connections:
+                    stack.enter_context(connections[alias].execute_wrapper(_count_query))
+                response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        total_time = time.perf_counter() - started
+
+        match = request.resolver_match
+        if match is not None:
+            view_name = match.view_name or match.route
+            over_budget = _check_budget(view_name, metrics)
+            endpoint_stats.record(f"{request.method} /{match.route}", metrics, total_time, over_budget)
+
+        if getattr(settings, 'SERVER_TIMING_HEADER', False):
+            response['Server-Timing'] = _server_timing(metrics, total_time)
+        return response
+
+    def process_template_response(self, request, response):
+        # DRF responses render lazily; render here so it is timed. Django's
+        # own render() call afterwards is then a no-op.
+        with timed('render'):
+            response.render()
+        return response
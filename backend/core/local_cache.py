@@ -0,0 +1,68 @@
+"""
+Per-process caches kept coherent across workers by a shared version counter.
+
+The cached value lives in process memory; only a version number is stored in
+the Django cache. A read costs one cache lookup and never touches the
+database; the loader runs again after ``bump()`` changed the version.
+
+The version is only shared when the Django cache is (Redis, memcached). With
+the default per-process LocMemCache a bump reaches just the worker that made
+it, so each value is also reloaded once it is ``LOCAL_CACHE_MAX_AGE`` seconds
+old; that bounds how long other workers can serve stale data.
+"""
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+PROCESS_LOCAL_BACKENDS = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+def is_process_local(alias='default'):
+    """Whether cache ``alias`` is private to each worker process, so deletes don't reach other workers"""
+    return settings.CACHES.get(alias, {}).get('BACKEND') in PROCESS_LOCAL_BACKENDS
+
+
+class VersionedLocalCache:
+    """Process-local value reloaded whenever the shared version changes"""
+
+    def __init__(self, name, loader):
+        self.version_key = f"local-cache:{name}:version"
+        self.loader = loader
+        self._version = None
+        self._value = None
+        self._expires = 0.0  # monotonic time the value must be reloaded by
+        self._lock = threading.Lock()
+
+    def version(self):
+        """Current shared version, seeding it if the cache lost it"""
+        version = cache.get(self.version_key)
+        if version is None:
+            # Seed from the clock so a flushed cache never reuses an old version
+            cache.add(self.version_key, time.time_ns())
+            version = cache.get(self.version_key)
+        return version
+
+    def _stale(self, version):
+        return version != self._version or time.monotonic() >= self._expires
+
+    def get(self):
+        version = self.version()
+        if self._stale(version):
+            with self._lock:
+                if self._stale(version):
+                    self._value = self.loader()
+                    self._version = version
+                    self._expires = time.monotonic() + getattr(settings, 'LOCAL_CACHE_MAX_AGE', 30)
+        return self._value
+
+    def bump(self):
+        """Invalidate the value in every process"""
+        try:
+            cache.incr(self.version_key)
+        except ValueError:
+            cache.add(self.version_key, time.time_ns())
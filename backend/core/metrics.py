@@ -0,0 +1,124 @@
+"""
+Prometheus metrics for the auth and payment flows, served at ``/metrics``.
+
+Counters and histograms live in process memory and cost a lock and an add per
+update. Under gunicorn, set ``PROMETHEUS_MULTIPROC_DIR`` to an empty,
+writable directory (wiped on each deploy) before the workers start: every
+worker then writes its values to a memory-mapped file there and ``/metrics``
+merges all of them, whichever worker serves the scrape. Add this to the
+gunicorn config so dead workers' gauges are dropped::
+
+    from prometheus_client import multiprocess
+
+    def child_exit(server, worker):
+        multiprocess.mark_process_dead(worker.pid)
+
+Set ``METRICS_AUTH_TOKEN`` to require ``Authorization: Bearer <token>``.
+"""
+import hmac
+import os
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import transaction
+from django.http import Http404, HttpResponse
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+
+PAYMENT_ORDERS = Counter(
+    'payment_orders_total',
+    'Payment orders by lifecycle event (created, verified, settled) and payment method',
+    ['event', 'method'],
+)
+WEBHOOK_EVENTS = Counter(
+    'payment_webhook_events_total',
+    'Razorpay webhook deliveries by event type and outcome',
+    ['event', 'outcome'],
+)
+WALLET_COINS = Counter(
+    'wallet_coins_total',
+    'Coins credited to or debited from wallets, by ledger transaction type',
+    ['direction', 'transaction_type'],
+)
+OTP_EVENTS = Counter(
+    'otp_events_total',
+    'Email OTP sends and verifications by outcome',
+    ['action', 'outcome'],
+)
+THROTTLED_REQUESTS = Counter(
+    'auth_throttled_requests_total',
+    'Login and OTP requests rejected by throttling, by scope and limit dimension (ip, email, global)',
+    ['scope', 'dimension'],
+)
+LOGIN_LATENCY = Histogram(
+    'login_duration_seconds',
+    'Login request latency by login method and outcome',
+    ['method', 'outcome'],
+    buckets=(0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+RAZORPAY_LATENCY = Histogram(
+    'razorpay_request_duration_seconds',
+    'Razorpay API call latency by HTTP method, resource and outcome',
+    ['method', 'resource', 'outcome'],
+    buckets=(0.05, 0.1, 0.25, 0.5, 1, 2, 4, 8, 15, 30),
+)
+
+
+def count_order(event, method):
+    """Count an order lifecycle event once the current transaction commits"""
+    transaction.on_commit(lambda: PAYMENT_ORDERS.labels(event, method).inc())
+
+
+def count_wallet_coins(direction, transaction_type, amount):
+    """Add wallet volume once the current transaction commits"""
+    transaction.on_commit(lambda: WALLET_COINS.labels(direction, transaction_type).inc(amount))
+
+
+@contextmanager
+def observe_login(method):
+    """
+    Time a login; the block sets ``outcome['status']`` (default ``error``)::
+
+        with observe_login('password') as outcome:
+            ...
+            outcome['status'] = 'success'
+    """
+    outcome = {'status': 'error'}
+    started = time.perf_counter()
+    try:
+        yield outcome
+    finally:
+        LOGIN_LATENCY.labels(method, outcome['status']).observe(time.perf_counter() - started)
+
+
+def _registry():
+    if 'PROMETHEUS_MULTIPROC_DIR' in os.environ:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return registry
+    return REGISTRY
+
+
+def metrics_view(request):
+    """
+    Prometheus text exposition of all metrics.
+
+    Requires ``METRICS_AUTH_TOKEN`` as a bearer token. Without a token the
+    endpoint is only served with DEBUG on, and is a 404 otherwise.
+    """
+    token = getattr(settings, 'METRICS_AUTH_TOKEN', '')
+    if not token and not settings.DEBUG:
+        raise Http404
+    if token:
+        supplied = request.META.get('HTTP_AUTHORIZATION', '').removeprefix('Bearer ')
+        if not hmac.compare_digest(supplied.encode(), token.encode()):
+            return HttpResponse(status=401)
+    return HttpResponse(generate_latest(_registry()), content_type=CONTENT_TYPE_LATEST)
@@ -0,0 +1,271 @@
+"""
+Query budgets for the API endpoints, checked by each app's QueryBudgetTests.
+
+``CASES`` builds one request per URL name against a ``Seed``; the tests fail
+when an endpoint makes more queries than its ``QUERY_BUDGETS`` entry (see
+core.instrumentation), or more queries as the seeded data grows.
+"""
+import hashlib
+import hmac
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connections
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import URLPattern, URLResolver, get_resolver, reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from accounts.models import CustomUser
+from accounts.otp import issue_otp
+from features.catalog import invalidate_catalog
+from features.models import Feature, UserFeature
+from payments.models import CoinTransaction, PaymentOrder, UserWallet
+
+SERVICE_KEY = 'budget-service-key'
+
+# Endpoints that talk to external services and can't run offline
+SKIPPED = {
+    'google-login': "verifies the token with Google",
+    'gmail-callback': "exchanges the OAuth code with Google",
+    'payments:create-order': "creates the order on Razorpay",
+}
+
+DEFAULT_BUDGET = 20
+MAX_FEATURES = 200
+
+
+class Seed:
+    """A user with ``size`` ledger rows and orders, plus up to MAX_FEATURES features"""
+
+    def __init__(self, size):
+        self.size = size
+        self.counter = 0
+        self.user = User.objects.create_user(
+            username=f'budget-{size}', email=f'budget-{size}@example.com', password='Budget-pass-1',
+            is_staff=True,
+        )
+        CustomUser.objects.create(user=self.user, role='ADMIN', is_verified=True)
+        UserWallet.objects.create(user=self.user, coin_balance=10 ** 9, total_coins_earned=10 ** 9)
+        now = timezone.now()
+        CoinTransaction.objects.bulk_create([
+            CoinTransaction(user=self.user, transaction_type='BONUS', amount=1, balance_after=i + 1,
+                            transaction_id=uuid.uuid4())
+            for i in range(size)
+        ], batch_size=2000)
+        PaymentOrder.objects.bulk_create([
+            PaymentOrder(order_id=f'budget-{size}-{i}', razorpay_order_id=f'rzp-{size}-{i}', user=self.user,
+                         amount=10, coins_to_credit=10, status='PAID', expires_at=now)
+            for i in range(size)
+        ], batch_size=2000)
+        features = Feature.objects.bulk_create([
+            Feature(name=f'Budget {size} {i}', code=f'budget_{size}_{i}', coin_price=1)
+            for i in range(min(size, MAX_FEATURES))
+        ])
+        UserFeature.objects.bulk_create([
+            UserFeature(user=self.user, feature=feature, is_active=True,
+                        expires_on=now + timedelta(days=30))
+            for feature in features
+        ])
+        self.features = features
+        invalidate_catalog()
+
+        self.client = APIClient()
+        self.refresh = RefreshToken.for_user(self.user)
+        self.access = str(self.refresh.access_token)
+        self.authenticate()
+
+    def authenticate(self, access=None):
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {access or self.access}')
+
+    def next(self):
+        self.counter += 1
+        return f'{self.size}-{self.counter}'
+
+    def pending_order(self):
+        key = self.next()
+        return PaymentOrder.objects.create(
+            order_id=f'pending-{key}', razorpay_order_id=f'rzp-pending-{key}', user=self.user,
+            amount=10, coins_to_credit=10, expires_at=timezone.now() + timedelta(hours=1),
+        )
+
+
+def _signature(secret, message):
+    return hmac.new(secret.encode(), message, hashlib.sha256).hexdigest()
+
+
+def _register(seed):
+    key = seed.next()
+    return 'post', reverse('register'), {'data': {
+        'email': f'new-{key}@example.com', 'password': 'Budget-pass-1', 'confirm_password': 'Budget-pass-1',
+    }, 'format': 'json'}
+
+
+def _verify_email(seed):
+    otp = issue_otp(seed.user)
+    return 'post', reverse('verify-email'), {'data': {'email': seed.user.email, 'otp': otp}, 'format': 'json'}
+
+
+def _logout(seed):
+    # Logout revokes the token it is called with; use a throwaway one
+    seed.authenticate(str(RefreshToken.for_user(seed.user).access_token))
+    return 'post', reverse('logout'), {}
+
+
+def _refresh(seed):
+    seed.client.cookies['refresh'] = str(seed.refresh)
+    return 'post', reverse('token_refresh'), {}
+
+
+def _verify_payment(seed):
+    order = seed.pending_order()
+    payment_id = f'pay-{seed.next()}'
+    message = f'{order.razorpay_order_id}|{payment_id}'.encode()
+    return 'post', reverse('payments:verify-payment'), {'data': {
+        'razorpay_order_id': order.razorpay_order_id,
+        'razorpay_payment_id': payment_id,
+        'razorpay_signature': _signature(settings.RAZORPAY_KEY_SECRET, message),
+    }, 'format': 'json'}
+
+
+def _webhook(seed):
+    order = seed.pending_order()
+    return 'post', reverse('payments:webhook'), {'data': {
+        'event': 'order.paid', 'payload': {'order': {'entity': {'id': order.razorpay_order_id}}},
+    }, 'format': 'json'}
+
+
+def _entitlement_check(seed):
+    seed.client.credentials(HTTP_AUTHORIZATION=f'Service {SERVICE_KEY}')
+    users = list(User.objects.order_by('id').values_list('id', flat=True)[:100])
+    codes = [feature.code for feature in seed.features[:20]] + ['unknown']
+    return 'post', reverse('entitlement-check'), {'data': {
+        'user_ids': users, 'feature_codes': codes, 'format': 'bitmap'}, 'format': 'json'}
+
+
+def _delete_feature(seed):
+    feature = Feature.objects.create(name=f'Disposable {seed.next()}', code=f'disposable_{seed.next()}')
+    return 'delete', reverse('delete-feature', args=[feature.id]), {}
+
+
+# url name -> callable(seed) returning (method, path, client kwargs); setup
+# queries made by the callable are not counted
+CASES = {
+    'register': _register,
+    'login': lambda seed: ('post', reverse('login'), {
+        'data': {'email': seed.user.email, 'password': 'Budget-pass-1'}, 'format': 'json'}),
+    'profile': lambda seed: ('get', reverse('profile'), {}),
+    'dashboard': lambda seed: ('get', reverse('dashboard'), {}),
+    'token_refresh': _refresh,
+    'session-bootstrap': lambda seed: ('get', reverse('session-bootstrap'), {}),
+    'logout': _logout,
+    'send-email': lambda seed: ('post', reverse('send-email'), {'data': {'email': seed.user.email}, 'format': 'json'}),
+    'verify-email': _verify_email,
+    'gmail-auth-url': lambda seed: ('get', reverse('gmail-auth-url'), {}),
+    'gmail-accept-privacy': lambda seed: ('post', reverse('gmail-accept-privacy'), {}),
+    'gmail-status': lambda seed: ('get', reverse('gmail-status'), {}),
+    'payments:user-wallet': lambda seed: ('get', reverse('payments:user-wallet'), {}),
+    'payments:verify-payment': _verify_payment,
+    'payments:order-status': lambda seed: ('get', reverse('payments:order-status', args=[f'budget-{seed.size}-0']), {}),
+    'payments:webhook': _webhook,
+    'payments:purchase-feature': lambda seed: ('post', reverse('payments:purchase-feature'), {
+        'data': {'feature_code': seed.features[0].code, 'client_key': seed.next()}, 'format': 'json'}),
+    'feature-list': lambda seed: ('get', reverse('feature-list'), {}),
+    'feature-create': lambda seed: ('post', reverse('feature-create'), {
+        'data': {'name': f'Created {seed.next()}', 'code': f'created_{seed.next()}'}, 'format': 'json'}),
+    'delete-feature': _delete_feature,
+    'user-feature-list': lambda seed: ('get', reverse('user-feature-list'), {}),
+    'toggle-feature': lambda seed: ('post', reverse('toggle-feature'), {
+        'data': {'user_id': seed.user.id, 'feature_id': seed.features[0].id, 'is_active': True}, 'format': 'json'}),
+    'bulk-entitlements': lambda seed: ('post', reverse('bulk-entitlements'), {
+        'data': {'action': 'grant', 'feature_codes': [seed.features[0].code], 'user_ids': [seed.user.id]},
+        'format': 'json'}),
+    'entitlement-check': _entitlement_check,
+}
+
+
+def url_names(urlconf):
+    """URL names as used by reverse() and QUERY_BUDGETS, namespaced where the urlconf sets app_name"""
+    resolver = get_resolver(urlconf)
+    namespace = getattr(resolver.urlconf_module, 'app_name', None)
+    names = []
+    patterns = list(resolver.url_patterns)
+    while patterns:
+        pattern = patterns.pop()
+        if isinstance(pattern, URLResolver):
+            patterns.extend(pattern.url_patterns)
+        elif isinstance(pattern, URLPattern):
+            names.append(f'{namespace}:{pattern.name}' if namespace else pattern.name)
+    return sorted(names)
+
+
+def get_budget(name):
+    return getattr(settings, 'QUERY_BUDGETS', {}).get(name, {}).get('queries', DEFAULT_BUDGET)
+
+
+def warm_up(seed, name):
+    """
+    Call endpoint ``name`` once so caches (catalog, entitlements) are loaded,
+    then return the ``(method, path, client kwargs)`` of the call to measure.
+    """
+    seed.authenticate()
+    method, path, kwargs = CASES[name](seed)
+    getattr(seed.client, method)(path, **kwargs)
+    seed.authenticate()
+    return CASES[name](seed)
+
+
+class QueryBudgetMixin:
+    """
+    Query-count tests for the endpoints of ``urlconf``; mix into a TransactionTestCase.
+
+    Every endpoint is called for seeded users with 1, 100 and 10k ledger rows
+    and orders. It must stay within its QUERY_BUDGETS entry and make the same
+    queries for every size (no N+1). A TransactionTestCase is needed because
+    the replica alias is a test mirror on its own connection, which only sees
+    committed rows.
+    """
+    urlconf = None
+    databases = {'default', 'replica'}
+    sizes = (1, 100, 10_000)
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        # The revocation list loads on the first request; no periodic syncs during the measurements
+        overrides = override_settings(TOKEN_REVOCATION_SYNC_SECONDS=3600, AUTH_THROTTLE_ENABLED=False,
+                                      SERVICE_API_KEYS=[f'budget:{SERVICE_KEY}'])
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        self.names = url_names(self.urlconf)
+
+    def test_every_endpoint_has_a_case(self):
+        uncovered = [name for name in self.names if name not in CASES and name not in SKIPPED]
+        self.assertEqual(uncovered, [], "Add a query budget case to core.query_budgets.CASES")
+
+    def test_endpoints_within_budget(self):
+        small, *larger = (Seed(size) for size in self.sizes)
+        for name in self.names:
+            if name not in CASES:
+                continue
+            with self.subTest(endpoint=name):
+                method, path, kwargs = warm_up(small, name)
+                with CaptureQueriesContext(connections['default']) as primary, \
+                        CaptureQueriesContext(connections['replica']) as replica:
+                    response = getattr(small.client, method)(path, **kwargs)
+                # Counted now: later requests reset the connections' query logs
+                counts = {'default': len(primary), 'replica': len(replica)}
+                self.assertLess(response.status_code, 400, response.content[:200])
+                self.assertLessEqual(sum(counts.values()), get_budget(name), "queries over the QUERY_BUDGETS entry")
+
+                for large in larger:
+                    method, path, kwargs = warm_up(large, name)
+                    with self.assertNumQueries(counts['default'], using='default'), \
+                            self.assertNumQueries(counts['replica'], using='replica'):
+                        response = getattr(large.client, method)(path, **kwargs)
+                    self.assertLess(response.status_code, 400, response.content[:200])
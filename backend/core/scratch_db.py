@@ -0,0 +1,18 @@
+"""
+Throwaway databases for management commands that seed data (benchmarks and
+load tests). Uses the same test database setup as ``manage.py test``, so
+production data is never touched.
+"""
+from contextlib import contextmanager
+
+from django.test.utils import setup_databases, teardown_databases
+
+
+@contextmanager
+def scratch_database(verbosity=0, keepdb=False):
+    """Create the test databases for the block and drop them afterwards"""
+    old_config = setup_databases(verbosity, interactive=False, keepdb=keepdb)
+    try:
+        yield
+    finally:
+        teardown_databases(old_config, verbosity, keepdb=keepdb)
@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/4.2/ref/settings/
 """
 
+import importlib.util
 from pathlib import Path
 from decouple import config, Csv
 from datetime import timedelta
@@ -74,6 +75,7 @@ MY_APPS = [
 INSTALLED_APPS = DJANGO_APPS + THIRD_PARTY_APPS + MY_APPS
 
 MIDDLEWARE = [
+    'core.instrumentation.RequestInstrumentationMiddleware',
     'corsheaders.middleware.CorsMiddleware', 
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -95,6 +97,10 @@ REST_FRAMEWORK = {
         'accounts.authentication.CookieJWTAuthentication',
         'rest_framework_simplejwt.authentication.JWTAuthentication',
     ),
+    # Reverse proxies in front of the app. Throttles take the client IP from
+    # X-Forwarded-For only this many hops deep; 0 uses REMOTE_ADDR, so a
+    # client can't pick its own IP by sending the header.
+    'NUM_PROXIES': config('NUM_PROXIES', default=0, cast=int),
 }
 
 SPECTACULAR_SETTINGS = {
@@ -157,6 +163,153 @@ DATABASES = {
     }
 }
 
+# Read replica used by read-only endpoints (see core.db_routers).
+# Without DB_REPLICA_* settings the alias points at the primary, which keeps
+# routing testable against a single local Postgres.
+DATABASES['replica'] = {
+    **DATABASES['default'],
+    'NAME': config('DB_REPLICA_NAME', default=DATABASES['default']['NAME']),
+    'USER': config('DB_REPLICA_USER', default=DATABASES['default']['USER']),
+    'PASSWORD': config('DB_REPLICA_PASSWORD', default=DATABASES['default']['PASSWORD']),
+    'HOST': config('DB_REPLICA_HOST', default=DATABASES['default']['HOST']),
+    'PORT': config('DB_REPLICA_PORT', default=DATABASES['default']['PORT']),
+    'TEST': {'MIRROR': 'default'},
+}
+
+DATABASE_ROUTERS = ['core.db_routers.PrimaryReplicaRouter']
+
+# Seconds a user keeps reading from the primary after a wallet or order write
+REPLICA_STICKY_SECONDS = config('REPLICA_STICKY_SECONDS', default=5, cast=int)
+
+
+# Cache
+# https://docs.djangoproject.com/en/4.2/topics/cache/
+# Use a shared backend (redis/memcached) when running more than one worker.
+
+CACHES = {
+    'default': {
+        'BACKEND': config('CACHE_BACKEND', default='django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': config('CACHE_LOCATION', default=''),
+    }
+}
+
+# Seconds a worker may serve its in-process feature catalog and coin rates
+# (core/local_cache.py) before reloading them. Changes reach every worker at
+# once only with a shared cache; with LocMemCache this bounds staleness.
+LOCAL_CACHE_MAX_AGE = config('LOCAL_CACHE_MAX_AGE', default=30, cast=int)
+
+# Seconds a user's active feature codes stay cached for permission checks
+# (capped at LOCAL_CACHE_MAX_AGE with a per-process cache, see features/entitlements.py)
+ENTITLEMENT_CACHE_TIMEOUT = config('ENTITLEMENT_CACHE_TIMEOUT', default=300, cast=int)
+# Entitlement change webhooks (features/outbox.py, `manage.py dispatch_entitlement_events`)
+ENTITLEMENT_WEBHOOK_TIMEOUT = config('ENTITLEMENT_WEBHOOK_TIMEOUT', default=5, cast=float)
+ENTITLEMENT_WEBHOOK_MAX_BACKOFF = config('ENTITLEMENT_WEBHOOK_MAX_BACKOFF', default=600, cast=int)
+ENTITLEMENT_WEBHOOK_LEASE_SECONDS = config('ENTITLEMENT_WEBHOOK_LEASE_SECONDS', default=60, cast=int)
+# Longer than any transaction that changes entitlements
+ENTITLEMENT_EVENT_SETTLE_SECONDS = config('ENTITLEMENT_EVENT_SETTLE_SECONDS', default=5, cast=int)
+ENTITLEMENT_EVENT_RETENTION_DAYS = config('ENTITLEMENT_EVENT_RETENTION_DAYS', default=7, cast=int)
+# Product service credentials as 'name:key' entries, sent as `Authorization: Service <key>`
+SERVICE_API_KEYS = config('SERVICE_API_KEYS', default='', cast=Csv())
+# Most (user_id, feature_code) pairs accepted by one entitlement check request
+ENTITLEMENT_CHECK_MAX_PAIRS = config('ENTITLEMENT_CHECK_MAX_PAIRS', default=10000, cast=int)
+
+# Request instrumentation (core.instrumentation)
+SERVER_TIMING_HEADER = config('SERVER_TIMING_HEADER', default=DEBUG, cast=bool)
+# Bearer token required by /metrics; without one it is only served with DEBUG on
+METRICS_AUTH_TOKEN = config('METRICS_AUTH_TOKEN', default='')
+# Per-view limits keyed by URL name; over-budget requests are logged, and the
+# apps' QueryBudgetTests fail on them (core/query_budgets.py; unlisted views get 20)
+QUERY_BUDGETS = {
+    'register': {'queries': 9},
+    'login': {'queries': 6},
+    'profile': {'queries': 3},
+    'dashboard': {'queries': 8},
+    'session-bootstrap': {'queries': 3},
+    'logout': {'queries': 8},
+    'send-email': {'queries': 6},
+    'verify-email': {'queries': 4},
+    'gmail-auth-url': {'queries': 2},
+    'gmail-accept-privacy': {'queries': 4},
+    'gmail-status': {'queries': 3},
+    'payments:user-wallet': {'queries': 3},
+    'payments:verify-payment': {'queries': 10},
+    'payments:order-status': {'queries': 3},
+    'payments:webhook': {'queries': 11},
+    'payments:purchase-feature': {'queries': 14},
+    'feature-list': {'queries': 1},
+    'feature-create': {'queries': 6},
+    'delete-feature': {'queries': 9},
+    'user-feature-list': {'queries': 3},
+    'toggle-feature': {'queries': 11},
+    'bulk-entitlements': {'queries': 9},
+    'entitlement-check': {'queries': 2},
+}
+
+
+# Password hashing (accounts/hashers.py). PASSWORD_HASHER hashes new
+# passwords; the others still verify older hashes, which are rehashed on the
+# next login, as are hashes made with different costs. Pick the costs for
+# this hardware with `manage.py calibrate_password_hashing`.
+_HASHERS = {
+    'argon2': 'accounts.hashers.Argon2PasswordHasher',
+    'scrypt': 'accounts.hashers.ScryptPasswordHasher',
+    'pbkdf2_sha256': 'accounts.hashers.PBKDF2PasswordHasher',
+}
+PASSWORD_HASHER = config(
+    'PASSWORD_HASHER', default='argon2' if importlib.util.find_spec('argon2') else 'scrypt'
+)
+PASSWORD_HASHERS = [_HASHERS[PASSWORD_HASHER]] + [
+    path for name, path in _HASHERS.items() if name != PASSWORD_HASHER
+]
+PASSWORD_HASH_PARAMS = {
+    'argon2': {
+        'time_cost': config('ARGON2_TIME_COST', default=2, cast=int),
+        'memory_cost': config('ARGON2_MEMORY_COST', default=19456, cast=int),  # KiB
+        'parallelism': config('ARGON2_PARALLELISM', default=1, cast=int),
+    },
+    'scrypt': {
+        'work_factor': config('SCRYPT_WORK_FACTOR', default=2 ** 14, cast=int),
+        'block_size': config('SCRYPT_BLOCK_SIZE', default=8, cast=int),
+        'parallelism': config('SCRYPT_PARALLELISM', default=1, cast=int),
+    },
+    'pbkdf2_sha256': {
+        'iterations': config('PBKDF2_ITERATIONS', default=600000, cast=int),
+    },
+}
+AUTHENTICATION_BACKENDS = ['accounts.backends.PooledModelBackend']
+# Threads per process for password hashing at login; 0 hashes on the request thread
+PASSWORD_CHECK_WORKERS = config('PASSWORD_CHECK_WORKERS', default=0, cast=int)
+PASSWORD_CHECK_MAX_PENDING = config('PASSWORD_CHECK_MAX_PENDING', default=8, cast=int)
+PASSWORD_CHECK_TIMEOUT = config('PASSWORD_CHECK_TIMEOUT', default=5, cast=float)
+# Asymmetric JWT signing (accounts/jwt_keys.py): PEM private keys, the first
+# one signs. Empty keeps HS256 with SECRET_KEY. Generate keys with
+# `manage.py generate_jwt_key`; public keys are served at /.well-known/jwks.json.
+JWT_SIGNING_KEY_FILES = config('JWT_SIGNING_KEY_FILES', default='', cast=Csv())
+# Keep accepting HS256 tokens issued before the switch; turn off once they expire
+JWT_ACCEPT_LEGACY_HS256 = config('JWT_ACCEPT_LEGACY_HS256', default=True, cast=bool)
+JWT_JWKS_MAX_AGE = config('JWT_JWKS_MAX_AGE', default=300, cast=int)
+# Seconds between each worker's pulls of new token revocations (accounts/revocation.py)
+TOKEN_REVOCATION_SYNC_SECONDS = config('TOKEN_REVOCATION_SYNC_SECONDS', default=5, cast=int)
+
+# Email OTPs (accounts/otp.py): 'db' keeps them in EmailOTP (clean up with
+# `manage.py purge_email_otps`); 'cache' needs a cache shared by all workers
+OTP_STORE = config('OTP_STORE', default='db')
+OTP_TTL_SECONDS = config('OTP_TTL_SECONDS', default=300, cast=int)
+OTP_MAX_ATTEMPTS = config('OTP_MAX_ATTEMPTS', default=5, cast=int)
+
+# Login/OTP throttling (accounts/throttling.py). With the default 'local'
+# store the limits apply per worker process; 'cache' shares them through the
+# AUTH_THROTTLE_CACHE alias.
+AUTH_THROTTLE_ENABLED = config('AUTH_THROTTLE_ENABLED', default=True, cast=bool)
+AUTH_THROTTLE_STORE = config('AUTH_THROTTLE_STORE', default='local')
+AUTH_THROTTLE_CACHE = config('AUTH_THROTTLE_CACHE', default='default')
+AUTH_THROTTLE_RATES = {
+    'login': {'ip': '20/min', 'email': '10/min', 'global': '50/s'},
+    'google_login': {'ip': '20/min', 'global': '50/s'},
+    'otp_send': {'ip': '10/h', 'email': '3/10min', 'global': '20/s'},
+    'otp_verify': {'ip': '30/h', 'email': '10/10min', 'global': '50/s'},
+}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
@@ -210,6 +363,17 @@ DEFAULT_FROM_EMAIL = EMAIL_HOST_USER
 RAZORPAY_KEY_ID = config("RAZORPAY_KEY_ID", default="")
 RAZORPAY_KEY_SECRET = config("RAZORPAY_KEY_SECRET", default="")
 RAZORPAY_WEBHOOK_SECRET = config("RAZORPAY_WEBHOOK_SECRET", default="")
+# Point at `manage.py run_fake_razorpay` for load tests
+RAZORPAY_BASE_URL = config("RAZORPAY_BASE_URL", default="https://api.razorpay.com")
+
+# Redemption payouts (see payments.utils.payouts)
+# Required in production: the fake gateway approves every payout without
+# sending money, so it is only the default with DEBUG on
+PAYOUT_GATEWAY = config(
+    "PAYOUT_GATEWAY", default="payments.utils.payouts.FakePayoutGateway" if DEBUG else ""
+)
+PAYOUT_LEASE_SECONDS = config("PAYOUT_LEASE_SECONDS", default=600, cast=int)  # Retry delay for unfinished payouts
+PAYOUT_MAX_ATTEMPTS = config("PAYOUT_MAX_ATTEMPTS", default=5, cast=int)
 
 # Frontend URL for payment callbacks
 FRONTEND_URL = config("FRONTEND_URL", default="http://localhost:3000")
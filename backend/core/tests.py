@@ -0,0 +1,149 @@
+from datetime import datetime, timedelta
+from datetime import timezone as dt_timezone
+from decimal import Decimal
+from itertools import count
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+from rest_framework import serializers
+from rest_framework.renderers import JSONRenderer
+from django.urls import NoReverseMatch, reverse
+
+from features.models import Feature, UserFeature
+from features.serializers import FeatureSerializer, UserFeatureSerializer
+from payments.models import CoinTransaction, FeaturePurchase, PaymentOrder
+from payments.serializers import CoinTransactionSerializer, PaymentOrderSerializer
+
+from .fast_serializers import FastSerializer
+
+from .instrumentation import RequestMetrics, _current, timed
+from .local_cache import VersionedLocalCache
+
+
+class MetricsViewTests(SimpleTestCase):
+    @override_settings(METRICS_AUTH_TOKEN='', DEBUG=False)
+    def test_hidden_without_a_token(self):
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, 404)
+
+    @override_settings(METRICS_AUTH_TOKEN='scrape-token')
+    def test_requires_the_token(self):
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, 401)
+        response = self.client.get(reverse('metrics'), HTTP_AUTHORIZATION='Bearer scrape-token')
+        self.assertEqual(response.status_code, 200)
+
+
+class QueryBudgetSettingTests(SimpleTestCase):
+    def test_budget_keys_are_url_names(self):
+        # Keys must match resolver_match.view_name, namespace included
+        for name in settings.QUERY_BUDGETS:
+            with self.subTest(name=name):
+                try:
+                    reverse(name)
+                except NoReverseMatch as e:
+                    # Routes with arguments still resolve by name
+                    self.assertNotIn("is not a valid view function or pattern name", str(e))
+
+
+class InstrumentationTests(SimpleTestCase):
+    @override_settings(SERVER_TIMING_HEADER=True)
+    def test_server_timing_includes_serializer_and_render(self):
+        response = self.client.get(reverse('jwks'))
+        self.assertIn('serializer;dur=', response['Server-Timing'])
+        self.assertIn('render;dur=', response['Server-Timing'])
+
+    def test_serializer_data_is_timed(self):
+        metrics = RequestMetrics()
+        token = _current.set(metrics)
+        self.addCleanup(_current.reset, token)
+        FeatureSerializer(Feature(name='Reports', code='reports')).data
+        self.assertGreater(metrics.serializer_time, 0)
+
+    def test_nested_serializer_time_counts_once(self):
+        metrics = RequestMetrics()
+        token = _current.set(metrics)
+        self.addCleanup(_current.reset, token)
+        with timed('serializer'):
+            self.assertEqual(metrics.active, {'serializer'})
+            FeatureSerializer(Feature(name='Reports', code='reports')).data
+            self.assertEqual(metrics.serializer_time, 0)
+        self.assertGreater(metrics.serializer_time, 0)
+        self.assertEqual(metrics.active, set())
+
+
+class VersionedLocalCacheTests(SimpleTestCase):
+    def setUp(self):
+        self.loads = count(1)
+        self.local = VersionedLocalCache('test-local-cache', lambda: next(self.loads))
+
+    def test_bump_reloads(self):
+        self.assertEqual(self.local.get(), 1)
+        self.assertEqual(self.local.get(), 1)
+        self.local.bump()
+        self.assertEqual(self.local.get(), 2)
+
+    @override_settings(LOCAL_CACHE_MAX_AGE=0)
+    def test_reloads_after_max_age_without_a_bump(self):
+        # Another worker's bump never reaches a per-process cache
+        self.assertEqual(self.local.get(), 1)
+        self.assertEqual(self.local.get(), 2)
+
+
+class PurchaseLedgerSerializer(serializers.ModelSerializer):
+    """A nested relation that can be null (FeaturePurchase.transaction)"""
+    feature_code = serializers.CharField(source='feature.code', read_only=True)
+    transaction = CoinTransactionSerializer(read_only=True)
+
+    class Meta:
+        model = FeaturePurchase
+        fields = ['purchase_id', 'feature_code', 'coins_spent', 'transaction', 'activated_at', 'client_key']
+
+
+class FastSerializerEquivalenceTests(TestCase):
+    """FastSerializer output must be exactly what the DRF serializer gives"""
+
+    @classmethod
+    def setUpTestData(cls):
+        user = User.objects.create_user('member', 'member@example.com')
+        ist = dt_timezone(timedelta(hours=5, minutes=30))
+        full = Feature.objects.create(name='Reports', code='reports', description='Monthly', coin_price=25)
+        bare = Feature.objects.create(name='Export', code='export', status='upcoming')
+        UserFeature.objects.create(user=user, feature=full, is_active=True,
+                                   expires_on=datetime(2026, 3, 1, 9, 30, 15, 123456, tzinfo=ist))
+        UserFeature.objects.create(user=user, feature=bare)
+        PaymentOrder.objects.create(order_id='order-1', user=user, amount=Decimal('10.50'), coins_to_credit=10,
+                                    expires_at=datetime(2026, 1, 1, tzinfo=dt_timezone.utc))
+        PaymentOrder.objects.create(order_id='order-2', razorpay_order_id='rzp-2', user=user, amount=Decimal('99'),
+                                    coins_to_credit=99, status='PAID', qr_code_status='paid',
+                                    expires_at=datetime(2026, 1, 1, 12, 0, 0, 500, tzinfo=ist))
+        credit = CoinTransaction.objects.create(user=user, transaction_type='PURCHASE', amount=99, balance_after=99,
+                                                reference_id='order-2', description='Bought coins')
+        CoinTransaction.objects.create(user=user, transaction_type='FEATURE_BUY', amount=-25, balance_after=74)
+        FeaturePurchase.objects.create(user=user, feature=full, coins_spent=25, transaction=credit,
+                                       activated_at=timezone.now(), client_key='key-1')
+        FeaturePurchase.objects.create(user=user, feature=bare, coins_spent=0)
+
+    def assertSameOutput(self, serializer_class, queryset):
+        for zone in ('UTC', 'Asia/Kolkata'):
+            with self.subTest(serializer=serializer_class.__name__, timezone=zone), timezone.override(zone):
+                expected = serializer_class(queryset, many=True).data
+                actual = FastSerializer(serializer_class).serialize(queryset)
+                self.assertEqual(actual, expected)
+                # Same key order and value types, not just equal values
+                self.assertEqual(JSONRenderer().render(actual), JSONRenderer().render(expected))
+
+    def test_feature_serializer(self):
+        self.assertSameOutput(FeatureSerializer, Feature.objects.order_by('id'))
+
+    def test_user_feature_serializer(self):
+        self.assertSameOutput(UserFeatureSerializer, UserFeature.objects.order_by('id'))
+
+    def test_payment_order_serializer(self):
+        self.assertSameOutput(PaymentOrderSerializer, PaymentOrder.objects.order_by('id'))
+
+    def test_coin_transaction_serializer(self):
+        self.assertSameOutput(CoinTransactionSerializer, CoinTransaction.objects.order_by('id'))
+
+    def test_null_nested_relation(self):
+        self.assertSameOutput(PurchaseLedgerSerializer, FeaturePurchase.objects.order_by('id'))
@@ -18,12 +18,20 @@ from django.contrib import admin
 from django.urls import path, include
 from drf_spectacular.views import SpectacularAPIView, SpectacularSwaggerView, SpectacularRedocView
 
+from accounts.views import jwks_view
+
+from .metrics import metrics_view
+from .views import EndpointStatsView
+
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/accounts/', include('accounts.urls')),
     # Feature module URLs
     path('api/', include('features.urls')),
     path('api/payments/', include('payments.urls')),
+    path('api/stats/endpoints/', EndpointStatsView.as_view(), name='endpoint-stats'),
+    path('metrics', metrics_view, name='metrics'),
+    path('.well-known/jwks.json', jwks_view, name='jwks'),
 
     path('api/schema/', SpectacularAPIView.as_view(), name='schema'),
     path('api/schema/swagger-ui/', SpectacularSwaggerView.as_view(url_name='schema'), name='swagger-ui'),
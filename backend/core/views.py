@@ -0,0 +1,23 @@
+from drf_spectacular.utils import extend_schema
+from rest_framework import status
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from accounts.models import IsCustomAdmin
+
+from .instrumentation import endpoint_stats
+
+
+class EndpointStatsView(APIView):
+    """Per-endpoint query counts and latencies collected by this worker process"""
+    permission_classes = [IsAuthenticated, IsCustomAdmin]
+
+    @extend_schema(responses={200: dict})
+    def get(self, request):
+        return Response(endpoint_stats.snapshot())
+
+    @extend_schema(responses={204: None})
+    def delete(self, request):
+        endpoint_stats.reset()
+        return Response(status=status.HTTP_204_NO_CONTENT)
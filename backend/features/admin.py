@@ -1,10 +1,28 @@
 from django.contrib import admin
-from .models import Feature, UserFeature
+from .models import Feature, UserFeature, WebhookEndpoint
+from .catalog import invalidate_catalog
 
 @admin.register(Feature)
 class FeatureAdmin(admin.ModelAdmin):
-    list_display = ('name', 'code')
+    list_display = ('name', 'code', 'coin_price', 'duration_days')
+
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        invalidate_catalog()
+
+    def delete_model(self, request, obj):
+        super().delete_model(request, obj)
+        invalidate_catalog()
+
+    def delete_queryset(self, request, queryset):
+        super().delete_queryset(request, queryset)
+        invalidate_catalog()
 
 @admin.register(UserFeature)
 class UserFeatureAdmin(admin.ModelAdmin):
     list_display = ('user', 'feature', 'is_active', 'expires_on')
+
+@admin.register(WebhookEndpoint)
+class WebhookEndpointAdmin(admin.ModelAdmin):
+    list_display = ('name', 'url', 'is_active', 'cursor', 'failures', 'next_attempt_at', 'last_delivered_at')
+    readonly_fields = ('cursor', 'failures', 'next_attempt_at', 'leased_until', 'last_error', 'last_delivered_at')
@@ -0,0 +1,84 @@
+"""
+In-process feature catalog.
+
+The catalog is rendered to JSON bytes once per version and served as is, so
+catalog requests cost no queries and no serialization. The coin price list
+used by feature purchases is cached the same way. Views that change features
+call ``invalidate_catalog()`` after their write.
+"""
+import hashlib
+from typing import NamedTuple
+
+from django.db import transaction
+from django.utils.http import parse_etags
+from rest_framework.renderers import JSONRenderer
+
+from core.db_routers import PRIMARY_DB
+from core.fast_serializers import fast_serializer
+from core.local_cache import VersionedLocalCache
+from .models import Feature
+from .serializers import FeatureSerializer
+
+
+class CatalogSnapshot(NamedTuple):
+    body: bytes
+    etag: str
+
+
+class FeaturePrice(NamedTuple):
+    feature_id: int
+    coin_price: int
+    duration_days: int
+
+
+def _load_catalog():
+    # Always load from the primary: a lagging replica would pin stale data
+    # to the new version until the next change.
+    features = Feature.objects.using(PRIMARY_DB).order_by('id')
+    body = JSONRenderer().render(fast_serializer(FeatureSerializer).serialize(features))
+    etag = '"%s"' % hashlib.sha256(body).hexdigest()[:32]
+    return CatalogSnapshot(body=body, etag=etag)
+
+
+def _load_prices():
+    features = Feature.objects.using(PRIMARY_DB).filter(coin_price__isnull=False, status='active')
+    return {
+        code: FeaturePrice(feature_id, coin_price, duration_days)
+        for code, feature_id, coin_price, duration_days in features.values_list(
+            'code', 'id', 'coin_price', 'duration_days'
+        )
+    }
+
+
+# Both caches share the 'feature-catalog' version, so one bump reloads both
+_catalog = VersionedLocalCache('feature-catalog', _load_catalog)
+_prices = VersionedLocalCache('feature-catalog', _load_prices)
+
+
+def get_catalog():
+    """Return the current catalog snapshot"""
+    return _catalog.get()
+
+
+def get_feature_prices():
+    """Return ``{code: FeaturePrice}`` for features that can be bought with coins"""
+    return _prices.get()
+
+
+def catalog_version():
+    """Return the shared catalog version number"""
+    return _catalog.version()
+
+
+def invalidate_catalog():
+    """Bump the catalog version once the current transaction commits"""
+    transaction.on_commit(_catalog.bump)
+
+
+def etag_matches(request, etag):
+    """Check the request's If-None-Match header against ``etag``"""
+    header = request.META.get('HTTP_IF_NONE_MATCH')
+    if not header:
+        return False
+    tags = parse_etags(header)
+    return '*' in tags or etag in (tag.removeprefix('W/') for tag in tags)
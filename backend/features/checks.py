@@ -0,0 +1,18 @@
+from django.conf import settings
+from django.core.checks import Tags, Warning, register
+
+from core.local_cache import is_process_local
+
+
+@register(Tags.caches, deploy=True)
+def check_entitlement_cache(app_configs, **kwargs):
+    """Entitlement invalidations only reach every worker through a shared cache"""
+    if not is_process_local():
+        return []
+    return [Warning(
+        f"The {settings.CACHES['default']['BACKEND'].rsplit('.', 1)[-1]} cache backend is per process",
+        hint="A revoked feature stays granted on other workers for up to LOCAL_CACHE_MAX_AGE "
+             f"({getattr(settings, 'LOCAL_CACHE_MAX_AGE', 30)}s), and the feature catalog and coin rates "
+             "lag the same way. Set CACHE_BACKEND to a shared cache such as Redis.",
+        id='features.W001',
+    )]
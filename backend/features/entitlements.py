@@ -0,0 +1,235 @@
+"""
+Entitlement lookups, bulk grant/revoke and expiry.
+
+Each user's active entitlements are cached as a ``{feature_code: expiry}``
+map so permission checks cost one cache lookup; batch checks for many users
+read all their maps in one ``get_many`` and load the misses with one query.
+Bulk writes are applied in chunks with ``bulk_create(update_conflicts=True)``
+and set-based UPDATEs, and the affected users' cache entries are dropped in
+one call per chunk.
+
+Invalidation deletes the users' keys from the default cache, which only
+reaches every worker when that cache is shared (Redis, memcached). With the
+per-process LocMemCache, entries are kept at most ``LOCAL_CACHE_MAX_AGE``
+seconds instead of ``ENTITLEMENT_CACHE_TIMEOUT``, so a revoke reaches the
+other workers within that time; ``check --deploy`` warns about it
+(``features.W001``).
+
+Expired rows are switched off by ``expire_entitlements`` (run periodically
+through the ``expire_entitlements`` command), so ``is_active`` alone is
+authoritative for queries; the cached expiry only covers the time between
+two sweeps.
+"""
+from itertools import islice
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+
+from core.local_cache import is_process_local
+from .models import UserFeature
+from .signals import entitlements_changed
+
+DEFAULT_CHUNK_SIZE = 1000
+
+
+def _cache_key(user_id):
+    return f"entitlements:{user_id}"
+
+
+def _cache_timeout():
+    timeout = getattr(settings, 'ENTITLEMENT_CACHE_TIMEOUT', 300)
+    if is_process_local():
+        # Other workers never see this worker's invalidations
+        timeout = min(timeout, getattr(settings, 'LOCAL_CACHE_MAX_AGE', 30))
+    return timeout
+
+
+def get_user_entitlements(user_id):
+    """Return ``{feature_code: expiry timestamp or None}`` for active features"""
+    key = _cache_key(user_id)
+    entitlements = cache.get(key)
+    if entitlements is None:
+        rows = UserFeature.objects.filter(user_id=user_id, is_active=True).values_list(
+            'feature__code', 'expires_on'
+        )
+        entitlements = {
+            code: expires_on.timestamp() if expires_on else None
+            for code, expires_on in rows
+        }
+        cache.set(key, entitlements, _cache_timeout())
+    return entitlements
+
+
+def get_entitlements_many(user_ids):
+    """``get_user_entitlements`` for many users: ``{user_id: {feature_code: expiry}}``"""
+    keys = {user_id: _cache_key(user_id) for user_id in user_ids}
+    cached = cache.get_many(list(keys.values()))
+    result, missing = {}, []
+    for user_id, key in keys.items():
+        if key in cached:
+            result[user_id] = cached[key]
+        else:
+            missing.append(user_id)
+    if missing:
+        loaded = {user_id: {} for user_id in missing}
+        rows = UserFeature.objects.filter(user_id__in=missing, is_active=True).values_list(
+            'user_id', 'feature__code', 'expires_on'
+        )
+        for user_id, code, expires_on in rows:
+            loaded[user_id][code] = expires_on.timestamp() if expires_on else None
+        cache.set_many({keys[user_id]: entitlements for user_id, entitlements in loaded.items()},
+                       _cache_timeout())
+        result.update(loaded)
+    return result
+
+
+def _is_current(entitlements, feature_code, now):
+    if feature_code not in entitlements:
+        return False
+    expires_at = entitlements[feature_code]
+    return expires_at is None or expires_at > now
+
+
+def has_feature(user, feature_code):
+    """Check if the user holds an active, unexpired entitlement"""
+    return _is_current(get_user_entitlements(user.id), feature_code, timezone.now().timestamp())
+
+
+def check_entitlements(pairs):
+    """``has_feature`` for each ``(user_id, feature_code)`` pair, as a list of booleans"""
+    entitlements = get_entitlements_many({user_id for user_id, _ in pairs})
+    now = timezone.now().timestamp()
+    return [_is_current(entitlements[user_id], code, now) for user_id, code in pairs]
+
+
+def invalidate_entitlements(user_ids):
+    """Drop cached entitlements for these users once the transaction commits"""
+    keys = [_cache_key(user_id) for user_id in user_ids]
+    if keys:
+        transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+def chunked(iterable, size):
+    iterator = iter(iterable)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+def select_user_ids(user_ids=None, role=None, is_verified=None, email_domain=None,
+                    joined_after=None, joined_before=None):
+    """Return an id iterator for explicit user ids or users matching the filters"""
+    users = User.objects.all()
+    if user_ids is not None:
+        users = users.filter(id__in=user_ids)
+    if role:
+        users = users.filter(custom_user__role=role)
+    if is_verified is not None:
+        users = users.filter(custom_user__is_verified=is_verified)
+    if email_domain:
+        users = users.filter(email__iendswith=f"@{email_domain}")
+    if joined_after:
+        users = users.filter(date_joined__gte=joined_after)
+    if joined_before:
+        users = users.filter(date_joined__lt=joined_before)
+    return users.order_by('id').values_list('id', flat=True).iterator(chunk_size=DEFAULT_CHUNK_SIZE)
+
+
+def grant_features(user_ids, feature_ids, expires_on=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Activate ``feature_ids`` for every user, creating rows as needed.
+
+    Existing rows are re-activated with the new expiry. Returns the number of
+    users processed and rows written.
+    """
+    users = rows_written = 0
+    for chunk in chunked(user_ids, chunk_size):
+        now = timezone.now()
+        rows = [
+            UserFeature(user_id=user_id, feature_id=feature_id, is_active=True,
+                        activated_on=now, expires_on=expires_on)
+            for user_id in chunk
+            for feature_id in feature_ids
+        ]
+        with transaction.atomic():
+            UserFeature.objects.bulk_create(
+                rows,
+                update_conflicts=True,
+                unique_fields=['user', 'feature'],
+                update_fields=['is_active', 'activated_on', 'expires_on'],
+            )
+            entitlements_changed.send(
+                sender=UserFeature,
+                action='granted',
+                pairs=[(row.user_id, row.feature_id) for row in rows],
+                expires_on=expires_on,
+            )
+            invalidate_entitlements(chunk)
+        users += len(chunk)
+        rows_written += len(rows)
+    return {'users': users, 'rows': rows_written}
+
+
+def revoke_features(user_ids, feature_ids, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Deactivate ``feature_ids`` for every user with one UPDATE per chunk.
+
+    The active rows are locked and read first, so the ``revoked`` event only
+    lists the (user, feature) pairs that actually changed. Returns the number
+    of users processed and rows deactivated.
+    """
+    users = rows_updated = 0
+    for chunk in chunked(user_ids, chunk_size):
+        with transaction.atomic():
+            rows = list(
+                UserFeature.objects.select_for_update()
+                .filter(user_id__in=chunk, feature_id__in=feature_ids, is_active=True)
+                .order_by('id')
+                .values_list('id', 'user_id', 'feature_id')
+            )
+            if rows:
+                UserFeature.objects.filter(id__in=[row[0] for row in rows]).update(is_active=False)
+                entitlements_changed.send(
+                    sender=UserFeature,
+                    action='revoked',
+                    pairs=[(user_id, feature_id) for _, user_id, feature_id in rows],
+                    expires_on=None,
+                )
+                invalidate_entitlements({user_id for _, user_id, _ in rows})
+        users += len(chunk)
+        rows_updated += len(rows)
+    return {'users': users, 'rows': rows_updated}
+
+
+def expire_entitlements(chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Deactivate rows whose expiry has passed, one chunk per transaction.
+
+    Rows are claimed with ``FOR UPDATE SKIP LOCKED`` so concurrent sweepers
+    and grants don't block each other. Sends an ``expired`` event per chunk
+    and returns the number of rows deactivated.
+    """
+    now = timezone.now()
+    expired = 0
+    while True:
+        with transaction.atomic():
+            rows = list(
+                UserFeature.objects.select_for_update(skip_locked=True)
+                .filter(is_active=True, expires_on__lte=now)
+                .order_by('expires_on')
+                .values_list('id', 'user_id', 'feature_id')[:chunk_size]
+            )
+            if not rows:
+                break
+            UserFeature.objects.filter(id__in=[row[0] for row in rows]).update(is_active=False)
+            entitlements_changed.send(
+                sender=UserFeature,
+                action='expired',
+                pairs=[(user_id, feature_id) for _, user_id, feature_id in rows],
+                expires_on=None,
+            )
+            invalidate_entitlements({user_id for _, user_id, _ in rows})
+        expired += len(rows)
+    return expired
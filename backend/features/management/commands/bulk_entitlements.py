@@ -0,0 +1,66 @@
+from datetime import datetime, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from features.entitlements import grant_features, revoke_features, select_user_ids, DEFAULT_CHUNK_SIZE
+from features.models import Feature
+
+
+class Command(BaseCommand):
+    help = "Grant or revoke features for a list of users or every user matching filters"
+
+    def add_arguments(self, parser):
+        parser.add_argument('action', choices=['grant', 'revoke'])
+        parser.add_argument('--features', required=True, help="Comma-separated feature codes")
+        parser.add_argument('--user-ids', help="Comma-separated user ids")
+        parser.add_argument('--role', choices=['ADMIN', 'MANAGER', 'USER'])
+        parser.add_argument('--verified', dest='is_verified', action='store_true', default=None)
+        parser.add_argument('--unverified', dest='is_verified', action='store_false')
+        parser.add_argument('--email-domain')
+        parser.add_argument('--joined-after', type=datetime.fromisoformat)
+        parser.add_argument('--joined-before', type=datetime.fromisoformat)
+        parser.add_argument('--duration-days', type=int)
+        parser.add_argument('--expires-on', type=datetime.fromisoformat)
+        parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        codes = {code.strip() for code in options['features'].split(',') if code.strip()}
+        features = dict(Feature.objects.filter(code__in=codes).values_list('code', 'id'))
+        missing = codes - features.keys()
+        if missing:
+            raise CommandError(f"Unknown feature codes: {', '.join(sorted(missing))}")
+
+        user_filters = {
+            'user_ids': [int(i) for i in options['user_ids'].split(',')] if options['user_ids'] else None,
+            'role': options['role'],
+            'is_verified': options['is_verified'],
+            'email_domain': options['email_domain'],
+            'joined_after': self._aware(options['joined_after']),
+            'joined_before': self._aware(options['joined_before']),
+        }
+        if not any(value is not None for value in user_filters.values()):
+            raise CommandError("Provide --user-ids or at least one user filter.")
+
+        if options['duration_days'] and options['expires_on']:
+            raise CommandError("Use either --duration-days or --expires-on, not both.")
+        expires_on = self._aware(options['expires_on'])
+        if options['duration_days']:
+            expires_on = timezone.now() + timedelta(days=options['duration_days'])
+
+        user_ids = select_user_ids(**user_filters)
+        if options['action'] == 'grant':
+            result = grant_features(user_ids, list(features.values()), expires_on=expires_on,
+                                    chunk_size=options['chunk_size'])
+        else:
+            result = revoke_features(user_ids, list(features.values()), chunk_size=options['chunk_size'])
+
+        self.stdout.write(self.style.SUCCESS(
+            f"{options['action']}: {result['users']} users, {result['rows']} rows"
+        ))
+
+    @staticmethod
+    def _aware(value):
+        if value is not None and timezone.is_naive(value):
+            return timezone.make_aware(value)
+        return value
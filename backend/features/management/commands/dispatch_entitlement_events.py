@@ -0,0 +1,35 @@
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from features.outbox import dispatch_events, purge_events
+
+
+class Command(BaseCommand):
+    help = "Deliver entitlement change events to the registered webhook endpoints and purge delivered ones"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500, help="Events per webhook request")
+        parser.add_argument('--max-batches', type=int, default=None, help="Per endpoint and pass")
+        parser.add_argument(
+            '--interval', type=float, default=0,
+            help="Keep running and poll every N seconds (default: deliver once, for cron)"
+        )
+
+    def handle(self, *args, **options):
+        retention = timedelta(days=settings.ENTITLEMENT_EVENT_RETENTION_DAYS)
+        while True:
+            started = time.monotonic()
+            stats = dispatch_events(batch_size=options['batch_size'], max_batches=options['max_batches'])
+            purged = purge_events(retention)
+            if stats.batches or purged or not options['interval']:
+                self.stdout.write(
+                    f"{stats.endpoints} endpoints, {stats.batches} batches in {time.monotonic() - started:.2f}s: "
+                    f"{stats.delivered} events delivered, {stats.failed} to retry, "
+                    f"{stats.lease_lost} batches resent after a lost lease, {purged} purged"
+                )
+            if not options['interval']:
+                break
+            time.sleep(options['interval'])
@@ -0,0 +1,27 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from features.entitlements import expire_entitlements, DEFAULT_CHUNK_SIZE
+
+
+class Command(BaseCommand):
+    help = "Deactivate user features whose expiry date has passed"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE)
+        parser.add_argument(
+            '--interval', type=int, default=0,
+            help="Keep running and sweep every N seconds (default: sweep once, for cron)"
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            started = time.monotonic()
+            expired = expire_entitlements(chunk_size=options['chunk_size'])
+            self.stdout.write(
+                f"Expired {expired} user features in {time.monotonic() - started:.2f}s"
+            )
+            if not options['interval']:
+                break
+            time.sleep(options['interval'])
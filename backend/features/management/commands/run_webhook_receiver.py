@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand
+
+from features.models import WebhookEndpoint
+from features.webhook_receiver import WebhookReceiverServer
+
+
+class Command(BaseCommand):
+    help = "Serve a local entitlement webhook receiver that checks signatures and event order"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='127.0.0.1')
+        parser.add_argument('--port', type=int, default=8766)
+        parser.add_argument('--secret', default='local-webhook-secret')
+        parser.add_argument('--fail-rate', type=float, default=0.0,
+                            help="Share of requests answered with 503, to exercise retries")
+        parser.add_argument('--register', metavar='NAME',
+                            help="Create or update a WebhookEndpoint with this name pointing here")
+
+    def handle(self, *args, **options):
+        url = f"http://{options['host']}:{options['port']}/"
+        if options['register']:
+            WebhookEndpoint.objects.update_or_create(
+                name=options['register'],
+                defaults={'url': url, 'secret': options['secret'], 'is_active': True},
+            )
+        server = WebhookReceiverServer((options['host'], options['port']), options['secret'],
+                                       fail_rate=options['fail_rate'], report=self.stdout.write)
+        self.stdout.write(f"Webhook receiver listening on {url}")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
@@ -0,0 +1,33 @@
+# Generated by Django 4.2.25 on 2026-10-19 14:59
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def remove_duplicate_user_features(apps, schema_editor):
+    """Keep one row per (user, feature): the active one, else the newest"""
+    UserFeature = apps.get_model('features', 'UserFeature')
+    duplicates = (
+        UserFeature.objects.values('user_id', 'feature_id')
+        .annotate(rows=Count('id'))
+        .filter(rows__gt=1)
+    )
+    for pair in duplicates:
+        rows = UserFeature.objects.filter(user_id=pair['user_id'], feature_id=pair['feature_id'])
+        keep = rows.order_by('-is_active', '-id').values_list('id', flat=True).first()
+        rows.exclude(id=keep).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('features', '0002_feature_status'),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicate_user_features, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='userfeature',
+            constraint=models.UniqueConstraint(fields=('user', 'feature'), name='unique_user_feature'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.25 on 2026-10-19 15:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('features', '0003_userfeature_unique_user_feature'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='userfeature',
+            index=models.Index(fields=['is_active', 'expires_on'], name='userfeature_active_expiry_idx'),
+        ),
+    ]
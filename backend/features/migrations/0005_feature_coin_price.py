@@ -0,0 +1,23 @@
+# Generated by Django 4.2.25 on 2026-10-19 15:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('features', '0004_userfeature_active_expiry_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='feature',
+            name='coin_price',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='feature',
+            name='duration_days',
+            field=models.PositiveIntegerField(default=30),
+        ),
+    ]
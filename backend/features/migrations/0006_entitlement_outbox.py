@@ -0,0 +1,42 @@
+# Generated by Django 4.2.25 on 2026-10-19 15:34
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('features', '0005_feature_coin_price'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EntitlementEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('user_id', models.BigIntegerField()),
+                ('feature_id', models.BigIntegerField()),
+                ('action', models.CharField(choices=[('granted', 'Granted'), ('revoked', 'Revoked'), ('expired', 'Expired'), ('purchased', 'Purchased')], max_length=16)),
+                ('is_active', models.BooleanField()),
+                ('expires_on', models.DateTimeField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(db_index=True, default=django.utils.timezone.now)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='WebhookEndpoint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True)),
+                ('url', models.URLField(max_length=500)),
+                ('secret', models.CharField(max_length=128)),
+                ('is_active', models.BooleanField(default=True)),
+                ('cursor', models.BigIntegerField(default=0)),
+                ('failures', models.PositiveIntegerField(default=0)),
+                ('next_attempt_at', models.DateTimeField(blank=True, null=True)),
+                ('leased_until', models.DateTimeField(blank=True, null=True)),
+                ('last_error', models.TextField(blank=True, default='')),
+                ('last_delivered_at', models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+    ]
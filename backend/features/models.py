@@ -10,6 +10,8 @@ class Feature(models.Model):
     code = models.CharField(max_length=50, unique=True)
     description = models.TextField(blank=True, null=True)
     status = models.CharField(max_length=20, default='active')  # e.g., active, deprecated , inactive, upcoming
+    coin_price = models.PositiveIntegerField(null=True, blank=True)  # None = not for sale
+    duration_days = models.PositiveIntegerField(default=30)  # Access granted per purchase
 
     def __str__(self):
         return self.name
@@ -23,6 +25,15 @@ class UserFeature(models.Model):
     activated_on = models.DateTimeField(auto_now_add=True)
     expires_on = models.DateTimeField(null=True, blank=True)
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'feature'], name='unique_user_feature'),
+        ]
+        indexes = [
+            # Expiry sweeps scan active rows by expiry date
+            models.Index(fields=['is_active', 'expires_on'], name='userfeature_active_expiry_idx'),
+        ]
+
     def activate(self, days=30):
         self.is_active = True
         self.activated_on = timezone.now()
@@ -38,3 +49,40 @@ class UserFeature(models.Model):
 
     def __str__(self):
         return f"{self.user.username} - {self.feature.name} ({'Active' if self.is_active else 'Inactive'})"
+
+
+class EntitlementEvent(models.Model):
+    """Outbox row for one changed (user, feature), written in the transaction that changed it"""
+    ACTION_CHOICES = [
+        ('granted', 'Granted'),
+        ('revoked', 'Revoked'),
+        ('expired', 'Expired'),
+        ('purchased', 'Purchased'),
+    ]
+
+    user_id = models.BigIntegerField()
+    feature_id = models.BigIntegerField()
+    action = models.CharField(max_length=16, choices=ACTION_CHOICES)
+    is_active = models.BooleanField()
+    expires_on = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(default=timezone.now, db_index=True)
+
+    def __str__(self):
+        return f"#{self.id} {self.action} user={self.user_id} feature={self.feature_id}"
+
+
+class WebhookEndpoint(models.Model):
+    """A product service receiving entitlement events, with its delivery cursor"""
+    name = models.CharField(max_length=100, unique=True)
+    url = models.URLField(max_length=500)
+    secret = models.CharField(max_length=128)  # HMAC key for the signature header
+    is_active = models.BooleanField(default=True)
+    cursor = models.BigIntegerField(default=0)  # Last EntitlementEvent id delivered
+    failures = models.PositiveIntegerField(default=0)  # Consecutive failed deliveries
+    next_attempt_at = models.DateTimeField(null=True, blank=True)
+    leased_until = models.DateTimeField(null=True, blank=True)  # Held by a dispatcher
+    last_error = models.TextField(blank=True, default='')
+    last_delivered_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return self.name
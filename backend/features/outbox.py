@@ -0,0 +1,221 @@
+"""
+Entitlement change outbox and webhook delivery to product services.
+
+Every ``entitlements_changed`` signal writes one ``EntitlementEvent`` per
+(user, feature) with a single ``bulk_create``, inside the transaction that
+changed the entitlements, so an event exists if and only if the change
+committed. Senders must only list pairs whose rows they changed; a pair
+listed twice is written once.
+
+``dispatch_events`` (run by ``manage.py dispatch_entitlement_events``) then
+delivers the events to each active ``WebhookEndpoint`` in id order, in
+batches, as one signed POST per batch. An endpoint's ``cursor`` only moves
+forward after a 2xx, so a failed batch is retried whole, with exponential
+backoff, and a user's events always arrive in order. Receivers should treat
+the event id as an idempotency key: a batch can be delivered again if the
+dispatcher dies between the POST and the cursor update. One slow or failing
+endpoint does not hold up the others.
+
+A dispatcher holds an endpoint through a lease (``leased_until``), taken
+from the time it claims that endpoint and renewed with every cursor move.
+Those writes only apply while the lease is still the one it wrote; if a
+stalled dispatcher's lease lapsed and another claimed the endpoint, it
+stops without touching the cursor.
+
+Events become visible to the dispatcher ``ENTITLEMENT_EVENT_SETTLE_SECONDS``
+after they are written, so an event from a slower, still-open transaction
+can't commit behind a cursor that already moved past its id.
+
+The body is ``{"events": [...]}``, signed in the
+``X-Entitlements-Signature: t=<unix time>,v1=<hex HMAC-SHA256>`` header over
+``"<t>.<body>"`` with the endpoint secret; check it with
+``verify_signature``.
+"""
+import hashlib
+import hmac
+import json
+import time
+from dataclasses import dataclass
+from datetime import timedelta
+
+import requests
+from django.conf import settings
+from django.db.models import Min, Q
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .models import EntitlementEvent, Feature, WebhookEndpoint
+from .signals import entitlements_changed
+
+SIGNATURE_HEADER = 'X-Entitlements-Signature'
+ACTIVE_ACTIONS = ('granted', 'purchased')
+
+
+@receiver(entitlements_changed)
+def record_entitlement_events(sender, action, pairs, expires_on=None, **kwargs):
+    now = timezone.now()
+    is_active = action in ACTIVE_ACTIONS
+    EntitlementEvent.objects.bulk_create([
+        EntitlementEvent(user_id=user_id, feature_id=feature_id, action=action, is_active=is_active,
+                         expires_on=expires_on if is_active else None, created_at=now)
+        for user_id, feature_id in dict.fromkeys(pairs)
+    ], batch_size=1000)
+
+
+def sign(secret, body, timestamp=None):
+    """Value of the signature header for ``body`` (bytes)"""
+    timestamp = int(time.time() if timestamp is None else timestamp)
+    digest = hmac.new(secret.encode(), f'{timestamp}.'.encode() + body, hashlib.sha256).hexdigest()
+    return f't={timestamp},v1={digest}'
+
+
+def verify_signature(secret, body, header, tolerance=300):
+    """Check a signature header against ``body``; rejects timestamps off by more than ``tolerance`` seconds"""
+    try:
+        parts = dict(item.split('=', 1) for item in header.split(','))
+        timestamp = int(parts['t'])
+    except (KeyError, ValueError):
+        return False
+    if abs(time.time() - timestamp) > tolerance:
+        return False
+    return hmac.compare_digest(sign(secret, body, timestamp), header)
+
+
+def _render(events):
+    codes = dict(Feature.objects.filter(id__in={event[2] for event in events}).values_list('id', 'code'))
+    return json.dumps({'events': [
+        {
+            'id': event_id,
+            'user_id': user_id,
+            'feature_id': feature_id,
+            'feature_code': codes.get(feature_id),
+            'action': action,
+            'is_active': is_active,
+            'expires_on': expires_on.isoformat() if expires_on else None,
+            'occurred_at': created_at.isoformat(),
+        }
+        for event_id, user_id, feature_id, action, is_active, expires_on, created_at in events
+    ]}, separators=(',', ':')).encode()
+
+
+@dataclass
+class DispatchStats:
+    endpoints: int = 0
+    batches: int = 0
+    delivered: int = 0
+    failed: int = 0
+    lease_lost: int = 0  # batches sent after the lease lapsed, so not recorded
+
+
+def _backoff(failures):
+    return min(getattr(settings, 'ENTITLEMENT_WEBHOOK_MAX_BACKOFF', 600), 5 * 2 ** (failures - 1))
+
+
+def _lease(now):
+    return now + timedelta(seconds=getattr(settings, 'ENTITLEMENT_WEBHOOK_LEASE_SECONDS', 60))
+
+
+def _claim(endpoint):
+    now = timezone.now()
+    lease = _lease(now)
+    claimed = WebhookEndpoint.objects.filter(
+        Q(leased_until__isnull=True) | Q(leased_until__lt=now), id=endpoint.id,
+    ).update(leased_until=lease)
+    if claimed:
+        endpoint.leased_until = lease
+        # The previous holder may have moved the cursor since the endpoint was listed
+        endpoint.refresh_from_db(fields=['cursor', 'failures'])
+    return claimed
+
+
+def _held(endpoint):
+    """The endpoint's row, if this dispatcher's lease on it is still current"""
+    return WebhookEndpoint.objects.filter(id=endpoint.id, leased_until=endpoint.leased_until)
+
+
+def _deliver(endpoint, session, batch_size, max_batches, stats):
+    """Send batches from the endpoint's cursor until caught up, a failure or ``max_batches``"""
+    sent = 0
+    while max_batches is None or sent < max_batches:
+        settled = timezone.now() - timedelta(seconds=getattr(settings, 'ENTITLEMENT_EVENT_SETTLE_SECONDS', 5))
+        events = list(
+            EntitlementEvent.objects.filter(id__gt=endpoint.cursor)
+            .order_by('id')
+            .values_list('id', 'user_id', 'feature_id', 'action', 'is_active', 'expires_on', 'created_at')
+            [:batch_size]
+        )
+        # Stop at the first unsettled event so the cursor never skips past one
+        for position, event in enumerate(events):
+            if event[6] > settled:
+                events = events[:position]
+                break
+        if not events:
+            return
+        body = _render(events)
+        error = None
+        try:
+            response = session.post(
+                endpoint.url, data=body,
+                headers={'Content-Type': 'application/json', SIGNATURE_HEADER: sign(endpoint.secret, body)},
+                timeout=getattr(settings, 'ENTITLEMENT_WEBHOOK_TIMEOUT', 5),
+            )
+            if not 200 <= response.status_code < 300:
+                error = f"HTTP {response.status_code}: {response.text[:200]}"
+        except requests.RequestException as exc:
+            error = f"{type(exc).__name__}: {exc}"
+        stats.batches += 1
+        sent += 1
+
+        now = timezone.now()
+        if error:
+            endpoint.failures += 1
+            _held(endpoint).update(
+                failures=endpoint.failures, last_error=error,
+                next_attempt_at=now + timedelta(seconds=_backoff(endpoint.failures)),
+            )
+            stats.failed += len(events)
+            return
+        lease = _lease(now)
+        if not _held(endpoint).update(
+            cursor=events[-1][0], failures=0, next_attempt_at=None, last_error='', last_delivered_at=now,
+            leased_until=lease,
+        ):
+            # The lease lapsed during the POST and another dispatcher owns the
+            # endpoint now; it will send this batch again from the cursor
+            stats.lease_lost += 1
+            return
+        endpoint.cursor = events[-1][0]
+        endpoint.failures = 0
+        endpoint.leased_until = lease
+        stats.delivered += len(events)
+
+
+def dispatch_events(batch_size=500, max_batches=None):
+    """Deliver pending events to every due endpoint; returns DispatchStats"""
+    stats = DispatchStats()
+    now = timezone.now()
+    due = WebhookEndpoint.objects.filter(
+        Q(next_attempt_at__isnull=True) | Q(next_attempt_at__lte=now), is_active=True,
+    ).order_by('id')
+    with requests.Session() as session:
+        for endpoint in due:
+            if not _claim(endpoint):
+                continue  # Another dispatcher has it
+            stats.endpoints += 1
+            try:
+                _deliver(endpoint, session, batch_size, max_batches, stats)
+            finally:
+                _held(endpoint).update(leased_until=None)
+    return stats
+
+
+def purge_events(retention, batch_size=5000):
+    """Delete events older than ``retention`` that every active endpoint has received"""
+    stale = EntitlementEvent.objects.filter(created_at__lt=timezone.now() - retention)
+    lowest_cursor = WebhookEndpoint.objects.filter(is_active=True).aggregate(cursor=Min('cursor'))['cursor']
+    if lowest_cursor is not None:
+        stale = stale.filter(id__lte=lowest_cursor)
+    deleted = 0
+    while ids := list(stale.order_by('id').values_list('id', flat=True)[:batch_size]):
+        deleted += EntitlementEvent.objects.filter(id__in=ids).delete()[0]
+    return deleted
@@ -1,6 +1,5 @@
 from rest_framework.permissions import BasePermission
-from django.utils import timezone
-from .models import UserFeature
+from .entitlements import has_feature
 
 class BaseProductPermission(BasePermission):
     """
@@ -17,19 +16,8 @@ class BaseProductPermission(BasePermission):
         if not request.user or not request.user.is_authenticated:
             return False
             
-        # Check feature access using the correct relationship
-        try:
-            user_feature = UserFeature.objects.get(
-                user=request.user,
-                feature__code=self.feature_code,  # Access feature.code via relationship
-                is_active=True
-            )
-            
-            # Use the model's built-in is_valid method which checks expiry
-            return user_feature.is_valid()
-            
-        except UserFeature.DoesNotExist:
-            return False
+        # Check feature access against the cached entitlements (includes expiry)
+        return has_feature(request.user, self.feature_code)
 
 class RequireFeature(BasePermission):
     """
@@ -45,19 +33,8 @@ class RequireFeature(BasePermission):
         if not request.user or not request.user.is_authenticated:
             return False
             
-        # Check feature access using correct relationship
-        try:
-            user_feature = UserFeature.objects.get(
-                user=request.user,
-                feature__code=self.feature_code,
-                is_active=True
-            )
-            
-            # Use the model's is_valid method
-            return user_feature.is_valid()
-            
-        except UserFeature.DoesNotExist:
-            return False
+        # Check feature access against the cached entitlements
+        return has_feature(request.user, self.feature_code)
 
 # Product-specific permissions
 class CRMPermission(BaseProductPermission):
@@ -86,16 +63,6 @@ def create_feature_permission(feature_code):
             if not request.user or not request.user.is_authenticated:
                 return False
                 
-            try:
-                user_feature = UserFeature.objects.get(
-                    user=request.user,
-                    feature__code=feature_code,
-                    is_active=True
-                )
-                
-                return user_feature.is_valid()
-                
-            except UserFeature.DoesNotExist:
-                return False
+            return has_feature(request.user, feature_code)
     
     return DynamicFeaturePermission
\ No newline at end of file
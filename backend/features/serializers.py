@@ -1,24 +1,29 @@
+from datetime import timedelta
+from django.conf import settings
+from django.utils import timezone
 from rest_framework import serializers
+from accounts.models import CustomUser
+from core.instrumentation import TimedSerializerMixin
 from .models import Feature, UserFeature
 
 
-class FeatureSerializer(serializers.ModelSerializer):
+class FeatureSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = Feature
-        fields = ['id', 'name', 'code', 'description', 'status']
+        fields = ['id', 'name', 'code', 'description', 'status', 'coin_price', 'duration_days']
 
 
-class UserFeatureSerializer(serializers.ModelSerializer):
+class UserFeatureSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     feature = FeatureSerializer(read_only=True)
 
     class Meta:
         model = UserFeature
         fields = ['id', 'feature', 'is_active', 'activated_on', 'expires_on']
 
-class FeatureCreateSerializer(serializers.ModelSerializer):
+class FeatureCreateSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = Feature
-        fields = ['id', 'name', 'code', 'description']
+        fields = ['id', 'name', 'code', 'description', 'coin_price', 'duration_days']
 
 class UserFeatureToggleSerializer(serializers.Serializer):
     user_id = serializers.IntegerField()
@@ -27,3 +32,85 @@ class UserFeatureToggleSerializer(serializers.Serializer):
 
 class FeatureDeleteSerializer(serializers.Serializer):
     feature_id = serializers.IntegerField()
+
+
+class BulkEntitlementSerializer(serializers.Serializer):
+    """Grant or revoke features for a list of users or every user matching filters"""
+    USER_FILTER_FIELDS = ('user_ids', 'role', 'is_verified', 'email_domain', 'joined_after', 'joined_before')
+
+    action = serializers.ChoiceField(choices=['grant', 'revoke'])
+    feature_codes = serializers.ListField(child=serializers.CharField(max_length=50), allow_empty=False)
+
+    # Target users: explicit ids and/or filters
+    user_ids = serializers.ListField(child=serializers.IntegerField(), required=False, allow_empty=False)
+    role = serializers.ChoiceField(choices=CustomUser.ROLE_CHOICES, required=False)
+    is_verified = serializers.BooleanField(required=False)
+    email_domain = serializers.CharField(max_length=255, required=False)
+    joined_after = serializers.DateTimeField(required=False)
+    joined_before = serializers.DateTimeField(required=False)
+
+    # Grant expiry: a fixed date or a duration from now (neither = never expires)
+    expires_on = serializers.DateTimeField(required=False)
+    duration_days = serializers.IntegerField(min_value=1, required=False)
+
+    def validate(self, attrs):
+        user_filters = {
+            field: attrs.pop(field) for field in self.USER_FILTER_FIELDS if field in attrs
+        }
+        if not user_filters:
+            raise serializers.ValidationError("Provide user_ids or at least one user filter.")
+
+        if 'expires_on' in attrs and 'duration_days' in attrs:
+            raise serializers.ValidationError("Use either expires_on or duration_days, not both.")
+        duration_days = attrs.pop('duration_days', None)
+        if duration_days:
+            attrs['expires_on'] = timezone.now() + timedelta(days=duration_days)
+
+        codes = set(attrs['feature_codes'])
+        features = dict(Feature.objects.filter(code__in=codes).values_list('code', 'id'))
+        missing = codes - features.keys()
+        if missing:
+            raise serializers.ValidationError({"feature_codes": f"Unknown feature codes: {', '.join(sorted(missing))}"})
+
+        attrs['feature_ids'] = list(features.values())
+        attrs['user_filters'] = user_filters
+        return attrs
+
+
+class EntitlementCheckSerializer(serializers.Serializer):
+    """
+    ``(user_id, feature_code)`` pairs to check, given either as ``pairs`` or as
+    the cross product of ``user_ids`` and ``feature_codes`` (user-major order).
+    Items are checked in one pass rather than through child fields, which
+    would cost a field call per item on thousands of items. The size limit is
+    checked before the cross product is built.
+    """
+    pairs = serializers.ListField(required=False, max_length=settings.ENTITLEMENT_CHECK_MAX_PAIRS)
+    user_ids = serializers.ListField(required=False, max_length=settings.ENTITLEMENT_CHECK_MAX_PAIRS)
+    feature_codes = serializers.ListField(required=False, max_length=settings.ENTITLEMENT_CHECK_MAX_PAIRS)
+    format = serializers.ChoiceField(choices=['json', 'bitmap'], default='json')
+
+    def validate(self, attrs):
+        max_pairs = getattr(settings, 'ENTITLEMENT_CHECK_MAX_PAIRS', 10000)
+        count = len(attrs['pairs']) if 'pairs' in attrs else (
+            len(attrs.get('user_ids', ())) * len(attrs.get('feature_codes', ()))
+        )
+        if count > max_pairs:
+            raise serializers.ValidationError(f"At most {max_pairs} pairs per request.")
+
+        if 'pairs' in attrs:
+            if 'user_ids' in attrs or 'feature_codes' in attrs:
+                raise serializers.ValidationError("Use either pairs or user_ids with feature_codes, not both.")
+            pairs = attrs['pairs']
+            if not all(isinstance(pair, list) and len(pair) == 2 and type(pair[0]) is int
+                       and isinstance(pair[1], str) for pair in pairs):
+                raise serializers.ValidationError({"pairs": "Each pair must be [user_id, feature_code]."})
+        elif 'user_ids' in attrs and 'feature_codes' in attrs:
+            if not all(type(user_id) is int for user_id in attrs['user_ids']):
+                raise serializers.ValidationError({"user_ids": "User ids must be integers."})
+            if not all(isinstance(code, str) for code in attrs['feature_codes']):
+                raise serializers.ValidationError({"feature_codes": "Feature codes must be strings."})
+            pairs = [(user_id, code) for user_id in attrs['user_ids'] for code in attrs['feature_codes']]
+        else:
+            raise serializers.ValidationError("Provide pairs, or user_ids and feature_codes.")
+        return {'pairs': pairs, 'format': attrs['format']}
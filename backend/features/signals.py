@@ -0,0 +1,6 @@
+from django.dispatch import Signal
+
+# Sent inside the writing transaction whenever UserFeature rows change.
+# Arguments: action ('granted', 'revoked', 'expired', 'purchased'),
+# pairs (list of (user_id, feature_id)), expires_on (datetime or None).
+entitlements_changed = Signal()
@@ -0,0 +1,134 @@
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+
+from core.query_budgets import QueryBudgetMixin
+
+from .checks import check_entitlement_cache
+from .entitlements import _cache_timeout, revoke_features
+from .models import EntitlementEvent, Feature, UserFeature, WebhookEndpoint
+from .outbox import DispatchStats, _claim, _deliver
+from .serializers import EntitlementCheckSerializer
+from .signals import entitlements_changed
+
+
+class RevokeFeaturesTests(TestCase):
+    def setUp(self):
+        self.feature = Feature.objects.create(name='Reports', code='reports')
+        self.holder = User.objects.create_user('holder', 'holder@example.com')
+        self.other = User.objects.create_user('other', 'other@example.com')
+        UserFeature.objects.create(user=self.holder, feature=self.feature, is_active=True)
+
+        self.events = []
+        receiver = lambda sender, **kwargs: self.events.append((kwargs['action'], kwargs['pairs']))  # noqa: E731
+        entitlements_changed.connect(receiver, weak=False)
+        self.addCleanup(entitlements_changed.disconnect, receiver)
+
+    def test_only_changed_pairs_are_reported(self):
+        result = revoke_features([self.holder.id, self.other.id], [self.feature.id])
+        self.assertEqual(result, {'users': 2, 'rows': 1})
+        self.assertEqual(self.events, [('revoked', [(self.holder.id, self.feature.id)])])
+
+    def test_nothing_reported_without_changes(self):
+        revoke_features([self.other.id], [self.feature.id])
+        self.assertEqual(self.events, [])
+
+
+class EntitlementOutboxTests(TestCase):
+    def setUp(self):
+        self.feature = Feature.objects.create(name='Reports', code='reports')
+        self.user = User.objects.create_user('member', 'member@example.com')
+
+    def test_revoking_a_missing_feature_writes_no_event(self):
+        revoke_features([self.user.id], [self.feature.id])
+        self.assertFalse(EntitlementEvent.objects.exists())
+
+    def test_revoke_writes_one_event_per_changed_pair(self):
+        UserFeature.objects.create(user=self.user, feature=self.feature, is_active=True)
+        revoke_features([self.user.id], [self.feature.id])
+        self.assertEqual(
+            list(EntitlementEvent.objects.values_list('user_id', 'feature_id', 'action', 'is_active')),
+            [(self.user.id, self.feature.id, 'revoked', False)],
+        )
+
+
+class FakeResponse:
+    status_code = 200
+    text = ''
+
+
+class LeaseStealingSession:
+    """Posts succeed, but only after another dispatcher re-claimed the endpoint"""
+
+    def __init__(self, endpoint):
+        self.endpoint = endpoint
+        self.posts = 0
+
+    def post(self, url, **kwargs):
+        self.posts += 1
+        WebhookEndpoint.objects.filter(id=self.endpoint.id).update(leased_until=timezone.now() + timedelta(hours=1))
+        return FakeResponse()
+
+
+@override_settings(ENTITLEMENT_EVENT_SETTLE_SECONDS=0)
+class DispatchLeaseTests(TestCase):
+    def setUp(self):
+        self.endpoint = WebhookEndpoint.objects.create(name='billing', url='http://billing.invalid/', secret='s')
+        feature = Feature.objects.create(name='Reports', code='reports')
+        user = User.objects.create_user('member', 'member@example.com')
+        EntitlementEvent.objects.create(user_id=user.id, feature_id=feature.id, action='granted', is_active=True,
+                                        created_at=timezone.now() - timedelta(seconds=1))
+
+    def test_lease_is_taken_at_claim_time(self):
+        self.assertTrue(_claim(self.endpoint))
+        self.assertGreater(self.endpoint.leased_until, timezone.now())
+
+    def test_cursor_not_moved_after_losing_the_lease(self):
+        self.assertTrue(_claim(self.endpoint))
+        session = LeaseStealingSession(self.endpoint)
+        stats = DispatchStats()
+        _deliver(self.endpoint, session, 100, None, stats)
+
+        self.assertEqual((session.posts, stats.delivered, stats.lease_lost), (1, 0, 1))
+        self.endpoint.refresh_from_db()
+        self.assertEqual(self.endpoint.cursor, 0)
+        self.assertIsNotNone(self.endpoint.leased_until)
+
+
+LOCMEM = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+SHARED = {'default': {'BACKEND': 'django.core.cache.backends.db.DatabaseCache', 'LOCATION': 'cache'}}
+
+
+@override_settings(ENTITLEMENT_CACHE_TIMEOUT=300, LOCAL_CACHE_MAX_AGE=7)
+class EntitlementCacheSettingTests(SimpleTestCase):
+    @override_settings(CACHES=LOCMEM)
+    def test_per_process_cache_caps_the_timeout(self):
+        self.assertEqual(_cache_timeout(), 7)
+        self.assertEqual([warning.id for warning in check_entitlement_cache(None)], ['features.W001'])
+
+    @override_settings(CACHES=SHARED)
+    def test_shared_cache_keeps_the_timeout(self):
+        self.assertEqual(_cache_timeout(), 300)
+        self.assertEqual(check_entitlement_cache(None), [])
+
+
+class QueryBudgetTests(QueryBudgetMixin, TransactionTestCase):
+    urlconf = 'features.urls'
+
+
+class EntitlementCheckSerializerTests(SimpleTestCase):
+    @override_settings(ENTITLEMENT_CHECK_MAX_PAIRS=100)
+    def test_cross_product_over_the_limit_is_rejected(self):
+        serializer = EntitlementCheckSerializer(data={
+            'user_ids': list(range(1000)), 'feature_codes': [f'code_{i}' for i in range(1000)],
+        })
+        self.assertFalse(serializer.is_valid())
+        self.assertEqual(serializer.errors['non_field_errors'], ['At most 100 pairs per request.'])
+
+    @override_settings(ENTITLEMENT_CHECK_MAX_PAIRS=100)
+    def test_cross_product_within_the_limit(self):
+        serializer = EntitlementCheckSerializer(data={'user_ids': [1, 2], 'feature_codes': ['a', 'b']})
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+        self.assertEqual(serializer.validated_data['pairs'], [(1, 'a'), (1, 'b'), (2, 'a'), (2, 'b')])
@@ -1,5 +1,5 @@
 from django.urls import path
-from .views import FeatureListView, UserFeatureListView, ToggleUserFeatureView, FeatureCreateView, FeatureDeleteView
+from .views import FeatureListView, UserFeatureListView, ToggleUserFeatureView, FeatureCreateView, FeatureDeleteView, BulkEntitlementView, EntitlementCheckView
 
 urlpatterns = [
     path('features/', FeatureListView.as_view(), name='feature-list'),
@@ -7,4 +7,6 @@ urlpatterns = [
     path('features/<int:feature_id>/', FeatureDeleteView.as_view(), name='delete-feature'),
     path('user/features/', UserFeatureListView.as_view(), name='user-feature-list'),
     path('features/toggle/', ToggleUserFeatureView.as_view(), name='toggle-feature'),
+    path('features/bulk/', BulkEntitlementView.as_view(), name='bulk-entitlements'),
+    path('entitlements/check/', EntitlementCheckView.as_view(), name='entitlement-check'),
 ]
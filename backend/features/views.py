@@ -1,36 +1,52 @@
+import base64
+
+from django.http import HttpResponse, HttpResponseNotModified
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
 from rest_framework.permissions import IsAuthenticated, IsAdminUser
 from drf_spectacular.utils import extend_schema
 from accounts.models import IsCustomAdmin
-from .serializers import UserFeatureToggleSerializer, UserFeatureSerializer, FeatureCreateSerializer, FeatureDeleteSerializer
+from accounts.authentication import CookieJWTStatelessUserAuthentication, IsService, ServiceKeyAuthentication
+from core.db_routers import ReplicaReadMixin
+from core.fast_serializers import fast_serializer
+from .serializers import UserFeatureToggleSerializer, UserFeatureSerializer, FeatureCreateSerializer, FeatureDeleteSerializer, BulkEntitlementSerializer, EntitlementCheckSerializer
 from django.contrib.auth.models import User
+from django.db import transaction
 
 from .models import Feature, UserFeature
 from .serializers import FeatureSerializer, UserFeatureSerializer
+from .catalog import get_catalog, invalidate_catalog, etag_matches
+from .entitlements import check_entitlements, grant_features, revoke_features, select_user_ids, invalidate_entitlements
+from .signals import entitlements_changed
 
 
 class FeatureListView(APIView):
-    """List all available system features"""
+    """List all available system features (served from the in-process catalog)"""
     permission_classes = [IsAuthenticated]
+    authentication_classes = [CookieJWTStatelessUserAuthentication]
 
-    @extend_schema(responses={200: FeatureSerializer(many=True)})
+    @extend_schema(responses={200: FeatureSerializer(many=True), 304: None})
     def get(self, request):
-        features = Feature.objects.all()
-        serializer = FeatureSerializer(features, many=True)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        catalog = get_catalog()
+        if etag_matches(request, catalog.etag):
+            response = HttpResponseNotModified()
+        else:
+            response = HttpResponse(catalog.body, content_type='application/json')
+        response['ETag'] = catalog.etag
+        response['Cache-Control'] = 'private, no-cache'
+        return response
 
 
-class UserFeatureListView(APIView):
+class UserFeatureListView(ReplicaReadMixin, APIView):
     """List all features assigned to the logged-in user"""
     permission_classes = [IsAuthenticated]
 
     @extend_schema(responses={200: UserFeatureSerializer(many=True)})
     def get(self, request):
         user_features = UserFeature.objects.filter(user=request.user)
-        serializer = UserFeatureSerializer(user_features, many=True)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        data = fast_serializer(UserFeatureSerializer).serialize(user_features)
+        return Response(data, status=status.HTTP_200_OK)
 
 class ToggleUserFeatureView(APIView):
     permission_classes = [IsCustomAdmin, IsAuthenticated]
@@ -51,14 +67,93 @@ class ToggleUserFeatureView(APIView):
         user = User.objects.get(id=user_id)
         feature = Feature.objects.get(id=feature_id)
 
-        user_feature, _ = UserFeature.objects.get_or_create(user=user, feature=feature)
-        user_feature.is_active = is_active
-        user_feature.save()
+        with transaction.atomic():
+            user_feature, _ = UserFeature.objects.select_for_update().get_or_create(
+                user=user, feature=feature
+            )
+            changed = user_feature.is_active != is_active
+            user_feature.is_active = is_active
+            user_feature.save()
+            # Only report real changes: revoking a feature the user never had is a no-op
+            if changed:
+                entitlements_changed.send(
+                    sender=UserFeature,
+                    action='granted' if is_active else 'revoked',
+                    pairs=[(user.id, feature.id)],
+                    expires_on=user_feature.expires_on,
+                )
+                invalidate_entitlements([user.id])
 
         return Response({
             "message": "Feature toggled successfully!",
             "data": UserFeatureSerializer(user_feature).data
         }, status=status.HTTP_200_OK)
+
+
+class BulkEntitlementView(APIView):
+    """Admin-only endpoint to grant or revoke features for many users at once"""
+    permission_classes = [IsAuthenticated, IsCustomAdmin]
+
+    @extend_schema(
+        request=BulkEntitlementSerializer,
+        responses={200: dict},
+        description="Grant or revoke features for a list of user ids or for all users matching filters."
+    )
+    def post(self, request):
+        serializer = BulkEntitlementSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+
+        user_ids = select_user_ids(**data['user_filters'])
+        if data['action'] == 'grant':
+            result = grant_features(user_ids, data['feature_ids'], expires_on=data.get('expires_on'))
+        else:
+            result = revoke_features(user_ids, data['feature_ids'])
+
+        return Response({
+            "message": f"Features {data['action']} applied successfully!",
+            "action": data['action'],
+            "feature_codes": data['feature_codes'],
+            "users": result['users'],
+            "rows": result['rows'],
+        }, status=status.HTTP_200_OK)
+
+
+def _bitmap(flags):
+    """Base64 of the flags as bits, first flag in the most significant bit of the first byte"""
+    if not flags:
+        return ''
+    bits = ''.join('1' if flag else '0' for flag in flags)
+    bits += '0' * (-len(bits) % 8)
+    return base64.b64encode(int(bits, 2).to_bytes(len(bits) // 8, 'big')).decode()
+
+
+class EntitlementCheckView(APIView):
+    """
+    Service-to-service batch check of ``(user_id, feature_code)`` pairs.
+
+    Answers come from the cached entitlement maps, plus one query for the
+    uncached users, in the order of the request pairs: a list of
+    booleans, or with ``format=bitmap`` a base64 bitmap (bit *i* is pair *i*,
+    most significant bit first).
+    """
+    authentication_classes = [ServiceKeyAuthentication]
+    permission_classes = [IsService]
+
+    @extend_schema(request=EntitlementCheckSerializer, responses={200: dict})
+    def post(self, request):
+        serializer = EntitlementCheckSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+
+        results = check_entitlements(data['pairs'])
+        if data['format'] == 'bitmap':
+            body = {"count": len(results), "bitmap": _bitmap(results)}
+        else:
+            body = {"count": len(results), "results": results}
+        return Response(body, status=status.HTTP_200_OK)
+
+
 class FeatureCreateView(APIView):
     """Admin-only endpoint to create a new product/feature"""
     permission_classes = [IsAuthenticated, IsCustomAdmin]
@@ -68,6 +163,7 @@ class FeatureCreateView(APIView):
         serializer = FeatureCreateSerializer(data=request.data)
         if serializer.is_valid():
             serializer.save()
+            invalidate_catalog()
             return Response(
                 {"message": "Product created successfully!", "data": serializer.data},
                 status=status.HTTP_201_CREATED
@@ -92,6 +188,7 @@ class FeatureDeleteView(APIView):
             )
 
         feature.delete()
+        invalidate_catalog()
 
         return Response(
             {"message": "Feature deleted successfully!"}, 
@@ -0,0 +1,64 @@
+"""
+Local receiver for entitlement webhooks, for tests and development.
+
+Checks each request's signature, keeps the last event id per user to confirm
+events arrive in order, and can fail a share of requests to exercise the
+dispatcher's retries.
+"""
+import json
+import random
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from .outbox import SIGNATURE_HEADER, verify_signature
+
+
+class WebhookReceiverHandler(BaseHTTPRequestHandler):
+    server_version = 'EntitlementWebhookStub/1.0'
+
+    def log_message(self, format, *args):
+        pass
+
+    def _reply(self, status):
+        self.send_response(status)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        body = self.rfile.read(length)
+        if not verify_signature(self.server.secret, body, self.headers.get(SIGNATURE_HEADER, '')):
+            self.server.report('rejected: bad signature')
+            return self._reply(401)
+        if random.random() < self.server.fail_rate:
+            self.server.report('failing on purpose')
+            return self._reply(503)
+        self.server.receive(json.loads(body)['events'])
+        self._reply(204)
+
+
+class WebhookReceiverServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, secret, fail_rate=0.0, report=print):
+        super().__init__(address, WebhookReceiverHandler)
+        self.secret = secret
+        self.fail_rate = fail_rate
+        self.report = report
+        self.events = {}           # event id -> event; redeliveries overwrite
+        self.last_by_user = {}
+        self.out_of_order = 0
+        self.lock = threading.Lock()
+
+    def receive(self, events):
+        with self.lock:
+            for event in events:
+                if event['id'] in self.events:
+                    continue
+                if self.last_by_user.get(event['user_id'], 0) > event['id']:
+                    self.out_of_order += 1
+                self.last_by_user[event['user_id']] = event['id']
+                self.events[event['id']] = event
+            total = len(self.events)
+        self.report(f"received {len(events)} events (ids {events[0]['id']}-{events[-1]['id']}), "
+                    f"{total} distinct, {self.out_of_order} out of order")
@@ -1,3 +1,35 @@
 from django.contrib import admin
+from django.utils import timezone
 
-# Register your models here.
+from .models import CoinRate, CoinRedemption, WalletCheckpoint
+
+
+@admin.register(CoinRedemption)
+class CoinRedemptionAdmin(admin.ModelAdmin):
+    list_display = ('redemption_id', 'user', 'coins_redeemed', 'amount_to_pay', 'status', 'requested_at', 'paid_at')
+    list_filter = ('status',)
+    actions = ['approve_redemptions']
+
+    @admin.action(description="Approve selected pending redemptions for payout")
+    def approve_redemptions(self, request, queryset):
+        approved = queryset.filter(status='PENDING').update(status='APPROVED', approved_at=timezone.now())
+        self.message_user(request, f"{approved} redemptions approved.")
+
+
+@admin.register(CoinRate)
+class CoinRateAdmin(admin.ModelAdmin):
+    list_display = ('rate_type', 'coins_per_inr', 'effective_from', 'is_active', 'created_by')
+    list_filter = ('rate_type', 'is_active')
+    exclude = ('created_by',)
+
+    def save_model(self, request, obj, form, change):
+        if not change:
+            obj.created_by = request.user
+        super().save_model(request, obj, form, change)
+
+
+@admin.register(WalletCheckpoint)
+class WalletCheckpointAdmin(admin.ModelAdmin):
+    list_display = ('user', 'last_transaction_id', 'balance', 'verified_at')
+    search_fields = ('user__username', 'user__email')
+    readonly_fields = ('user', 'last_transaction_id', 'balance', 'verified_at')
@@ -0,0 +1,20 @@
+"""
+End-to-end load test of the coin purchase path.
+
+Drives login -> create order -> signed webhooks -> wallet against a running
+server over HTTP, with Razorpay replaced by a local fake. Typical setup::
+
+    docker run -d --name loadtest-db -p 5433:5432 -e POSTGRES_PASSWORD=loadtest postgres:16
+    export DB_HOST=localhost DB_PORT=5433 DB_NAME=postgres DB_USER=postgres DB_PASSWORD=loadtest
+    export RAZORPAY_BASE_URL=http://127.0.0.1:8765 RAZORPAY_KEY_SECRET=fake RAZORPAY_WEBHOOK_SECRET=fake-webhook
+    python manage.py migrate
+    python manage.py run_fake_razorpay --port 8765 --latency-ms 80 &
+    AUTH_THROTTLE_ENABLED=False gunicorn core.wsgi -w 4 -b 127.0.0.1:8000 &
+    DEBUG=True python manage.py loadtest_payments --scratch-db --base-url http://127.0.0.1:8000 --users 200 --concurrency 32
+
+The load test seeds its users directly in the database, so it must run with
+the same database settings as the server. Seeding deletes earlier runs'
+``loadtest-*`` users, so the command refuses to run unless DEBUG is on and
+``--scratch-db`` confirms the database is a throwaway one. All its logins come from one IP,
+so the server runs with login throttling off.
+"""
@@ -0,0 +1,70 @@
+"""
+Minimal local stand-in for the Razorpay orders API.
+
+Implements ``POST /v1/orders`` and ``GET /v1/orders/<id>``, which is all the
+purchase path uses, with an optional fixed latency to mimic the real API.
+"""
+import json
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class FakeRazorpayHandler(BaseHTTPRequestHandler):
+    server_version = 'FakeRazorpay/1.0'
+
+    def log_message(self, format, *args):
+        pass
+
+    def _reply(self, status, body):
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _not_found(self):
+        self._reply(404, {'error': {'code': 'BAD_REQUEST_ERROR', 'description': 'The id provided does not exist'}})
+
+    def do_POST(self):
+        time.sleep(self.server.latency)
+        if self.path.rstrip('/') != '/v1/orders':
+            return self._not_found()
+        length = int(self.headers.get('Content-Length') or 0)
+        data = json.loads(self.rfile.read(length) or b'{}')
+        order = {
+            'id': f"order_{uuid.uuid4().hex[:14]}",
+            'entity': 'order',
+            'amount': data.get('amount'),
+            'amount_paid': 0,
+            'amount_due': data.get('amount'),
+            'currency': data.get('currency', 'INR'),
+            'receipt': data.get('receipt'),
+            'status': 'created',
+            'attempts': 0,
+            'notes': data.get('notes', {}),
+            'created_at': int(time.time()),
+        }
+        with self.server.lock:
+            self.server.orders[order['id']] = order
+        self._reply(200, order)
+
+    def do_GET(self):
+        time.sleep(self.server.latency)
+        order_id = self.path.rstrip('/').rsplit('/', 1)[-1]
+        order = self.server.orders.get(order_id)
+        if not self.path.startswith('/v1/orders/') or order is None:
+            return self._not_found()
+        self._reply(200, order)
+
+
+class FakeRazorpayServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, latency_ms=0):
+        super().__init__(address, FakeRazorpayHandler)
+        self.latency = latency_ms / 1000
+        self.orders = {}
+        self.lock = threading.Lock()
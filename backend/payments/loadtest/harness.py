@@ -0,0 +1,190 @@
+"""
+Seeding, flow driver, latency stats and the final ledger check for the
+``loadtest_payments`` command.
+"""
+import hashlib
+import hmac
+import json
+import random
+import threading
+import time
+import uuid
+from collections import Counter, defaultdict
+
+import requests
+from django.contrib.auth.hashers import make_password
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.exceptions import ImproperlyConfigured
+from django.db.models import Count, Q, Sum
+
+from accounts.models import CustomUser
+from payments.models import CoinTransaction, PaymentOrder, UserWallet
+
+STEPS = ('login', 'create_order', 'webhook', 'wallet')
+
+
+class FlowError(Exception):
+    pass
+
+
+class LoadTestStats:
+    """Thread-safe latency samples and error counts per step"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencies = defaultdict(list)
+        self.errors = Counter()
+        self.flows = 0
+        self.started = time.monotonic()
+        self.finished = None
+
+    def record(self, step, seconds, ok):
+        with self._lock:
+            self.latencies[step].append(seconds)
+            if not ok:
+                self.errors[step] += 1
+
+    def flow_done(self):
+        with self._lock:
+            self.flows += 1
+
+    @property
+    def elapsed(self):
+        return (self.finished or time.monotonic()) - self.started
+
+    def summary(self):
+        rows = []
+        for step in STEPS:
+            samples = sorted(self.latencies.get(step, ()))
+            if not samples:
+                continue
+            rows.append({
+                'step': step,
+                'requests': len(samples),
+                'errors': self.errors[step],
+                'p50_ms': percentile(samples, 50) * 1000,
+                'p95_ms': percentile(samples, 95) * 1000,
+                'p99_ms': percentile(samples, 99) * 1000,
+                'max_ms': samples[-1] * 1000,
+            })
+        return rows
+
+
+def percentile(sorted_samples, pct):
+    """Nearest-rank percentile of an already sorted list"""
+    rank = max(1, round(pct / 100 * len(sorted_samples)))
+    return sorted_samples[min(rank, len(sorted_samples)) - 1]
+
+
+def seed_users(count, password, prefix='loadtest'):
+    """
+    Create ``count`` verified users with empty wallets, replacing earlier runs' users.
+
+    Deletes every user whose username starts with ``prefix-`` in the configured
+    database, so it refuses to run outside DEBUG.
+    """
+    if not settings.DEBUG:
+        raise ImproperlyConfigured("Load test seeding deletes users; run it with DEBUG=True against a scratch database")
+    User.objects.filter(username__startswith=f'{prefix}-').delete()
+    hashed = make_password(password)
+    users = User.objects.bulk_create([
+        User(username=f'{prefix}-{i}', email=f'{prefix}-{i}@example.com', password=hashed)
+        for i in range(count)
+    ])
+    CustomUser.objects.bulk_create([CustomUser(user=user, is_verified=True) for user in users])
+    UserWallet.objects.bulk_create([UserWallet(user=user) for user in users])
+    return [user.email for user in users]
+
+
+class FlowRunner:
+    """Runs login -> create order -> webhooks -> wallet for one user"""
+
+    def __init__(self, base_url, password, webhook_secret, stats, amount=100,
+                 orders_per_user=1, duplicate_rate=0.3, seed=None):
+        self.base_url = base_url.rstrip('/')
+        self.password = password
+        self.webhook_secret = webhook_secret.encode()
+        self.stats = stats
+        self.amount = amount
+        self.orders_per_user = orders_per_user
+        self.duplicate_rate = duplicate_rate
+        self.rng = random.Random(seed)
+        self.rng_lock = threading.Lock()
+
+    def _call(self, session, step, method, path, **kwargs):
+        started = time.perf_counter()
+        try:
+            response = session.request(method, f'{self.base_url}{path}', timeout=30, **kwargs)
+        except requests.RequestException as e:
+            self.stats.record(step, time.perf_counter() - started, ok=False)
+            raise FlowError(f'{step}: {e}')
+        self.stats.record(step, time.perf_counter() - started, ok=response.ok)
+        if not response.ok:
+            raise FlowError(f'{step}: HTTP {response.status_code} {response.text[:200]}')
+        return response
+
+    def _webhook_events(self, razorpay_order_id):
+        payment_id = f'pay_{uuid.uuid4().hex[:14]}'
+        events = [
+            {'event': 'payment.captured',
+             'payload': {'payment': {'entity': {'id': payment_id, 'order_id': razorpay_order_id}}}},
+            {'event': 'order.paid',
+             'payload': {'order': {'entity': {'id': razorpay_order_id}}}},
+        ]
+        with self.rng_lock:
+            deliveries = events + [event for event in events if self.rng.random() < self.duplicate_rate]
+            # Razorpay doesn't guarantee delivery order
+            self.rng.shuffle(deliveries)
+        return deliveries
+
+    def _deliver(self, session, event):
+        body = json.dumps(event).encode()
+        signature = hmac.new(self.webhook_secret, body, hashlib.sha256).hexdigest()
+        self._call(session, 'webhook', 'post', '/api/payments/webhook/', data=body, headers={
+            'Content-Type': 'application/json', 'X-Razorpay-Signature': signature,
+        })
+
+    def run(self, email):
+        with requests.Session() as session:
+            login = self._call(session, 'login', 'post', '/api/accounts/login/',
+                               json={'email': email, 'password': self.password})
+            # Cookies are Secure-only; plain-HTTP test servers need the header
+            session.headers['Authorization'] = f"Bearer {login.json()['access']}"
+
+            for _ in range(self.orders_per_user):
+                order = self._call(session, 'create_order', 'post', '/api/payments/create-order/',
+                                   json={'amount': str(self.amount)}).json()['order']
+                for event in self._webhook_events(order['razorpay_order_id']):
+                    self._deliver(session, event)
+                self._call(session, 'wallet', 'get', '/api/payments/wallet/')
+        self.stats.flow_done()
+
+
+def check_ledger(emails):
+    """Verify every order was credited exactly once and wallets match the ledger"""
+    users = User.objects.filter(email__in=emails)
+    orders = PaymentOrder.objects.filter(user__in=users)
+    purchases = CoinTransaction.objects.filter(user__in=users, transaction_type='PURCHASE')
+
+    duplicate_credits = purchases.values('reference_id').annotate(n=Count('id')).filter(n__gt=1).count()
+    order_totals = orders.values('user_id').annotate(
+        pending=Count('id', filter=~Q(status='PAID')),
+        coins=Sum('coins_to_credit', filter=Q(status='PAID')),
+    )
+    ledger_totals = dict(
+        CoinTransaction.objects.filter(user__in=users).values('user_id').annotate(total=Sum('amount'))
+        .values_list('user_id', 'total')
+    )
+    wallets = {wallet.user_id: wallet.total_balance for wallet in UserWallet.objects.filter(user__in=users)}
+
+    unpaid = sum(row['pending'] for row in order_totals)
+    mismatched = sum(
+        1 for row in order_totals
+        if not (row['coins'] or 0) == ledger_totals.get(row['user_id'], 0) == wallets.get(row['user_id'])
+    )
+    return {
+        'every order paid': unpaid == 0,
+        'each order credited once': duplicate_credits == 0,
+        'wallets match ledger and orders': mismatched == 0,
+    }, {'unpaid': unpaid, 'duplicate_credits': duplicate_credits, 'mismatched_wallets': mismatched}
@@ -0,0 +1,179 @@
+import json
+import platform
+import statistics
+import timeit
+import uuid
+from datetime import timedelta
+from decimal import Decimal
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from accounts.models import CustomUser
+from accounts.serializers import UserSerializer
+from core.fast_serializers import fast_serializer
+from payments.models import CoinTransaction, PaymentOrder, UserWallet
+from payments.renderers import DecimalSafeJSONRenderer
+from payments.serializers import CoinTransactionSerializer, PaymentOrderSerializer
+from payments.utils.payment_helpers import decimal_serializer
+
+DEFAULT_BASELINE = Path(settings.BASE_DIR) / '.benchmarks' / 'serializers.json'
+
+
+def _user():
+    user = User(id=1, username='bench', email='bench@example.com', first_name='Bench', last_name='User')
+    user.custom_user = CustomUser(user=user, phone_number='9999999999', role='USER', is_verified=True)
+    user.wallet = UserWallet(user=user, coin_balance=1500, total_coins_earned=2000,
+                             total_coins_spent=500, total_money_spent=Decimal('2000.00'))
+    return user
+
+
+def _orders(count):
+    now = timezone.now()
+    return [
+        PaymentOrder(order_id=f'order_{i:012x}', razorpay_order_id=f'order_rzp{i:010d}', amount=Decimal('499.00'),
+                     coins_to_credit=499, status='PAID', payment_method='CHECKOUT',
+                     created_at=now, expires_at=now + timedelta(hours=1))
+        for i in range(count)
+    ]
+
+
+def _transactions(count):
+    now = timezone.now()
+    return [
+        CoinTransaction(transaction_id=str(uuid.UUID(int=i)), transaction_type='PURCHASE', amount=499,
+                        balance_after=499 * (i + 1), reference_id=f'order_{i:012x}',
+                        description='Added 499 coins via PURCHASE', created_at=now)
+        for i in range(count)
+    ]
+
+
+def _log_payload():
+    return {
+        'amount': Decimal('499.00'),
+        'coins': 499,
+        'notes': {'rate': Decimal('1.00'), 'items': [Decimal('1.10')] * 20},
+        'order': {'id': 'order_rzp0000000001', 'status': 'created', 'amount_due': Decimal('499.00')},
+    }
+
+
+def _rows(fast, objects):
+    """The tuples ``values_list(*fast.lookups)`` would return for ``objects``"""
+    paths = [lookup.split('__') for lookup in fast.lookups]
+    rows = []
+    for obj in objects:
+        row = []
+        for path in paths:
+            value = obj
+            for attr in path:
+                value = getattr(value, attr)
+            row.append(value)
+        rows.append(tuple(row))
+    return rows
+
+
+def build_cases(sizes):
+    """Return ``{name: zero-argument callable}``; fixtures are built once, outside the timing"""
+    user = _user()
+    cases = {'UserSerializer': lambda: UserSerializer(user).data}
+    renderer = DecimalSafeJSONRenderer()
+    for size in sizes:
+        orders, transactions = _orders(size), _transactions(size)
+        order_data = PaymentOrderSerializer(orders, many=True).data
+        cases[f'PaymentOrderSerializer[{size}]'] = lambda o=orders: PaymentOrderSerializer(o, many=True).data
+        cases[f'CoinTransactionSerializer[{size}]'] = (
+            lambda t=transactions: CoinTransactionSerializer(t, many=True).data
+        )
+        for serializer_class, objects in ((PaymentOrderSerializer, orders),
+                                          (CoinTransactionSerializer, transactions)):
+            fast = fast_serializer(serializer_class)
+            cases[f'fast {serializer_class.__name__}[{size}]'] = (
+                lambda f=fast, r=_rows(fast, objects): f.render_rows(r)
+            )
+        cases[f'DecimalSafeJSONRenderer[{size}]'] = lambda d=order_data: renderer.render({'orders': d})
+    payload = _log_payload()
+    # The JSON round-trip log_payment_activity applies to request/response data
+    cases['log_payment_activity round-trip'] = (
+        lambda: json.loads(json.dumps(payload, default=decimal_serializer))
+    )
+    return cases
+
+
+def measure(func, repeat, min_time):
+    """Seconds per call: median and best of ``repeat`` runs of at least ``min_time`` each"""
+    timer = timeit.Timer(func)
+    number, elapsed = timer.autorange()
+    if elapsed < min_time:
+        number = max(1, int(number * min_time / elapsed))
+    runs = [t / number for t in timer.repeat(repeat=repeat, number=number)]
+    return {'median': statistics.median(runs), 'min': min(runs), 'calls': number}
+
+
+def _format(seconds):
+    if seconds >= 1:
+        return f'{seconds:.2f}s'
+    if seconds >= 1e-3:
+        return f'{seconds * 1e3:.2f}ms'
+    return f'{seconds * 1e6:.1f}us'
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark the API's serializer and rendering hot spots, compare against stored "
+        "baselines and optionally save new ones"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=int, nargs='+', default=[10, 1000, 100000],
+                            help="Row counts for the many=True serializers and the renderer")
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument('--min-time', type=float, default=0.2, help="Minimum seconds per timed run")
+        parser.add_argument('--filter', default='', help="Only run cases whose name contains this")
+        parser.add_argument('--baseline', default=str(DEFAULT_BASELINE))
+        parser.add_argument('--save', action='store_true', help="Store the results as the new baseline")
+        parser.add_argument('--tolerance', type=float, default=0.10,
+                            help="Slowdown (fraction of the baseline median) reported as a regression")
+        parser.add_argument('--fail-on-regression', action='store_true')
+
+    def handle(self, *args, **options):
+        baseline_path = Path(options['baseline'])
+        baseline = json.loads(baseline_path.read_text())['results'] if baseline_path.exists() else {}
+
+        results, regressions = {}, []
+        self.stdout.write(f"{'case':<40}{'median':>11}{'best':>11}{'baseline':>11}{'change':>9}")
+        for name, func in build_cases(options['sizes']).items():
+            if options['filter'] not in name:
+                continue
+            result = results[name] = measure(func, options['repeat'], options['min_time'])
+            reference = baseline.get(name)
+            change = ''
+            if reference:
+                ratio = result['median'] / reference['median'] - 1
+                change = f'{ratio:+.1%}'
+                if ratio > options['tolerance']:
+                    regressions.append(name)
+                    change += ' !'
+            self.stdout.write(
+                f"{name:<40}{_format(result['median']):>11}{_format(result['min']):>11}"
+                f"{_format(reference['median']) if reference else '-':>11}{change:>9}"
+            )
+
+        if options['save']:
+            baseline_path.parent.mkdir(parents=True, exist_ok=True)
+            merged = {**baseline, **results}
+            baseline_path.write_text(json.dumps({
+                'python': platform.python_version(),
+                'machine': platform.machine(),
+                'saved_at': timezone.now().isoformat(),
+                'results': merged,
+            }, indent=2, sort_keys=True))
+            self.stdout.write(self.style.SUCCESS(f"Baseline saved to {baseline_path}"))
+
+        if regressions:
+            message = f"{len(regressions)} regressions over {options['tolerance']:.0%}: {', '.join(regressions)}"
+            if options['fail_on_regression']:
+                raise CommandError(message)
+            self.stdout.write(self.style.WARNING(message))
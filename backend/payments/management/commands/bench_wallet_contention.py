@@ -0,0 +1,66 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections, transaction
+from django.db.models import Sum
+
+from core.scratch_db import scratch_database
+from payments.models import CoinTransaction, UserWallet
+from payments.utils.wallet_ops import credit_wallet, debit_wallet, set_shard_count
+
+
+class Command(BaseCommand):
+    help = (
+        "Credit one hot wallet from many threads at several shard counts in a scratch "
+        "database and report throughput (run against PostgreSQL; SQLite serializes all writes)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--shards', type=int, nargs='+', default=[0, 4, 16, 64])
+        parser.add_argument('--threads', type=int, default=32)
+        parser.add_argument('--credits', type=int, default=200, help="Credits per thread")
+        parser.add_argument('--keepdb', action='store_true')
+
+    def handle(self, *args, **options):
+        threads, credits = options['threads'], options['credits']
+        results = []
+        with scratch_database(keepdb=options['keepdb']):
+            for shard_count in options['shards']:
+                user = User.objects.create_user(username=f'hot-wallet-{shard_count}')
+                UserWallet.objects.create(user=user)
+                set_shard_count(user.id, shard_count)
+
+                def credit_many(_):
+                    try:
+                        for _ in range(credits):
+                            with transaction.atomic():
+                                credit_wallet(user.id, 1, 'BONUS')
+                    finally:
+                        connections.close_all()
+
+                started = time.monotonic()
+                with ThreadPoolExecutor(max_workers=threads) as pool:
+                    list(pool.map(credit_many, range(threads)))
+                elapsed = time.monotonic() - started
+
+                expected = threads * credits
+                wallet = UserWallet.objects.get(user=user)
+                ledger_total = CoinTransaction.objects.filter(user=user).aggregate(total=Sum('amount'))['total']
+                balance_ok = wallet.total_balance == ledger_total == expected
+
+                # Spending the whole balance forces the shards to be consolidated
+                with transaction.atomic():
+                    consolidated_ok = debit_wallet(user.id, expected) == 0
+                results.append((shard_count, expected / elapsed, balance_ok and consolidated_ok))
+            connections.close_all()
+
+        baseline = results[0][1]
+        for shard_count, throughput, ok in results:
+            self.stdout.write(
+                f"  shards={shard_count:<4} {throughput:10.1f} credits/s  "
+                f"x{throughput / baseline:.2f}  [{'ok' if ok else 'FAIL'}]"
+            )
+        if not all(ok for _, _, ok in results):
+            raise CommandError("Balances did not match the ledger")
@@ -0,0 +1,80 @@
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from collections import Counter
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from payments.loadtest.harness import FlowError, FlowRunner, LoadTestStats, check_ledger, seed_users
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed users and drive login -> create order -> signed webhooks (duplicated and "
+        "out of order) -> wallet against a running server, then check the ledger. "
+        "See payments/loadtest for the setup."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--base-url', default='http://127.0.0.1:8000')
+        parser.add_argument('--users', type=int, default=100)
+        parser.add_argument('--orders-per-user', type=int, default=1)
+        parser.add_argument('--concurrency', type=int, default=16)
+        parser.add_argument('--amount', type=int, default=100, help="Order amount in INR")
+        parser.add_argument('--duplicate-rate', type=float, default=0.3,
+                            help="Chance that each webhook is delivered twice")
+        parser.add_argument('--seed', type=int, default=None, help="Random seed for webhook ordering")
+        parser.add_argument('--password', default='Loadtest-pass-1')
+        parser.add_argument('--scratch-db', action='store_true',
+                            help="Confirm the configured database is a throwaway one: seeding deletes "
+                                 "earlier runs' loadtest-* users and writes orders and coins")
+
+    def handle(self, *args, **options):
+        if not (settings.DEBUG and options['scratch_db']):
+            db = settings.DATABASES['default']
+            raise CommandError(
+                f"Refusing to seed {db.get('NAME')!r} on {db.get('HOST') or 'localhost'}: the load test deletes "
+                "and creates users. Point it at a scratch database and pass --scratch-db with DEBUG=True."
+            )
+        if not settings.RAZORPAY_WEBHOOK_SECRET:
+            raise CommandError("Set RAZORPAY_WEBHOOK_SECRET (same value as the server) to sign webhooks")
+
+        emails = seed_users(options['users'], options['password'])
+        self.stdout.write(f"Seeded {len(emails)} users")
+
+        stats = LoadTestStats()
+        runner = FlowRunner(
+            options['base_url'], options['password'], settings.RAZORPAY_WEBHOOK_SECRET, stats,
+            amount=options['amount'], orders_per_user=options['orders_per_user'],
+            duplicate_rate=options['duplicate_rate'], seed=options['seed'],
+        )
+        failures = Counter()
+        with ThreadPoolExecutor(max_workers=options['concurrency']) as pool:
+            futures = [pool.submit(runner.run, email) for email in emails]
+            for future in as_completed(futures):
+                try:
+                    future.result()
+                except FlowError as e:
+                    failures[str(e).split(':')[0]] += 1
+                    if options['verbosity'] > 1:
+                        self.stderr.write(str(e))
+        stats.finished = time.monotonic()
+
+        self.stdout.write(f"\n{'step':<14}{'requests':>9}{'errors':>8}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'max ms':>9}")
+        for row in stats.summary():
+            self.stdout.write(
+                f"{row['step']:<14}{row['requests']:>9}{row['errors']:>8}{row['p50_ms']:>9.1f}"
+                f"{row['p95_ms']:>9.1f}{row['p99_ms']:>9.1f}{row['max_ms']:>9.1f}"
+            )
+        self.stdout.write(
+            f"\n{stats.flows} flows completed in {stats.elapsed:.2f}s "
+            f"({stats.flows / stats.elapsed:.1f} users/s), {sum(failures.values())} failed {dict(failures)}"
+        )
+
+        checks, details = check_ledger(emails)
+        self.stdout.write(f"Ledger: {details}")
+        for name, passed in checks.items():
+            self.stdout.write(f"  [{'ok' if passed else 'FAIL'}] {name}")
+        if failures or not all(checks.values()):
+            raise CommandError("Load test failed")
+        self.stdout.write(self.style.SUCCESS("Ledger consistent"))
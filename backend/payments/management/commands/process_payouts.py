@@ -0,0 +1,41 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from payments.utils.payouts import process_payouts
+
+
+class Command(BaseCommand):
+    help = "Debit wallets and submit payouts for approved coin redemptions in batches"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--max-batches', type=int, default=None)
+        parser.add_argument(
+            '--interval', type=int, default=0,
+            help="Keep running and poll every N seconds (default: drain once, for cron)"
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            stats = process_payouts(
+                batch_size=options['batch_size'],
+                max_batches=options['max_batches'],
+                on_batch=self._report_batch,
+            )
+            self.stdout.write(self.style.SUCCESS(
+                f"{stats.batches} batches in {stats.elapsed:.2f}s: "
+                f"{stats.paid} paid (₹{stats.amount_paid}), {stats.failed} failed, {stats.retrying} to retry, "
+                f"{stats.rejected} rejected, {stats.lease_lost} lost to an expired lease, "
+                f"{stats.coins_debited} coins debited, {stats.coins_refunded} refunded, "
+                f"{stats.throughput:.1f} redemptions/s"
+            ))
+            if not options['interval']:
+                break
+            time.sleep(options['interval'])
+
+    def _report_batch(self, stats):
+        self.stdout.write(
+            f"batch {stats.batches}: claimed {stats.claimed} total, {stats.paid} paid, "
+            f"{stats.throughput:.1f} redemptions/s"
+        )
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from payments.loadtest.fake_razorpay import FakeRazorpayServer
+
+
+class Command(BaseCommand):
+    help = "Serve a local fake of the Razorpay orders API for load tests (set RAZORPAY_BASE_URL to it)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='127.0.0.1')
+        parser.add_argument('--port', type=int, default=8765)
+        parser.add_argument('--latency-ms', type=int, default=0, help="Delay added to every response")
+
+    def handle(self, *args, **options):
+        server = FakeRazorpayServer((options['host'], options['port']), latency_ms=options['latency_ms'])
+        self.stdout.write(f"Fake Razorpay listening on http://{options['host']}:{options['port']}")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from payments.models import UserWallet
+from payments.utils.wallet_ops import set_shard_count
+
+
+class Command(BaseCommand):
+    help = "Spread a hot wallet's credits over N shard rows (0 consolidates and turns sharding off)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('user_id', type=int)
+        parser.add_argument('shards', type=int)
+
+    def handle(self, *args, **options):
+        if not 0 <= options['shards'] <= 256:
+            raise CommandError("shards must be between 0 and 256")
+        try:
+            wallet = set_shard_count(options['user_id'], options['shards'])
+        except UserWallet.DoesNotExist:
+            raise CommandError(f"User {options['user_id']} has no wallet")
+        self.stdout.write(self.style.SUCCESS(
+            f"Wallet of user {options['user_id']} now uses {wallet.shard_count} shards "
+            f"(balance {wallet.total_balance})"
+        ))
@@ -0,0 +1,22 @@
+# Generated by Django 4.2.25 on 2026-10-19 15:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payments', '0002_paymentorder_qr_code_image_url_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='featurepurchase',
+            name='client_key',
+            field=models.CharField(blank=True, max_length=64, null=True),
+        ),
+        migrations.AddConstraint(
+            model_name='featurepurchase',
+            constraint=models.UniqueConstraint(fields=('user', 'client_key'), name='unique_purchase_client_key'),
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 4.2.25 on 2026-10-19 15:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payments', '0003_featurepurchase_client_key'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='coinredemption',
+            name='payout_attempts',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='coinredemption',
+            name='payout_reference',
+            field=models.CharField(blank=True, max_length=100, null=True),
+        ),
+        migrations.AddField(
+            model_name='coinredemption',
+            name='processing_started_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='coinredemption',
+            name='status',
+            field=models.CharField(choices=[('PENDING', 'Pending'), ('APPROVED', 'Approved'), ('PROCESSING', 'Processing'), ('PAID', 'Paid'), ('FAILED', 'Failed'), ('REJECTED', 'Rejected'), ('CANCELLED', 'Cancelled')], default='PENDING', max_length=20),
+        ),
+        migrations.AddIndex(
+            model_name='coinredemption',
+            index=models.Index(fields=['status', 'id'], name='redemption_status_idx'),
+        ),
+    ]
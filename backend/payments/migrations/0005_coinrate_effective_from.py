@@ -0,0 +1,19 @@
+# Generated by Django 4.2.25 on 2026-10-19 15:04
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payments', '0004_coinredemption_payout_processing'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='coinrate',
+            name='effective_from',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+    ]
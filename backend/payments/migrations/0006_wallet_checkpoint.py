@@ -0,0 +1,34 @@
+# Generated by Django 4.2.25 on 2026-10-19 15:06
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('payments', '0005_coinrate_effective_from'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WalletCheckpoint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('last_transaction_id', models.BigIntegerField(default=0)),
+                ('balance', models.IntegerField(default=0)),
+                ('verified_at', models.DateTimeField()),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='cointransaction',
+            index=models.Index(fields=['user', 'id'], name='cointransaction_user_id_idx'),
+        ),
+        migrations.AddField(
+            model_name='walletcheckpoint',
+            name='user',
+            field=models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='wallet_checkpoint', to=settings.AUTH_USER_MODEL),
+        ),
+    ]
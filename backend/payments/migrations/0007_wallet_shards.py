@@ -0,0 +1,35 @@
+# Generated by Django 4.2.25 on 2026-10-19 15:08
+
+from decimal import Decimal
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payments', '0006_wallet_checkpoint'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userwallet',
+            name='shard_count',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.CreateModel(
+            name='WalletShard',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('index', models.PositiveSmallIntegerField()),
+                ('coin_balance', models.PositiveIntegerField(default=0)),
+                ('total_coins_earned', models.PositiveIntegerField(default=0)),
+                ('total_money_spent', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=12)),
+                ('wallet', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='shards', to='payments.userwallet')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='walletshard',
+            constraint=models.UniqueConstraint(fields=('wallet', 'index'), name='unique_wallet_shard'),
+        ),
+    ]
@@ -0,0 +1,85 @@
+# Generated by Django 4.2.25 on 2026-10-19 15:51
+
+from django.db import migrations, models, transaction
+from django.db.models import Sum
+
+CHUNK_SIZE = 1000
+
+
+def record_opening_balances(apps, schema_editor):
+    """
+    Give every wallet whose ledger doesn't add up to its balance an
+    OPENING_BALANCE row for the difference, so the ledger audit starts clean.
+
+    Each chunk locks its wallets and shards, as every balance change does, so
+    the balance and the ledger sum are read consistently on a live database.
+    """
+    UserWallet = apps.get_model('payments', 'UserWallet')
+    WalletShard = apps.get_model('payments', 'WalletShard')
+    CoinTransaction = apps.get_model('payments', 'CoinTransaction')
+    db = schema_editor.connection.alias
+
+    last_user_id = 0
+    while True:
+        with transaction.atomic(using=db):
+            wallets = list(
+                UserWallet.objects.using(db).select_for_update()
+                .filter(user_id__gt=last_user_id)
+                .order_by('user_id')
+                .values_list('id', 'user_id', 'coin_balance')[:CHUNK_SIZE]
+            )
+            if not wallets:
+                break
+            last_user_id = wallets[-1][1]
+            user_ids = [user_id for _, user_id, _ in wallets]
+            shard_balances = {}
+            shards = (
+                WalletShard.objects.using(db).select_for_update()
+                .filter(wallet_id__in=[wallet_id for wallet_id, _, _ in wallets])
+                .order_by('wallet_id', 'index')
+                .values_list('wallet_id', 'coin_balance')
+            )
+            for wallet_id, coin_balance in shards:
+                shard_balances[wallet_id] = shard_balances.get(wallet_id, 0) + coin_balance
+            ledger = dict(
+                CoinTransaction.objects.using(db).filter(user_id__in=user_ids)
+                .order_by().values('user_id').annotate(total=Sum('amount')).values_list('user_id', 'total')
+            )
+            openings = []
+            for wallet_id, user_id, coin_balance in wallets:
+                balance = coin_balance + shard_balances.get(wallet_id, 0)
+                difference = balance - (ledger.get(user_id) or 0)
+                if difference:
+                    openings.append(CoinTransaction(
+                        user_id=user_id,
+                        transaction_type='OPENING_BALANCE',
+                        amount=difference,
+                        balance_after=balance,
+                        description="Balance not covered by the ledger when auditing started",
+                    ))
+            CoinTransaction.objects.using(db).bulk_create(openings)
+
+
+def delete_opening_balances(apps, schema_editor):
+    CoinTransaction = apps.get_model('payments', 'CoinTransaction')
+    CoinTransaction.objects.using(schema_editor.connection.alias).filter(
+        transaction_type='OPENING_BALANCE'
+    ).delete()
+
+
+class Migration(migrations.Migration):
+    # One transaction per chunk of wallets, not one for the whole table
+    atomic = False
+
+    dependencies = [
+        ('payments', '0007_wallet_shards'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='cointransaction',
+            name='transaction_type',
+            field=models.CharField(choices=[('PURCHASE', 'Coin Purchase'), ('FEATURE_BUY', 'Feature Purchase'), ('REDEMPTION', 'Coin Redemption'), ('BONUS', 'Bonus Coins'), ('REFUND', 'Refund'), ('ADMIN_CREDIT', 'Admin Credit'), ('ADMIN_DEBIT', 'Admin Debit'), ('OPENING_BALANCE', 'Opening Balance')], max_length=20),
+        ),
+        migrations.RunPython(record_opening_balances, delete_opening_balances),
+    ]
@@ -1,4 +1,4 @@
-from django.db import models
+from django.db import models, transaction
 from django.contrib.auth.models import User
 from django.utils import timezone
 from decimal import Decimal
@@ -72,46 +72,69 @@ class UserWallet(models.Model):
     total_coins_spent = models.PositiveIntegerField(default=0)   # Lifetime spending
     total_money_spent = models.DecimalField(max_digits=12, decimal_places=2, default=Decimal('0.00'))
     
+    # Hot wallets spread credits over this many WalletShard rows (0 = single-row balance).
+    # coin_balance then only holds the consolidated part; use total_balance for reads.
+    shard_count = models.PositiveSmallIntegerField(default=0)
+    
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
     def __str__(self):
-        return f"{self.user.username} - {self.coin_balance} coins"
+        return f"{self.user.username} - {self.total_balance} coins"
+    
+    @property
+    def total_balance(self):
+        """Spendable balance, including credits not yet consolidated from shards"""
+        if not self.shard_count:
+            return self.coin_balance
+        pending = self.shards.aggregate(total=models.Sum('coin_balance'))['total'] or 0
+        return self.coin_balance + pending
     
     def add_coins(self, amount, transaction_type, reference=None):
         """Add coins to wallet and create transaction record"""
-        self.coin_balance += amount
-        self.total_coins_earned += amount
-        self.save()
+        from .utils.wallet_ops import credit_wallet
         
-        # Create transaction record
-        CoinTransaction.objects.create(
-            user=self.user,
-            transaction_type=transaction_type,
-            amount=amount,
-            balance_after=self.coin_balance,
-            reference_id=reference,
-            description=f"Added {amount} coins via {transaction_type}"
-        )
+        with transaction.atomic():
+            credit_wallet(self.user_id, amount, transaction_type, reference_id=reference)
+        self.refresh_from_db()
     
     def deduct_coins(self, amount, transaction_type, reference=None):
         """Deduct coins from wallet if sufficient balance"""
-        if self.coin_balance >= amount:
-            self.coin_balance -= amount
-            self.total_coins_spent += amount
-            self.save()
-            
-            # Create transaction record
+        from core.metrics import count_wallet_coins
+        from .utils.wallet_ops import debit_wallet
+        
+        with transaction.atomic():
+            balance = debit_wallet(self.user_id, amount)
+            if balance is None:
+                return False
             CoinTransaction.objects.create(
-                user=self.user,
+                user_id=self.user_id,
                 transaction_type=transaction_type,
                 amount=-amount,  # Negative for deduction
-                balance_after=self.coin_balance,
+                balance_after=balance,
                 reference_id=reference,
                 description=f"Spent {amount} coins on {transaction_type}"
             )
-            return True
-        return False
+            count_wallet_coins('debit', transaction_type, amount)
+        self.refresh_from_db()
+        return True
+
+
+class WalletShard(models.Model):
+    """Credit sub-counter of a sharded wallet, folded into the wallet on debit"""
+    wallet = models.ForeignKey(UserWallet, on_delete=models.CASCADE, related_name='shards')
+    index = models.PositiveSmallIntegerField()
+    coin_balance = models.PositiveIntegerField(default=0)
+    total_coins_earned = models.PositiveIntegerField(default=0)
+    total_money_spent = models.DecimalField(max_digits=12, decimal_places=2, default=Decimal('0.00'))
+    
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['wallet', 'index'], name='unique_wallet_shard'),
+        ]
+    
+    def __str__(self):
+        return f"{self.wallet} - shard {self.index}: {self.coin_balance} coins"
 
 
 class CoinTransaction(models.Model):
@@ -124,6 +147,7 @@ class CoinTransaction(models.Model):
         ('REFUND', 'Refund'),
         ('ADMIN_CREDIT', 'Admin Credit'),
         ('ADMIN_DEBIT', 'Admin Debit'),
+        ('OPENING_BALANCE', 'Opening Balance'),  # Balance held before the ledger was audited
     ]
     
     transaction_id = models.CharField(max_length=100, unique=True, default=uuid.uuid4)
@@ -141,11 +165,26 @@ class CoinTransaction(models.Model):
     
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Ledger verification sums a user's rows after a checkpoint id
+            models.Index(fields=['user', 'id'], name='cointransaction_user_id_idx'),
+        ]
     
     def __str__(self):
         return f"{self.user.username} - {self.amount} coins ({self.transaction_type})"
 
 
+class WalletCheckpoint(models.Model):
+    """Last verified ledger position of a wallet"""
+    user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='wallet_checkpoint')
+    last_transaction_id = models.BigIntegerField(default=0)  # CoinTransaction.id covered by the balance
+    balance = models.IntegerField(default=0)  # Sum of ledger amounts up to last_transaction_id
+    verified_at = models.DateTimeField()
+    
+    def __str__(self):
+        return f"{self.user.username} - {self.balance} coins at #{self.last_transaction_id}"
+
+
 class FeaturePurchase(models.Model):
     """Records of feature purchases using coins"""
     purchase_id = models.CharField(max_length=100, unique=True, default=uuid.uuid4)
@@ -161,9 +200,13 @@ class FeaturePurchase(models.Model):
     
     is_active = models.BooleanField(default=True)
     transaction = models.OneToOneField(CoinTransaction, on_delete=models.CASCADE, null=True, blank=True)
+    client_key = models.CharField(max_length=64, null=True, blank=True)  # Idempotency key sent by the client
     
     class Meta:
         ordering = ['-purchased_at']
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'client_key'], name='unique_purchase_client_key'),
+        ]
     
     def __str__(self):
         return f"{self.user.username} - {self.feature.name} ({self.coins_spent} coins)"
@@ -174,7 +217,9 @@ class CoinRedemption(models.Model):
     STATUS_CHOICES = [
         ('PENDING', 'Pending'),
         ('APPROVED', 'Approved'),
+        ('PROCESSING', 'Processing'),  # Coins debited, payout submitted to the gateway
         ('PAID', 'Paid'),
+        ('FAILED', 'Failed'),          # Payout gave up after retries, coins refunded
         ('REJECTED', 'Rejected'),
         ('CANCELLED', 'Cancelled'),
     ]
@@ -195,11 +240,19 @@ class CoinRedemption(models.Model):
     approved_at = models.DateTimeField(null=True, blank=True)
     paid_at = models.DateTimeField(null=True, blank=True)
     
+    # Payout processing
+    processing_started_at = models.DateTimeField(null=True, blank=True)  # Lease held by the payout batcher
+    payout_attempts = models.PositiveSmallIntegerField(default=0)
+    payout_reference = models.CharField(max_length=100, blank=True, null=True)  # Gateway payout id
+    
     admin_notes = models.TextField(blank=True, null=True)
     transaction = models.OneToOneField(CoinTransaction, on_delete=models.CASCADE, null=True, blank=True)
     
     class Meta:
         ordering = ['-requested_at']
+        indexes = [
+            models.Index(fields=['status', 'id'], name='redemption_status_idx'),
+        ]
     
     def __str__(self):
         return f"Redemption {self.redemption_id} - {self.coins_redeemed} coins for ₹{self.amount_to_pay}"
@@ -252,6 +305,7 @@ class CoinRate(models.Model):
     ])
     coins_per_inr = models.DecimalField(max_digits=6, decimal_places=2)  # How many coins for 1 INR
     is_active = models.BooleanField(default=True)
+    effective_from = models.DateTimeField(default=timezone.now)  # Set in the future to schedule a rate
     
     created_at = models.DateTimeField(auto_now_add=True)
     created_by = models.ForeignKey(User, on_delete=models.CASCADE)
@@ -1,6 +1,7 @@
 from rest_framework import serializers
-from .models import PaymentOrder, UserWallet, CoinTransaction, PaymentLog
+from .models import PaymentOrder, UserWallet, CoinTransaction, PaymentLog, FeaturePurchase
 from decimal import Decimal
+from core.instrumentation import TimedSerializerMixin
 
 
 class CreateOrderSerializer(serializers.Serializer):
@@ -16,7 +17,7 @@ class CreateOrderSerializer(serializers.Serializer):
         return value
 
 
-class PaymentOrderSerializer(serializers.ModelSerializer):
+class PaymentOrderSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     """Serializer for payment order response"""
     amount = serializers.DecimalField(max_digits=10, decimal_places=2, coerce_to_string=True)
     
@@ -30,8 +31,9 @@ class PaymentOrderSerializer(serializers.ModelSerializer):
         read_only_fields = fields
 
 
-class UserWalletSerializer(serializers.ModelSerializer):
+class UserWalletSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     """Serializer for user wallet info"""
+    coin_balance = serializers.IntegerField(source='total_balance', read_only=True)
     total_money_spent = serializers.DecimalField(max_digits=10, decimal_places=2, coerce_to_string=True)
     
     class Meta:
@@ -43,7 +45,7 @@ class UserWalletSerializer(serializers.ModelSerializer):
         read_only_fields = fields
 
 
-class CoinTransactionSerializer(serializers.ModelSerializer):
+class CoinTransactionSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     """Serializer for coin transaction history"""
     
     class Meta:
@@ -52,4 +54,36 @@ class CoinTransactionSerializer(serializers.ModelSerializer):
             'transaction_id', 'transaction_type', 'amount', 'balance_after',
             'reference_id', 'description', 'created_at'
         ]
-        read_only_fields = fields
\ No newline at end of file
+        read_only_fields = fields
+
+class FeaturePurchaseRequestSerializer(serializers.Serializer):
+    """
+    Serializer for buying a feature with coins.
+
+    ``client_key`` falls back to the ``idempotency_key`` context value (the
+    Idempotency-Key header), checked with the same rules.
+    """
+    feature_code = serializers.CharField(max_length=50)
+    client_key = serializers.CharField(max_length=64, required=False)
+
+    def validate(self, attrs):
+        header = self.context.get('idempotency_key')
+        if not attrs.get('client_key') and header is not None:
+            try:
+                attrs['client_key'] = self.fields['client_key'].run_validation(header)
+            except serializers.ValidationError as e:
+                raise serializers.ValidationError({'client_key': e.detail})
+        return attrs
+
+
+class FeaturePurchaseSerializer(TimedSerializerMixin, serializers.ModelSerializer):
+    """Serializer for feature purchase records"""
+    feature_code = serializers.CharField(source='feature.code', read_only=True)
+    
+    class Meta:
+        model = FeaturePurchase
+        fields = [
+            'purchase_id', 'feature_code', 'coins_spent', 'duration_days',
+            'purchased_at', 'activated_at', 'expires_at', 'client_key'
+        ]
+        read_only_fields = fields
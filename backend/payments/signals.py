@@ -0,0 +1,10 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import CoinRate
+from .utils.coin_rates import invalidate_coin_rates
+
+
+@receiver([post_save, post_delete], sender=CoinRate)
+def coin_rate_changed(sender, **kwargs):
+    invalidate_coin_rates()
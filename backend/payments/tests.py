@@ -0,0 +1,230 @@
+import importlib
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from decimal import Decimal
+from types import SimpleNamespace
+
+from django.apps import apps
+from django.contrib.auth.models import User
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import CommandError, call_command
+from django.db import connection, connections
+from django.db.models import Sum
+from django.test import TestCase, TransactionTestCase, override_settings, skipUnlessDBFeature
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from core.query_budgets import QueryBudgetMixin
+from features.catalog import invalidate_catalog
+from features.models import Feature, UserFeature
+from payments.loadtest.harness import seed_users
+from payments.models import CoinRedemption, CoinTransaction, FeaturePurchase, UserWallet
+from payments.utils.feature_purchase import InsufficientCoins, purchase_feature
+from payments.utils.ledger_audit import verify_range
+from payments.utils.payouts import PayoutGateway, get_payout_gateway, process_payouts
+
+
+class FeaturePurchaseTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('buyer', 'buyer@example.com')
+        UserWallet.objects.create(user=self.user, coin_balance=100)
+        Feature.objects.create(name='Reports', code='reports', coin_price=10, duration_days=1)
+        invalidate_catalog()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_idempotency_key_header_is_used_as_client_key(self):
+        response = self.client.post(reverse('payments:purchase-feature'), {'feature_code': 'reports'},
+                                    format='json', HTTP_IDEMPOTENCY_KEY='retry-1')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['purchase']['client_key'], 'retry-1')
+
+    def test_long_idempotency_key_is_rejected(self):
+        response = self.client.post(reverse('payments:purchase-feature'), {'feature_code': 'reports'},
+                                    format='json', HTTP_IDEMPOTENCY_KEY='k' * 65)
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('client_key', response.data['errors'])
+        self.assertFalse(FeaturePurchase.objects.exists())
+
+
+@skipUnlessDBFeature('has_select_for_update')
+class FeaturePurchaseConcurrencyTests(TransactionTestCase):
+    """Parallel purchases, with every client key sent twice, against one wallet"""
+    price = 10
+    affordable = 20
+    requests = 200
+
+    def setUp(self):
+        self.user = User.objects.create_user('concurrent-buyer')
+        UserWallet.objects.create(user=self.user, coin_balance=self.price * self.affordable)
+        Feature.objects.create(name='Concurrency', code='concurrency', coin_price=self.price, duration_days=1)
+        invalidate_catalog()
+
+    def _attempt(self, client_key):
+        try:
+            _, created = purchase_feature(self.user, 'concurrency', client_key)
+            return 'created' if created else 'replayed'
+        except InsufficientCoins:
+            return 'insufficient'
+        finally:
+            connections.close_all()
+
+    def test_one_debit_per_client_key(self):
+        keys = [f'key-{i // 2}' for i in range(self.requests)]
+        with ThreadPoolExecutor(max_workers=16) as pool:
+            outcomes = Counter(pool.map(self._attempt, keys))
+
+        created = outcomes['created']
+        self.assertEqual(created, self.affordable)
+        purchases = FeaturePurchase.objects.filter(user=self.user)
+        self.assertEqual(purchases.count(), created)
+        self.assertEqual(purchases.values('client_key').distinct().count(), created)
+
+        debits = CoinTransaction.objects.filter(user=self.user, transaction_type='FEATURE_BUY')
+        self.assertEqual(debits.count(), created)
+        self.assertEqual(debits.aggregate(total=Sum('amount'))['total'], -created * self.price)
+        wallet = UserWallet.objects.get(user=self.user)
+        self.assertEqual(wallet.coin_balance, 0)
+        self.assertEqual(wallet.total_coins_spent, created * self.price)
+        self.assertTrue(UserFeature.objects.get(user=self.user).is_active)
+
+
+class BrokenGateway(PayoutGateway):
+    def submit(self, requests):
+        raise ConnectionError("gateway unreachable")
+
+
+class SlowGateway(PayoutGateway):
+    """Fails after its lease ran out and another batcher re-claimed the rows"""
+
+    def submit(self, requests):
+        CoinRedemption.objects.filter(redemption_id__in=[r.reference for r in requests]).update(
+            processing_started_at=timezone.now() + timedelta(seconds=1),
+        )
+        raise TimeoutError("gateway timed out")
+
+
+@override_settings(PAYOUT_GATEWAY='payments.tests.BrokenGateway', PAYOUT_LEASE_SECONDS=0, PAYOUT_MAX_ATTEMPTS=2)
+class PayoutFailureTests(TestCase):
+    def setUp(self):
+        get_payout_gateway.cache_clear()
+        self.addCleanup(get_payout_gateway.cache_clear)
+        self.user = User.objects.create_user('payee', 'payee@example.com', 'pw')
+        UserWallet.objects.create(user=self.user, coin_balance=100)
+        self.redemption = CoinRedemption.objects.create(
+            user=self.user, coins_redeemed=40, amount_to_pay=Decimal('4.00'),
+            exchange_rate=Decimal('10.0000'), status='APPROVED',
+        )
+
+    def test_gateway_error_counts_as_an_attempt(self):
+        process_payouts(max_batches=1)
+        self.redemption.refresh_from_db()
+        self.assertEqual(self.redemption.status, 'PROCESSING')
+        self.assertEqual(self.redemption.payout_attempts, 1)
+        self.assertIn('gateway unreachable', self.redemption.admin_notes)
+
+    def test_failed_payout_refunds_the_coins(self):
+        stats = process_payouts()
+        self.redemption.refresh_from_db()
+        self.assertEqual(self.redemption.status, 'FAILED')
+        self.assertEqual(self.redemption.payout_attempts, 2)
+        self.assertEqual(stats.coins_refunded, 40)
+
+        wallet = UserWallet.objects.get(user=self.user)
+        self.assertEqual(wallet.coin_balance, 100)
+        self.assertEqual(wallet.total_coins_spent, 0)
+        ledger = CoinTransaction.objects.filter(reference_id=self.redemption.redemption_id)
+        self.assertEqual(
+            sorted(ledger.values_list('transaction_type', 'amount', 'balance_after')),
+            [('REDEMPTION', -40, 60), ('REFUND', 40, 100)],
+        )
+
+
+@override_settings(PAYOUT_GATEWAY='payments.utils.payouts.FakePayoutGateway')
+class PayoutBatchTests(TestCase):
+    def setUp(self):
+        get_payout_gateway.cache_clear()
+        self.addCleanup(get_payout_gateway.cache_clear)
+
+    def _redemption(self, username, balance, coins):
+        user = User.objects.create_user(username)
+        UserWallet.objects.create(user=user, coin_balance=balance)
+        return CoinRedemption.objects.create(
+            user=user, coins_redeemed=coins, amount_to_pay=Decimal(coins) / 10,
+            exchange_rate=Decimal('10.0000'), status='APPROVED',
+        )
+
+    def test_rejected_batch_does_not_stop_the_run(self):
+        short = [self._redemption(f'short-{i}', 10, 40) for i in range(2)]
+        payable = self._redemption('payable', 100, 40)
+
+        stats = process_payouts(batch_size=2)
+        self.assertEqual((stats.rejected, stats.paid), (2, 1))
+        self.assertEqual(CoinRedemption.objects.get(pk=payable.pk).status, 'PAID')
+        self.assertEqual({r.status for r in CoinRedemption.objects.filter(pk__in=[r.pk for r in short])}, {'REJECTED'})
+
+
+    @override_settings(PAYOUT_GATEWAY='payments.tests.SlowGateway', PAYOUT_MAX_ATTEMPTS=1)
+    def test_outcome_not_written_after_losing_the_lease(self):
+        redemption = self._redemption('payee', 100, 40)
+
+        stats = process_payouts()
+        self.assertEqual((stats.lease_lost, stats.failed, stats.coins_refunded), (1, 0, 0))
+        redemption.refresh_from_db()
+        self.assertEqual((redemption.status, redemption.payout_attempts), ('PROCESSING', 0))
+        self.assertFalse(CoinTransaction.objects.filter(transaction_type='REFUND').exists())
+        self.assertEqual(UserWallet.objects.get(user=redemption.user).coin_balance, 60)
+
+
+class PayoutGatewaySettingTests(TestCase):
+    def setUp(self):
+        get_payout_gateway.cache_clear()
+        self.addCleanup(get_payout_gateway.cache_clear)
+
+    @override_settings(PAYOUT_GATEWAY='')
+    def test_unset_gateway_is_an_error(self):
+        with self.assertRaises(ImproperlyConfigured):
+            get_payout_gateway()
+
+
+class OpeningBalanceMigrationTests(TestCase):
+    migration = importlib.import_module('payments.migrations.0008_ledger_opening_balances')
+
+    def test_existing_wallets_start_the_audit_clean(self):
+        unlogged = User.objects.create_user('unlogged')
+        UserWallet.objects.create(user=unlogged, coin_balance=50)
+        partial = User.objects.create_user('partial')
+        UserWallet.objects.create(user=partial, coin_balance=30)
+        CoinTransaction.objects.create(user=partial, transaction_type='BONUS', amount=10, balance_after=10)
+        self.assertEqual(verify_range(0, 10 ** 9, settle_seconds=0).mismatched, 2)
+
+        self.migration.record_opening_balances(apps, SimpleNamespace(connection=connection))
+
+        self.assertEqual(
+            sorted(CoinTransaction.objects.filter(transaction_type='OPENING_BALANCE').values_list('user', 'amount')),
+            [(unlogged.id, 50), (partial.id, 20)],
+        )
+        self.assertEqual(verify_range(0, 10 ** 9, full=True, settle_seconds=0).mismatched, 0)
+
+
+class LoadTestGuardTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('loadtest-0', 'real@example.com')
+
+    @override_settings(DEBUG=True, RAZORPAY_WEBHOOK_SECRET='secret')
+    def test_command_needs_scratch_db_flag(self):
+        with self.assertRaisesMessage(CommandError, '--scratch-db'):
+            call_command('loadtest_payments', users=1)
+        self.assertTrue(User.objects.filter(pk=self.user.pk).exists())
+
+    @override_settings(DEBUG=False)
+    def test_seeding_refuses_outside_debug(self):
+        with self.assertRaises(ImproperlyConfigured):
+            seed_users(1, 'password')
+        self.assertTrue(User.objects.filter(pk=self.user.pk).exists())
+
+
+class QueryBudgetTests(QueryBudgetMixin, TransactionTestCase):
+    urlconf = 'payments.urls'
@@ -4,7 +4,8 @@ from .views import (
     UserWalletView, 
     VerifyPaymentView, 
     OrderStatusView, 
-    PaymentWebhookView
+    PaymentWebhookView,
+    FeaturePurchaseView,
 )
 
 app_name = 'payments'
@@ -15,4 +16,5 @@ urlpatterns = [
     path('verify-payment/', VerifyPaymentView.as_view(), name='verify-payment'),
     path('order-status/<str:order_id>/', OrderStatusView.as_view(), name='order-status'),
     path('webhook/', PaymentWebhookView.as_view(), name='webhook'),
+    path('purchase-feature/', FeaturePurchaseView.as_view(), name='purchase-feature'),
 ]
\ No newline at end of file
@@ -0,0 +1,48 @@
+"""
+Coin exchange rates resolved from CoinRate.
+
+Every active rate, including rates scheduled for later, is held in process
+memory and reloaded only when a CoinRate is saved or deleted. Resolving the
+current rate is a cache version lookup plus a scan of a few rows, so it adds
+no query to order creation, and scheduled rates switch on by themselves.
+"""
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import transaction
+from django.utils import timezone
+
+from core.db_routers import PRIMARY_DB
+from core.local_cache import VersionedLocalCache
+from payments.models import CoinRate
+
+# Used until the first CoinRate of a type is created
+DEFAULT_COINS_PER_INR = Decimal('1.00')
+
+
+def _load_rates():
+    rates = defaultdict(list)
+    active_rates = CoinRate.objects.using(PRIMARY_DB).filter(is_active=True).order_by('-effective_from', '-id')
+    for rate_type, coins_per_inr, effective_from in active_rates.values_list(
+        'rate_type', 'coins_per_inr', 'effective_from'
+    ):
+        rates[rate_type].append((effective_from, coins_per_inr))
+    return dict(rates)
+
+
+_rates = VersionedLocalCache('coin-rates', _load_rates)
+
+
+def get_coin_rate(rate_type='PURCHASE', at=None):
+    """Coins per INR for ``rate_type`` in effect at ``at`` (default: now)"""
+    at = at or timezone.now()
+    # Newest first: the first rate already in effect wins
+    for effective_from, coins_per_inr in _rates.get().get(rate_type, ()):
+        if effective_from <= at:
+            return coins_per_inr
+    return DEFAULT_COINS_PER_INR
+
+
+def invalidate_coin_rates():
+    """Reload rates in every process once the current transaction commits"""
+    transaction.on_commit(_rates.bump)
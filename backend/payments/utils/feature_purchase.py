@@ -0,0 +1,132 @@
+"""
+Feature purchases paid with wallet coins.
+
+A purchase runs in one short transaction: conditional wallet debit, ledger
+entry, FeaturePurchase record and activation (or extension) of the
+UserFeature. Requests are idempotent per (user, client_key): a replay, or a
+concurrent duplicate that loses the race on the unique constraint, returns
+the original purchase without charging again.
+"""
+import uuid
+from datetime import timedelta
+
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from core.db_routers import PRIMARY_DB, pin_primary
+from core.metrics import count_wallet_coins
+from features.catalog import get_feature_prices
+from features.entitlements import invalidate_entitlements
+from features.models import UserFeature
+from features.signals import entitlements_changed
+from payments.models import CoinTransaction, FeaturePurchase
+from .wallet_ops import debit_wallet
+
+
+class PurchaseError(Exception):
+    """Base class for purchase failures reported back to the client"""
+
+
+class FeatureNotForSale(PurchaseError):
+    pass
+
+
+class InsufficientCoins(PurchaseError):
+    pass
+
+
+def _find_purchase(user, client_key):
+    return (
+        FeaturePurchase.objects.using(PRIMARY_DB)
+        .select_related('feature')
+        .filter(user=user, client_key=client_key)
+        .first()
+    )
+
+
+def _activate_feature(user_id, feature_id, duration_days, now):
+    """Activate the feature, extending the expiry of a still-running grant"""
+    extension = timedelta(days=duration_days)
+    user_feature = UserFeature.objects.select_for_update().filter(
+        user_id=user_id, feature_id=feature_id
+    ).first()
+
+    if user_feature is None:
+        user_feature = UserFeature.objects.create(
+            user_id=user_id, feature_id=feature_id, is_active=True, expires_on=now + extension
+        )
+        return user_feature.expires_on
+
+    if user_feature.is_valid():
+        if user_feature.expires_on is not None:
+            user_feature.expires_on += extension
+    else:
+        user_feature.is_active = True
+        user_feature.activated_on = now
+        user_feature.expires_on = now + extension
+    user_feature.save(update_fields=['is_active', 'activated_on', 'expires_on'])
+    return user_feature.expires_on
+
+
+def purchase_feature(user, feature_code, client_key):
+    """
+    Buy ``feature_code`` with the user's coins.
+
+    Returns ``(purchase, created)``; ``created`` is False for a replayed key.
+    Raises FeatureNotForSale or InsufficientCoins.
+    """
+    price = get_feature_prices().get(feature_code)
+    if price is None:
+        raise FeatureNotForSale(f"Feature '{feature_code}' is not available for purchase")
+
+    existing = _find_purchase(user, client_key)
+    if existing is not None:
+        return existing, False
+
+    try:
+        with transaction.atomic():
+            balance = debit_wallet(user.id, price.coin_price)
+            if balance is None:
+                raise InsufficientCoins("Insufficient coin balance")
+
+            now = timezone.now()
+            purchase_id = str(uuid.uuid4())
+            coin_transaction = CoinTransaction.objects.create(
+                user=user,
+                transaction_type='FEATURE_BUY',
+                amount=-price.coin_price,
+                balance_after=balance,
+                reference_id=purchase_id,
+                description=f"Spent {price.coin_price} coins on {feature_code}",
+                metadata={'feature_code': feature_code, 'client_key': client_key},
+            )
+            count_wallet_coins('debit', 'FEATURE_BUY', price.coin_price)
+            expires_on = _activate_feature(user.id, price.feature_id, price.duration_days, now)
+            purchase = FeaturePurchase.objects.create(
+                purchase_id=purchase_id,
+                user=user,
+                feature_id=price.feature_id,
+                coins_spent=price.coin_price,
+                duration_days=price.duration_days,
+                activated_at=now,
+                expires_at=expires_on,
+                transaction=coin_transaction,
+                client_key=client_key,
+            )
+            entitlements_changed.send(
+                sender=UserFeature,
+                action='purchased',
+                pairs=[(user.id, price.feature_id)],
+                expires_on=expires_on,
+            )
+            invalidate_entitlements([user.id])
+    except IntegrityError:
+        # A concurrent request with the same key committed first; everything
+        # done here, including the debit, has been rolled back.
+        existing = _find_purchase(user, client_key)
+        if existing is None:
+            raise
+        return existing, False
+
+    pin_primary(user.id)
+    return purchase, True
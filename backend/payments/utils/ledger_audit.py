@@ -0,0 +1,143 @@
+"""
+Wallet balance verification against the coin ledger.
+
+Each wallet has a WalletCheckpoint holding the id of the last verified
+CoinTransaction and the ledger balance up to it. A run only sums the ledger
+rows after the checkpoint, with one aggregate query per range of user ids, and
+compares ``checkpoint.balance + delta`` with the wallet balance (including
+unconsolidated shard credits).
+
+Wallets and ledger rows of a range are read in one REPEATABLE READ snapshot
+(on PostgreSQL), so a credit or debit committing mid-read can't show up on one
+side only. Ledger ids are allocated before commit, so a row may become visible
+after rows with higher ids; checkpoints therefore only advance over rows older
+than ``settle_seconds``, and younger rows are re-read on the next run.
+
+Wallets created before the ledger was complete got an ``OPENING_BALANCE``
+row for the difference (payments migration 0008), so they don't report drift.
+"""
+from dataclasses import dataclass, field
+from datetime import timedelta
+
+from django.db import connection, transaction
+from django.db.models import Count, F, Max, Min, Q, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from payments.models import CoinTransaction, UserWallet, WalletCheckpoint
+
+DEFAULT_SETTLE_SECONDS = 60
+MAX_REPORTED_MISMATCHES = 100
+
+
+@dataclass
+class Mismatch:
+    user_id: int
+    wallet_balance: int
+    ledger_balance: int
+
+    @property
+    def drift(self):
+        return self.wallet_balance - self.ledger_balance
+
+
+@dataclass
+class AuditStats:
+    wallets: int = 0
+    ledger_rows: int = 0
+    checkpoints_written: int = 0
+    mismatched: int = 0
+    mismatches: list = field(default_factory=list)  # First MAX_REPORTED_MISMATCHES only
+
+    def merge(self, other):
+        self.wallets += other.wallets
+        self.ledger_rows += other.ledger_rows
+        self.checkpoints_written += other.checkpoints_written
+        self.mismatched += other.mismatched
+        self.mismatches.extend(other.mismatches[:MAX_REPORTED_MISMATCHES - len(self.mismatches)])
+
+
+def user_id_ranges(range_size):
+    """Split the wallet user ids into ``[start, end)`` ranges"""
+    bounds = UserWallet.objects.aggregate(low=Min('user_id'), high=Max('user_id'))
+    if bounds['low'] is None:
+        return []
+    return [(start, start + range_size) for start in range(bounds['low'], bounds['high'] + 1, range_size)]
+
+
+def _start_snapshot():
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute('SET TRANSACTION ISOLATION LEVEL REPEATABLE READ READ ONLY')
+
+
+def verify_range(start, end, full=False, settle_seconds=DEFAULT_SETTLE_SECONDS):
+    """
+    Verify wallets with ``start <= user_id < end`` and advance their checkpoints.
+
+    ``full`` ignores existing checkpoints and re-sums each ledger from the start.
+    Returns AuditStats.
+    """
+    stats = AuditStats()
+    now = timezone.now()
+    settled = Q(created_at__lt=now - timedelta(seconds=settle_seconds))
+
+    with transaction.atomic():
+        _start_snapshot()
+        wallets = UserWallet.objects.filter(user_id__gte=start, user_id__lt=end).annotate(
+            balance=F('coin_balance') + Coalesce(Sum('shards__coin_balance'), Value(0)),
+        ).values_list(
+            'user_id', 'balance',
+            'user__wallet_checkpoint__last_transaction_id', 'user__wallet_checkpoint__balance',
+        )
+        balances = {}
+        checkpoint_balances = {}
+        for user_id, coin_balance, last_id, checkpoint_balance in wallets:
+            balances[user_id] = coin_balance
+            checkpoint_balances[user_id] = 0 if full or last_id is None else checkpoint_balance
+
+        ledger = CoinTransaction.objects.filter(user_id__gte=start, user_id__lt=end)
+        if not full:
+            ledger = ledger.filter(
+                Q(user__wallet_checkpoint__isnull=True)
+                | Q(id__gt=F('user__wallet_checkpoint__last_transaction_id'))
+            )
+        deltas = {
+            row['user_id']: row
+            for row in ledger.order_by().values('user_id').annotate(
+                rows=Count('id'),
+                delta=Sum('amount'),
+                settled_delta=Sum('amount', filter=settled),
+                settled_last_id=Max('id', filter=settled),
+            )
+        }
+    # Snapshot released; checkpoints are written in a separate short transaction
+
+    to_write = []
+    for user_id, coin_balance in balances.items():
+        checkpoint_balance = checkpoint_balances[user_id]
+        row = deltas.get(user_id)
+        ledger_balance = checkpoint_balance + (row['delta'] if row else 0)
+        stats.wallets += 1
+        stats.ledger_rows += row['rows'] if row else 0
+        if ledger_balance != coin_balance:
+            stats.mismatched += 1
+            if len(stats.mismatches) < MAX_REPORTED_MISMATCHES:
+                stats.mismatches.append(Mismatch(user_id, coin_balance, ledger_balance))
+        if row and row['settled_last_id'] is not None:
+            to_write.append(WalletCheckpoint(
+                user_id=user_id,
+                last_transaction_id=row['settled_last_id'],
+                balance=checkpoint_balance + row['settled_delta'],
+                verified_at=now,
+            ))
+
+    if to_write:
+        WalletCheckpoint.objects.bulk_create(
+            to_write,
+            update_conflicts=True,
+            unique_fields=['user'],
+            update_fields=['last_transaction_id', 'balance', 'verified_at'],
+        )
+    stats.checkpoints_written = len(to_write)
+    return stats
@@ -6,6 +6,7 @@ from .razorpay_client import client as razorpay_client
 from accounts.utils import get_user_phone_number, get_user_full_name
 import json
 from payments.models import PaymentLog, UserWallet
+from .coin_rates import get_coin_rate
 
 
 def decimal_serializer(obj):
@@ -137,15 +138,21 @@ def create_upi_url(amount, order_id, merchant_name="YourApp"):
     return upi_url
 
 
-def calculate_coins_for_amount(amount):
-    """Calculate coins for given amount (1 INR = 1 Coin)"""
-    return int(amount)
+def calculate_coins_for_amount(amount, rate=None):
+    """Calculate coins for given amount at the active purchase rate"""
+    rate = rate if rate is not None else get_coin_rate('PURCHASE')
+    return int(Decimal(amount) * rate)
 
 
-def get_coin_exchange_rate():
-    """Get current coin exchange rate"""
-    # For now, fixed rate: 1 INR = 1 Coin
-    return Decimal('1.00')
+def calculate_amount_for_coins(coins, rate=None):
+    """Calculate the INR payout for redeeming coins at the active redemption rate"""
+    rate = rate if rate is not None else get_coin_rate('REDEMPTION')
+    return (Decimal(coins) / rate).quantize(Decimal('0.01'))
+
+
+def get_coin_exchange_rate(rate_type='PURCHASE'):
+    """Get current coin exchange rate (coins per INR)"""
+    return get_coin_rate(rate_type)
 
 
 def calculate_order_expiry():
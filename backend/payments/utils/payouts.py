@@ -0,0 +1,318 @@
+"""
+Batched payout pipeline for approved coin redemptions.
+
+Each batch:
+1. claims APPROVED redemptions with ``SELECT ... FOR UPDATE SKIP LOCKED``,
+   so several batchers can run side by side;
+2. debits the wallets with one set-based UPDATE and writes the ledger rows
+   with ``bulk_create``, moving the redemptions to PROCESSING (same commit);
+3. submits the payouts to the configured gateway and records the outcome;
+   a redemption that runs out of attempts is FAILED and its coins are
+   refunded in the same commit.
+
+A PROCESSING redemption carries a lease (``processing_started_at``). If a
+batcher dies after step 2, the next run re-claims the redemptions whose lease
+expired and submits them again; gateways must treat the redemption id as an
+idempotency key, so a payout is never sent twice. Outcomes are only written
+for rows still on the batcher's lease, so a batcher whose gateway call
+outlived ``PAYOUT_LEASE_SECONDS`` can't settle or refund a redemption that
+another batcher has re-claimed.
+"""
+import time
+import uuid
+from collections import defaultdict
+from dataclasses import dataclass, field
+from datetime import timedelta
+from decimal import Decimal
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, Value, When
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from core.metrics import count_wallet_coins
+from payments.models import CoinRedemption, CoinTransaction, UserWallet
+from .wallet_ops import consolidate_shards
+
+
+@dataclass
+class PayoutRequest:
+    reference: str        # CoinRedemption.redemption_id, used as idempotency key
+    amount: Decimal
+    bank_details: dict
+
+
+@dataclass
+class PayoutResult:
+    success: bool
+    payout_id: str = None
+    error: str = None
+
+
+class PayoutGateway:
+    """Interface for payout providers"""
+
+    def submit(self, requests):
+        """Send payouts; return ``{reference: PayoutResult}`` for every request"""
+        raise NotImplementedError
+
+
+class FakePayoutGateway(PayoutGateway):
+    """
+    Local gateway that accepts every payout, deduplicated by reference.
+
+    It sends no money, so it is only the default with DEBUG on.
+    """
+
+    def __init__(self):
+        self.payouts = {}
+
+    def submit(self, requests):
+        results = {}
+        for request in requests:
+            if request.reference not in self.payouts:
+                self.payouts[request.reference] = f"fake_payout_{uuid.uuid4().hex[:12]}"
+            results[request.reference] = PayoutResult(success=True, payout_id=self.payouts[request.reference])
+        return results
+
+
+@lru_cache(maxsize=None)
+def get_payout_gateway():
+    if not settings.PAYOUT_GATEWAY:
+        raise ImproperlyConfigured("Set PAYOUT_GATEWAY to the payout provider's gateway class")
+    return import_string(settings.PAYOUT_GATEWAY)()
+
+
+@dataclass
+class PayoutRunStats:
+    batches: int = 0
+    claimed: int = 0
+    paid: int = 0
+    failed: int = 0
+    retrying: int = 0
+    rejected: int = 0
+    lease_lost: int = 0  # outcomes not written: another batcher re-claimed the rows
+    coins_debited: int = 0
+    coins_refunded: int = 0
+    amount_paid: Decimal = Decimal('0.00')
+    started: float = field(default_factory=time.monotonic)
+
+    @property
+    def elapsed(self):
+        return time.monotonic() - self.started
+
+    @property
+    def throughput(self):
+        """Redemptions settled (paid or failed) per second"""
+        return (self.paid + self.failed) / self.elapsed if self.elapsed else 0.0
+
+
+def _claim_expired_leases(batch_size, now):
+    """Re-claim PROCESSING redemptions left by a crashed batcher or a failed attempt"""
+    lease = timedelta(seconds=settings.PAYOUT_LEASE_SECONDS)
+    with transaction.atomic():
+        redemptions = list(
+            CoinRedemption.objects.select_for_update(skip_locked=True)
+            .filter(status='PROCESSING', processing_started_at__lt=now - lease)
+            .order_by('id')[:batch_size]
+        )
+        for redemption in redemptions:
+            redemption.processing_started_at = now
+        CoinRedemption.objects.bulk_update(redemptions, ['processing_started_at'])
+    return redemptions
+
+
+def _claim_and_debit(batch_size, now, stats):
+    """
+    Claim APPROVED redemptions, debit wallets and write the ledger in one commit.
+
+    Returns ``(claimed, payable)``: the number of rows claimed, and the ones
+    debited and ready to submit. The rest were REJECTED, so a batch can claim
+    rows and still have nothing to pay.
+    """
+    with transaction.atomic():
+        redemptions = list(
+            CoinRedemption.objects.select_for_update(skip_locked=True)
+            .filter(status='APPROVED')
+            .order_by('id')[:batch_size]
+        )
+        if not redemptions:
+            return 0, []
+
+        # Lock the wallets in a fixed order to avoid deadlocks between batchers;
+        # sharded wallets get their pending credits folded in first
+        consolidate_shards({r.user_id for r in redemptions})
+        balances = dict(
+            UserWallet.objects.select_for_update()
+            .filter(user_id__in={r.user_id for r in redemptions})
+            .order_by('user_id')
+            .values_list('user_id', 'coin_balance')
+        )
+
+        payable, rejected, ledger = [], [], []
+        debits = defaultdict(int)
+        for redemption in redemptions:
+            balance = balances.get(redemption.user_id)
+            if balance is None or balance < redemption.coins_redeemed:
+                redemption.status = 'REJECTED'
+                redemption.admin_notes = 'Insufficient coin balance at payout time'
+                rejected.append(redemption)
+                continue
+            balances[redemption.user_id] = balance - redemption.coins_redeemed
+            debits[redemption.user_id] += redemption.coins_redeemed
+            ledger.append(CoinTransaction(
+                user_id=redemption.user_id,
+                transaction_type='REDEMPTION',
+                amount=-redemption.coins_redeemed,
+                balance_after=balances[redemption.user_id],
+                reference_id=redemption.redemption_id,
+                description=f"Redeemed {redemption.coins_redeemed} coins for ₹{redemption.amount_to_pay}",
+            ))
+            payable.append(redemption)
+
+        if debits:
+            debit = Case(
+                *[When(user_id=user_id, then=Value(amount)) for user_id, amount in debits.items()],
+                output_field=IntegerField(),
+            )
+            UserWallet.objects.filter(user_id__in=debits).update(
+                coin_balance=F('coin_balance') - debit,
+                total_coins_spent=F('total_coins_spent') + debit,
+                updated_at=now,
+            )
+            CoinTransaction.objects.bulk_create(ledger)
+            count_wallet_coins('debit', 'REDEMPTION', sum(debits.values()))
+
+        for redemption, coin_transaction in zip(payable, ledger):
+            redemption.status = 'PROCESSING'
+            redemption.processing_started_at = now
+            redemption.transaction = coin_transaction
+        CoinRedemption.objects.bulk_update(payable, ['status', 'processing_started_at', 'transaction'])
+        CoinRedemption.objects.bulk_update(rejected, ['status', 'admin_notes'])
+
+    stats.rejected += len(rejected)
+    stats.coins_debited += sum(debits.values())
+    return len(redemptions), payable
+
+
+def _refund(redemptions, now):
+    """Credit back the coins of FAILED redemptions; call inside the transaction that fails them"""
+    credits = defaultdict(int)
+    for redemption in redemptions:
+        credits[redemption.user_id] += redemption.coins_redeemed
+    balances = dict(
+        UserWallet.objects.select_for_update()
+        .filter(user_id__in=credits)
+        .order_by('user_id')
+        .values_list('user_id', 'coin_balance')
+    )
+    ledger = []
+    for redemption in redemptions:
+        balances[redemption.user_id] += redemption.coins_redeemed
+        ledger.append(CoinTransaction(
+            user_id=redemption.user_id,
+            transaction_type='REFUND',
+            amount=redemption.coins_redeemed,
+            balance_after=balances[redemption.user_id],
+            reference_id=redemption.redemption_id,
+            description=f"Refunded {redemption.coins_redeemed} coins for failed payout",
+        ))
+
+    # Undo the debit: the coins go back to the wallet row they were taken from
+    credit = Case(
+        *[When(user_id=user_id, then=Value(amount)) for user_id, amount in credits.items()],
+        output_field=IntegerField(),
+    )
+    UserWallet.objects.filter(user_id__in=credits).update(
+        coin_balance=F('coin_balance') + credit,
+        total_coins_spent=F('total_coins_spent') - credit,
+        updated_at=now,
+    )
+    CoinTransaction.objects.bulk_create(ledger)
+    count_wallet_coins('credit', 'REFUND', sum(credits.values()))
+    return sum(credits.values())
+
+
+def _submit(redemptions, stats):
+    """Send the batch to the gateway and record each outcome"""
+    try:
+        results = get_payout_gateway().submit([
+            PayoutRequest(reference=r.redemption_id, amount=r.amount_to_pay, bank_details=r.bank_details)
+            for r in redemptions
+        ])
+    except ImproperlyConfigured:
+        raise
+    except Exception as exc:
+        # Counts as a failed attempt for the whole batch, so it still gives
+        # up after PAYOUT_MAX_ATTEMPTS instead of retrying forever
+        error = f"{type(exc).__name__}: {exc}"
+        results = {r.redemption_id: PayoutResult(success=False, error=error) for r in redemptions}
+
+    now = timezone.now()
+    with transaction.atomic():
+        # A gateway call that outlived the lease may have had its rows
+        # re-claimed by another batcher, which now owns their outcome (and any
+        # refund). Lock the rows and write only those still on this lease.
+        leases = dict(
+            CoinRedemption.objects.select_for_update()
+            .filter(pk__in=[r.pk for r in redemptions], status='PROCESSING')
+            .values_list('pk', 'processing_started_at')
+        )
+        held = [r for r in redemptions if leases.get(r.pk) == r.processing_started_at]
+        stats.lease_lost += len(redemptions) - len(held)
+        redemptions = held
+
+        failed = []
+        for redemption in redemptions:
+            result = results.get(redemption.redemption_id) or PayoutResult(success=False, error='No result from gateway')
+            redemption.payout_attempts += 1
+            if result.success:
+                redemption.status = 'PAID'
+                redemption.paid_at = now
+                redemption.payout_reference = result.payout_id
+                stats.paid += 1
+                stats.amount_paid += redemption.amount_to_pay
+            else:
+                redemption.admin_notes = f"Payout attempt {redemption.payout_attempts} failed: {result.error}"
+                # Give up after PAYOUT_MAX_ATTEMPTS; until then the redemption stays
+                # PROCESSING and is retried once its lease expires
+                if redemption.payout_attempts >= settings.PAYOUT_MAX_ATTEMPTS:
+                    redemption.status = 'FAILED'
+                    failed.append(redemption)
+                    stats.failed += 1
+                else:
+                    stats.retrying += 1
+        CoinRedemption.objects.bulk_update(
+            redemptions, ['status', 'paid_at', 'payout_reference', 'payout_attempts', 'admin_notes']
+        )
+        if failed:
+            stats.coins_refunded += _refund(failed, now)
+
+
+def process_payouts(batch_size=500, max_batches=None, on_batch=None):
+    """
+    Run payout batches until nothing is left to claim (or ``max_batches``).
+
+    ``on_batch(stats)`` is called after every batch. Returns PayoutRunStats.
+    """
+    stats = PayoutRunStats()
+    while max_batches is None or stats.batches < max_batches:
+        now = timezone.now()
+        batch = _claim_expired_leases(batch_size, now)
+        claimed = len(batch)
+        if not batch:
+            claimed, batch = _claim_and_debit(batch_size, now, stats)
+        # Stop only when nothing was claimed: an all-REJECTED batch still
+        # leaves APPROVED rows behind it
+        if not claimed:
+            break
+        stats.batches += 1
+        stats.claimed += claimed
+        if batch:
+            _submit(batch, stats)
+        if on_batch:
+            on_batch(stats)
+    return stats
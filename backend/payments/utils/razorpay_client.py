@@ -1,4 +1,31 @@
+import time
+
 import razorpay
 from django.conf import settings
 
-client = razorpay.Client(auth=(settings.RAZORPAY_KEY_ID, settings.RAZORPAY_KEY_SECRET))
\ No newline at end of file
+from core.instrumentation import timed
+from core.metrics import RAZORPAY_LATENCY
+
+
+class TimedRazorpayClient(razorpay.Client):
+    """Razorpay client that reports API call time to the request instrumentation and metrics"""
+
+    def request(self, method, path, **options):
+        # Paths look like /v1/orders/<id>/payments; keep the resource, not the ids
+        parts = path.split('/')
+        resource = parts[2] if len(parts) > 2 else 'unknown'
+        outcome = 'error'
+        started = time.perf_counter()
+        try:
+            with timed('gateway'):
+                result = super().request(method, path, **options)
+            outcome = 'ok'
+            return result
+        finally:
+            RAZORPAY_LATENCY.labels(method.upper(), resource, outcome).observe(time.perf_counter() - started)
+
+
+client = TimedRazorpayClient(
+    auth=(settings.RAZORPAY_KEY_ID, settings.RAZORPAY_KEY_SECRET),
+    base_url=settings.RAZORPAY_BASE_URL,
+)
@@ -0,0 +1,170 @@
+"""
+Atomic wallet balance updates.
+
+Balances are changed with single conditional UPDATE statements instead of
+read-modify-write on a loaded ``UserWallet``, so concurrent requests can't
+overspend or lose updates. Only the wallet row is locked, never the table.
+
+Hot wallets (system or promotional accounts credited by many flows at once)
+can be sharded: credits then go to one of ``shard_count`` WalletShard rows
+picked at random, so concurrent credits rarely wait on the same row lock.
+Debits first try the wallet row and fold the shards into it only when its
+consolidated balance falls short.
+"""
+import random
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from core.db_routers import PRIMARY_DB
+from core.metrics import count_wallet_coins
+from payments.models import CoinTransaction, UserWallet, WalletShard
+
+
+def _current_balance(user_id):
+    coin_balance, shard_count = UserWallet.objects.using(PRIMARY_DB).filter(user_id=user_id).values_list(
+        'coin_balance', 'shard_count'
+    ).get()
+    if shard_count:
+        coin_balance += sum(
+            WalletShard.objects.using(PRIMARY_DB).filter(wallet__user_id=user_id).values_list('coin_balance', flat=True)
+        )
+    return coin_balance
+
+
+def _credit_shard(user_id, amount, money_spent, now):
+    shard_count = UserWallet.objects.using(PRIMARY_DB).filter(user_id=user_id).values_list(
+        'shard_count', flat=True
+    ).first()
+    if not shard_count:
+        return False
+    return WalletShard.objects.filter(wallet__user_id=user_id, index=random.randrange(shard_count)).update(
+        coin_balance=F('coin_balance') + amount,
+        total_coins_earned=F('total_coins_earned') + amount,
+        total_money_spent=F('total_money_spent') + money_spent,
+    ) > 0
+
+
+def credit_wallet(user_id, amount, transaction_type, reference_id=None, money_spent=Decimal('0.00')):
+    """
+    Add ``amount`` coins to an existing wallet and record the ledger entry.
+
+    Returns the new balance. Call inside a transaction. For a sharded wallet
+    the returned balance (and ``balance_after``) also counts shards credited
+    by transactions that committed meanwhile, so it is informational only.
+    """
+    now = timezone.now()
+    updated = UserWallet.objects.filter(user_id=user_id, shard_count=0).update(
+        coin_balance=F('coin_balance') + amount,
+        total_coins_earned=F('total_coins_earned') + amount,
+        total_money_spent=F('total_money_spent') + money_spent,
+        updated_at=now,
+    )
+    if not updated and not _credit_shard(user_id, amount, money_spent, now):
+        # Shards being resized; credit the wallet row directly
+        UserWallet.objects.filter(user_id=user_id).update(
+            coin_balance=F('coin_balance') + amount,
+            total_coins_earned=F('total_coins_earned') + amount,
+            total_money_spent=F('total_money_spent') + money_spent,
+            updated_at=now,
+        )
+    balance = _current_balance(user_id)
+    CoinTransaction.objects.create(
+        user_id=user_id,
+        transaction_type=transaction_type,
+        amount=amount,
+        balance_after=balance,
+        reference_id=reference_id,
+        description=f"Added {amount} coins via {transaction_type}",
+    )
+    count_wallet_coins('credit', transaction_type, amount)
+    return balance
+
+
+def consolidate_shards(user_ids):
+    """
+    Fold the shard balances of sharded wallets into their wallet rows.
+
+    Locks the wallets (in user id order) and their shards until commit, so
+    call inside a transaction. Returns ``{user_id: coins moved}``.
+    """
+    wallets = dict(
+        UserWallet.objects.select_for_update()
+        .filter(user_id__in=user_ids, shard_count__gt=0)
+        .order_by('user_id')
+        .values_list('id', 'user_id')
+    )
+    if not wallets:
+        return {}
+
+    totals = defaultdict(lambda: [0, 0, Decimal('0.00')])
+    shards = (
+        WalletShard.objects.select_for_update()
+        .filter(wallet_id__in=wallets)
+        .order_by('wallet_id', 'index')
+        .values_list('wallet_id', 'coin_balance', 'total_coins_earned', 'total_money_spent')
+    )
+    for wallet_id, coin_balance, coins_earned, money_spent in shards:
+        total = totals[wallet_id]
+        total[0] += coin_balance
+        total[1] += coins_earned
+        total[2] += money_spent
+
+    now = timezone.now()
+    moved = {}
+    for wallet_id, (coin_balance, coins_earned, money_spent) in totals.items():
+        if not (coin_balance or coins_earned or money_spent):
+            continue
+        UserWallet.objects.filter(id=wallet_id).update(
+            coin_balance=F('coin_balance') + coin_balance,
+            total_coins_earned=F('total_coins_earned') + coins_earned,
+            total_money_spent=F('total_money_spent') + money_spent,
+            updated_at=now,
+        )
+        moved[wallets[wallet_id]] = coin_balance
+    WalletShard.objects.filter(wallet__user_id__in=moved).update(
+        coin_balance=0, total_coins_earned=0, total_money_spent=Decimal('0.00')
+    )
+    return moved
+
+
+def debit_wallet(user_id, amount):
+    """
+    Take ``amount`` coins from the wallet if the balance covers it.
+
+    Returns the new balance, or None when the balance is insufficient.
+    Call inside a transaction: the wallet row stays locked until commit.
+    """
+    def debit():
+        return UserWallet.objects.filter(user_id=user_id, coin_balance__gte=amount).update(
+            coin_balance=F('coin_balance') - amount,
+            total_coins_spent=F('total_coins_spent') + amount,
+            updated_at=timezone.now(),
+        )
+
+    if not debit() and not (consolidate_shards([user_id]) and debit()):
+        return None
+    return _current_balance(user_id)
+
+
+def set_shard_count(user_id, shard_count):
+    """
+    Switch a wallet to ``shard_count`` credit shards (0 turns sharding off).
+
+    Existing shard balances are consolidated first, so no coins move between
+    shards and the total balance is unchanged.
+    """
+    with transaction.atomic():
+        consolidate_shards([user_id])
+        wallet = UserWallet.objects.select_for_update().get(user_id=user_id)
+        WalletShard.objects.filter(wallet=wallet, index__gte=shard_count).delete()
+        WalletShard.objects.bulk_create(
+            [WalletShard(wallet=wallet, index=index) for index in range(shard_count)],
+            ignore_conflicts=True,
+        )
+        wallet.shard_count = shard_count
+        wallet.save(update_fields=['shard_count', 'updated_at'])
+    return wallet
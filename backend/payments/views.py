@@ -11,9 +11,22 @@ import uuid
 import hmac
 import hashlib
 
+from drf_spectacular.utils import extend_schema
+
 from .models import PaymentOrder, UserWallet
-from .serializers import CreateOrderSerializer, PaymentOrderSerializer, UserWalletSerializer
+from .serializers import (
+    CreateOrderSerializer,
+    PaymentOrderSerializer,
+    UserWalletSerializer,
+    FeaturePurchaseRequestSerializer,
+    FeaturePurchaseSerializer,
+)
 from .utils.razorpay_client import client as razorpay_client
+from .utils.feature_purchase import purchase_feature, FeatureNotForSale, InsufficientCoins
+from .utils.payment_helpers import log_payment_activity, get_coin_exchange_rate, calculate_coins_for_amount
+from .utils.wallet_ops import credit_wallet
+from core.db_routers import ReplicaReadMixin, pin_primary
+from core.metrics import WEBHOOK_EVENTS, count_order
 
 
 # Helper Functions
@@ -27,7 +40,7 @@ def get_or_create_user_wallet(user):
 
 
 class CreateOrderView(APIView):
-    """Simple create order for coin purchase - 1 INR = 1 Coin"""
+    """Create order for coin purchase at the active purchase rate"""
     permission_classes = [IsAuthenticated]
     
     def post(self, request):
@@ -38,8 +51,9 @@ class CreateOrderView(APIView):
             
             try:
                 with transaction.atomic():
-                    # Calculate coins (1 INR = 1 Coin)
-                    coins_to_credit = int(amount)
+                    # Calculate coins at the active purchase rate
+                    exchange_rate = get_coin_exchange_rate('PURCHASE')
+                    coins_to_credit = calculate_coins_for_amount(amount, exchange_rate)
                     
                     # Generate unique order ID
                     order_id = f"order_{uuid.uuid4().hex[:12]}"
@@ -69,11 +83,13 @@ class CreateOrderView(APIView):
                         status='PENDING',
                         payment_method='CHECKOUT',
                         expires_at=timezone.now() + timedelta(hours=1),
-                        notes={'razorpay_order': dict(razorpay_order)}
+                        notes={'razorpay_order': dict(razorpay_order), 'coins_per_inr': str(exchange_rate)}
                     )
                     
                     # Ensure user has a wallet
                     get_or_create_user_wallet(request.user)
+                    count_order('created', payment_order.payment_method)
+                    pin_primary(request.user.id)
                     
                     # Return response
                     response_serializer = PaymentOrderSerializer(payment_order)
@@ -83,7 +99,7 @@ class CreateOrderView(APIView):
                         'message': f'Order created successfully! You will receive {coins_to_credit} coins after payment.',
                         'order': response_serializer.data,
                         'razorpay_key_id': settings.RAZORPAY_KEY_ID,
-                        'exchange_rate': '1 INR = 1 Coin'
+                        'exchange_rate': f'1 INR = {exchange_rate} Coins'
                     }, status=status.HTTP_201_CREATED)
                     
             except Exception as e:
@@ -99,12 +115,15 @@ class CreateOrderView(APIView):
         }, status=status.HTTP_400_BAD_REQUEST)
 
 
-class UserWalletView(APIView):
+class UserWalletView(ReplicaReadMixin, APIView):
     """Get user's wallet information"""
     permission_classes = [IsAuthenticated]
     
     def get(self, request):
-        wallet = get_or_create_user_wallet(request.user)
+        # Plain read first so it can be served by the replica
+        wallet = UserWallet.objects.filter(user=request.user).first()
+        if wallet is None:
+            wallet = get_or_create_user_wallet(request.user)
         serializer = UserWalletSerializer(wallet)
         return Response({
             'success': True,
@@ -144,7 +163,8 @@ class VerifyPaymentView(APIView):
             
             # Find and update order
             with transaction.atomic():
-                payment_order = PaymentOrder.objects.get(
+                # Lock the order so a concurrent webhook can't credit it twice
+                payment_order = PaymentOrder.objects.select_for_update().get(
                     razorpay_order_id=razorpay_order_id,
                     user=request.user,
                     status='PENDING'
@@ -158,17 +178,19 @@ class VerifyPaymentView(APIView):
                 payment_order.save()
                 
                 # Credit coins to wallet
-                wallet = get_or_create_user_wallet(request.user)
-                wallet.coin_balance += payment_order.coins_to_credit
-                wallet.total_coins_earned += payment_order.coins_to_credit
-                wallet.total_money_spent += payment_order.amount
-                wallet.save()
+                get_or_create_user_wallet(request.user)
+                balance = credit_wallet(
+                    request.user.id, payment_order.coins_to_credit, 'PURCHASE',
+                    reference_id=payment_order.order_id, money_spent=payment_order.amount,
+                )
+                count_order('verified', payment_order.payment_method)
+                pin_primary(request.user.id)
                 
                 return Response({
                     'success': True,
                     'message': f'{payment_order.coins_to_credit} coins added to your wallet!',
                     'order': PaymentOrderSerializer(payment_order).data,
-                    'wallet_balance': wallet.coin_balance
+                    'wallet_balance': balance
                 })
                 
         except PaymentOrder.DoesNotExist:
@@ -184,7 +206,7 @@ class VerifyPaymentView(APIView):
             }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
-class OrderStatusView(APIView):
+class OrderStatusView(ReplicaReadMixin, APIView):
     """Get order status and details"""
     permission_classes = [IsAuthenticated]
     
@@ -228,6 +250,7 @@ class PaymentWebhookView(APIView):
                 ).hexdigest()
                 
                 if expected_signature != webhook_signature:
+                    WEBHOOK_EVENTS.labels('unknown', 'invalid_signature').inc()
                     return Response({'error': 'Invalid signature'}, status=status.HTTP_400_BAD_REQUEST)
             
             # Process webhook
@@ -235,20 +258,25 @@ class PaymentWebhookView(APIView):
             event = payload.get('event')
             
             if event == 'payment.captured':
-                self.handle_payment_captured(payload)
+                outcome = self.handle_payment_captured(payload)
             elif event == 'order.paid':
-                self.handle_order_paid(payload)
+                outcome = self.handle_order_paid(payload)
+            else:
+                outcome = 'ignored'
+            # Only known event names become label values
+            WEBHOOK_EVENTS.labels(event if outcome != 'ignored' else 'other', outcome).inc()
                 
             return Response({'status': 'ok'}, status=status.HTTP_200_OK)
             
         except Exception as e:
+            WEBHOOK_EVENTS.labels('unknown', 'error').inc()
             print(f"Webhook error: {str(e)}")
             return Response({
                 'error': 'Webhook processing failed'
             }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
     
     def handle_payment_captured(self, payload):
-        """Handle payment.captured webhook"""
+        """Handle payment.captured webhook; returns the outcome for metrics"""
         payment = payload.get('payload', {}).get('payment', {}).get('entity', {})
         order_id = payment.get('order_id')
         payment_id = payment.get('id')
@@ -256,7 +284,7 @@ class PaymentWebhookView(APIView):
         if order_id and payment_id:
             try:
                 with transaction.atomic():
-                    payment_order = PaymentOrder.objects.get(
+                    payment_order = PaymentOrder.objects.select_for_update().get(
                         razorpay_order_id=order_id,
                         status='PENDING'
                     )
@@ -269,24 +297,30 @@ class PaymentWebhookView(APIView):
                     payment_order.save()
                     
                     # Credit coins
-                    wallet = get_or_create_user_wallet(payment_order.user)
-                    wallet.coin_balance += payment_order.coins_to_credit
-                    wallet.total_coins_earned += payment_order.coins_to_credit
-                    wallet.total_money_spent += payment_order.amount
-                    wallet.save()
+                    get_or_create_user_wallet(payment_order.user)
+                    credit_wallet(
+                        payment_order.user_id, payment_order.coins_to_credit, 'PURCHASE',
+                        reference_id=payment_order.order_id, money_spent=payment_order.amount,
+                    )
+                    count_order('settled', payment_order.payment_method)
+                    pin_primary(payment_order.user_id)
+                return 'processed'
                     
             except PaymentOrder.DoesNotExist:
+                # Unknown order, or already paid through another path
                 print(f"Order not found for webhook: {order_id}")
+                return 'not_found'
+        return 'invalid_payload'
     
     def handle_order_paid(self, payload):
-        """Handle order.paid webhook"""
+        """Handle order.paid webhook; returns the outcome for metrics"""
         order = payload.get('payload', {}).get('order', {}).get('entity', {})
         order_id = order.get('id')
         
         if order_id:
             try:
                 with transaction.atomic():
-                    payment_order = PaymentOrder.objects.get(
+                    payment_order = PaymentOrder.objects.select_for_update().get(
                         razorpay_order_id=order_id,
                         status='PENDING'
                     )
@@ -298,11 +332,72 @@ class PaymentWebhookView(APIView):
                     payment_order.save()
                     
                     # Credit coins
-                    wallet = get_or_create_user_wallet(payment_order.user)
-                    wallet.coin_balance += payment_order.coins_to_credit
-                    wallet.total_coins_earned += payment_order.coins_to_credit
-                    wallet.total_money_spent += payment_order.amount
-                    wallet.save()
+                    get_or_create_user_wallet(payment_order.user)
+                    credit_wallet(
+                        payment_order.user_id, payment_order.coins_to_credit, 'PURCHASE',
+                        reference_id=payment_order.order_id, money_spent=payment_order.amount,
+                    )
+                    count_order('settled', payment_order.payment_method)
+                    pin_primary(payment_order.user_id)
+                return 'processed'
                     
             except PaymentOrder.DoesNotExist:
-                print(f"Order not found for webhook: {order_id}")
\ No newline at end of file
+                # Unknown order, or already paid through another path
+                print(f"Order not found for webhook: {order_id}")
+                return 'not_found'
+        return 'invalid_payload'
+
+
+class FeaturePurchaseView(APIView):
+    """Buy a feature with wallet coins (idempotent per client key)"""
+    permission_classes = [IsAuthenticated]
+    
+    @extend_schema(
+        request=FeaturePurchaseRequestSerializer,
+        responses={201: FeaturePurchaseSerializer, 200: FeaturePurchaseSerializer},
+        description="Send the same client_key (or Idempotency-Key header) to retry safely."
+    )
+    def post(self, request):
+        serializer = FeaturePurchaseRequestSerializer(
+            data=request.data, context={'idempotency_key': request.headers.get('Idempotency-Key')}
+        )
+        if not serializer.is_valid():
+            return Response({
+                'success': False,
+                'errors': serializer.errors
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        feature_code = serializer.validated_data['feature_code']
+        client_key = serializer.validated_data.get('client_key')
+        if not client_key:
+            return Response({
+                'success': False,
+                'error': 'client_key or Idempotency-Key header is required'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        try:
+            purchase, created = purchase_feature(request.user, feature_code, client_key)
+        except FeatureNotForSale as e:
+            return Response({
+                'success': False,
+                'error': str(e)
+            }, status=status.HTTP_404_NOT_FOUND)
+        except InsufficientCoins as e:
+            return Response({
+                'success': False,
+                'error': str(e)
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        if created:
+            log_payment_activity(
+                request.user,
+                'FEATURE_PURCHASED',
+                f'Purchased {feature_code} for {purchase.coins_spent} coins',
+                request_data={'feature_code': feature_code, 'client_key': client_key},
+            )
+        
+        return Response({
+            'success': True,
+            'message': 'Feature purchased successfully!' if created else 'Purchase already processed',
+            'purchase': FeaturePurchaseSerializer(purchase).data,
+        }, status=status.HTTP_201_CREATED if created else status.HTTP_200_OK)
@@ -1,7 +1,7 @@
 "use client";
 
 import React, { createContext, useContext, useState, useEffect, ReactNode } from "react";
-import { login, userProfile, refreshToken, logout, googleLogin } from "@/services/auth/authApi";
+import { login, bootstrapSession, logout, googleLogin } from "@/services/auth/authApi";
 import { getUserFeatures } from "@/services/features/featureApi";
 import { User, AuthContextType, LoginPayload, UserRole, UserFeature } from "@/types/types";
 import { roleUtils } from "@/lib/roleUtils";
@@ -18,21 +18,17 @@ export const AuthProvider = ({ children }: { children: ReactNode }) => {
   // const [featuresLoading, setFeaturesLoading] = useState(true);
 
 
-  // Fetch user profile on mount
+  // Fetch user profile and features on mount in a single request; the
+  // endpoint refreshes an expired access cookie itself
   useEffect(() => {
     const init = async () => {
       try {
-        const profile = await userProfile();
-        setUser(profile);
-      } catch (error) {
-        try {
-          // Try refreshing if access token expired
-          await refreshToken();
-          const profile = await userProfile();
-          setUser(profile);
-        } catch {
-          setUser(null);
-        }
+        const session = await bootstrapSession();
+        setUser(session.user);
+        setFeatures(session.features);
+      } catch {
+        setUser(null);
+        setFeatures([]);
       } finally {
         setLoading(false);
       }
@@ -40,28 +36,15 @@ export const AuthProvider = ({ children }: { children: ReactNode }) => {
     init();
   }, []);
 
-  useEffect(() => {
-    const fetchFeatures = async () => {
-      if (!user) {
-        setFeatures([]);
-        // setFeaturesLoading(false);
-        return;
-      }
-      try {
-        // setFeaturesLoading(true);
-        const userFeatures = await getUserFeatures();
-        console.log('Fetched features:', userFeatures);
-        setFeatures(userFeatures);
-      } catch (err) {
-        console.error("Error fetching features:", err);
-        setFeatures([]);
-      } finally {
-        // setFeaturesLoading(false);
-      }
-    };
-
-    fetchFeatures();
-  }, [user]);
+  const loadFeatures = async () => {
+    try {
+      const userFeatures = await getUserFeatures();
+      setFeatures(userFeatures);
+    } catch (err) {
+      console.error("Error fetching features:", err);
+      setFeatures([]);
+    }
+  };
   //   const loginUser = async (username: string, password: string) => {
   //     const loginPayload: LoginPayload = { username, password }; // create object
   //     const loggedInUser = await login(loginPayload); // pass it to API
@@ -71,11 +54,13 @@ export const AuthProvider = ({ children }: { children: ReactNode }) => {
   const loginUser = async (loginPayload: LoginPayload) => {
     const loggedInUser = await login(loginPayload);
     setUser(loggedInUser);
+    await loadFeatures();
   };
 
   const loginWithGoogle = async (credential: string) => {
     const loggedInUser = await googleLogin(credential);
     setUser(loggedInUser);
+    await loadFeatures();
   };
 
 
@@ -1,5 +1,5 @@
 import axiosInstance from "@/utils/axiosInstance";
-import { User, LoginPayload, RegisterPayload, SendOTPPayload, VerifyOTPPayload, OTPResponse } from "@/types/types";
+import { User, LoginPayload, RegisterPayload, SendOTPPayload, VerifyOTPPayload, OTPResponse, SessionBootstrap } from "@/types/types";
 
 export async function login(loginPayload: LoginPayload): Promise<User> {
     const response = await axiosInstance.post("accounts/login/", loginPayload);
@@ -15,6 +15,12 @@ export async function refreshToken(): Promise<void> {
     await axiosInstance.post("accounts/refresh/");
 }
 
+// Profile, wallet and active features in one call; refreshes an expired access cookie
+export async function bootstrapSession(): Promise<SessionBootstrap> {
+    const response = await axiosInstance.get("accounts/bootstrap/");
+    return response.data;
+}
+
 export async function registerUser(registerPayload: RegisterPayload): Promise<User> {
     const response = await axiosInstance.post("accounts/register/", registerPayload);
     return response.data;
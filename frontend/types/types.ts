@@ -143,4 +143,10 @@ export interface UserWallet {
   total_money_spent: string;
   created_at: string;
   updated_at: string;
-}
\ No newline at end of file
+}
+export interface SessionBootstrap {
+  user: User;
+  wallet: UserWallet;
+  features: UserFeature[];             // Active features only
+  catalog_version: number;
+}